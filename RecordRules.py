@@ -1,156 +1,505 @@
+import itertools
+import os
+
 import pandas as pd
 
+from schema import (
+    DATASET_SHEETS,
+    COUNTERPARTY_KEY,
+    EXTERNAL_DATASETS,
+    INSTRUMENT_KEY,
+    PROTECTION_KEY,
+    TEMPLATE_PATH,
+    compare_memory,
+    dataset_file_name,
+    load_schemas,
+    memory_usage,
+    read_dataset,
+)
+from domains import DomainChecker
+from normalize import NON_APPLICABLE, is_sentinel, normalize_frame
+from options import ExecutionOptions
+from interning import IdentifierDomain, IdentifierInterner
+from joins import JoinCache
+from keys import anti_join, key_isin, key_lookup, semi_join
+from masks import MaskCache
+from parallel import ParallelExecutor
+from partitions import AgentPartitioning, PartitionedExecutor, agent_column, run_partition
+from polars_backend import PolarsRules
+from profiling import PROFILE_ENV, Profiler
+from registry import RuleCategory, execution_plan, required_inputs, rule, select_rules
+from report import ViolationReport, load_rule_texts
+from result_cache import ResultCache, frame_fingerprint
+from results import ValidationResults, evaluate_rule
+from roles import CREDITOR, DEBTOR, ORIGINATOR, SERVICER, RoleEngine
+from snapshot import SnapshotStore, history_inputs, reference_date_column, reference_periods
+from sqlite_backend import SQLiteBackend, default_database_path
+from temporal import TemporalEngine
+
 class DataValidator():
-    def __init__(self, dataset_path):
+    def __init__(self, dataset_path, template_path=TEMPLATE_PATH, rules=None, snapshot_dir=None, snapshot_periods=1, options=None):
+        # dataset_path is the directory holding one CSV per dataset, e.g. "counterparty_instrument.csv".
+        # rules restricts the run to a subset of rule IDs; only the tables and columns they read are loaded.
+        # snapshot_dir is a SnapshotStore directory; the last snapshot_periods reference dates stored there
+        # before the submission are loaded as T-1 for the history rules (save_snapshot() writes them).
+        # options is an ExecutionOptions: streaming, workers, partitions, backend, cache sizes, profiling and
+        # the result cache (default: everything in pandas, in this process).
+        self.options = options if options is not None else ExecutionOptions()
         self.dataset_path = dataset_path
-        self.df_dict = self.load_data()
+        self.template_path = template_path
+        profile = self.options.profile
+        if profile is None:
+            profile = os.environ.get(PROFILE_ENV, "") not in ("", "0")
+        self.profiler = profile if isinstance(profile, Profiler) else Profiler(enabled=profile)
+        self.schemas = load_schemas(template_path)
+        self.rules = select_rules(rules)
+        self.projection = required_inputs(self.rules) if rules is not None else None
+        self.interner = IdentifierInterner() if self.options.intern_identifiers else None
+        self.snapshots = SnapshotStore(snapshot_dir) if snapshot_dir is not None else None
+        self.snapshot_periods = snapshot_periods
+        result_cache_dir = self.options.result_cache_dir
+        self.result_cache = ResultCache(result_cache_dir, template_path) if result_cache_dir is not None else None
+        self._fingerprints = None
+        self.df_dict = {} if self.options.streaming else self.load_data()
+        self.previous_dict = {} if self.options.streaming else self.load_previous()
+
+    def dataset_files(self):
+        # Datasets present in dataset_path (and read by the selected rules), keyed by their df_dict name
+        files = {}
+        for dataset in list(DATASET_SHEETS) + EXTERNAL_DATASETS:
+            if self.projection is not None and dataset not in self.projection:
+                continue
+            path = os.path.join(self.dataset_path, dataset_file_name(dataset))
+            if os.path.exists(path):
+                files[dataset] = path
+        return files
+
+    def usecols(self, dataset):
+        if self.projection is None:
+            return None
+        columns = self.projection[dataset]
+        if self.options.partitions is not None and agent_column(columns) is None:
+            # Keep the observed agent column the tables are partitioned on
+            header = pd.read_csv(os.path.join(self.dataset_path, dataset_file_name(dataset)), nrows=0).columns.str.strip()
+            agent = agent_column(header)
+            if agent is not None:
+                columns = columns + [agent]
+        return columns
 
-    def load_data(self):
-        # Implement your data loading logic here
-        # Read the dataset into a dictionary of dataframes
-        # Example:
+    def load_data(self, nrows=None, interner=None):
+        # Read every dataset with the dtypes derived from the template workbook:
+        # identifiers as compact strings, coded attributes as categoricals, dates and amounts as typed values
         df_dict = {}
-        df_dict["Counterparty-instrument"] = pd.read_csv("counterparty_instrument.csv")
-        df_dict["Counterparty-reference"] = pd.read_csv("counterparty_reference.csv")
-        # Load other tables as needed
+        for dataset, path in self.dataset_files().items():
+            with self.profiler.measure("load", dataset) as record:
+                df = read_dataset(path, self.schemas[dataset], usecols=self.usecols(dataset), nrows=nrows)
+                record["rows_out"] = len(df)
+            # Dates and amounts become datetime64/float plus an int8 sentinel code column,
+            # so rules compare typed values instead of scanning strings for 'Not applicable'
+            with self.profiler.measure("parse", dataset, len(df)) as record:
+                df_dict[dataset] = normalize_frame(df, self.schemas[dataset])
+                record["rows_out"] = len(df)
+
+        # Identifiers of all tables are interned together, so codes are comparable across tables
+        interner = interner if interner is not None else self.interner
+        if interner is not None:
+            rows = sum(len(df) for df in df_dict.values())
+            with self.profiler.measure("parse", "intern identifiers", rows) as record:
+                interner.intern(df_dict)
+                record["rows_out"] = rows
         return df_dict
 
-    def apply_validation_rules(self):
-        validation_rules = RecordRules(self.df_dict)  # Create an instance of your validation class
-        validation_results = {}
+    def load_previous(self):
+        # Earlier reference periods of the history rules' datasets, read from the snapshot store
+        previous_dict = {}
+        if self.snapshots is None:
+            return previous_dict
+        for dataset in history_inputs(self.rules):
+            date_column = reference_date_column(self.df_dict.get(dataset, pd.DataFrame()).columns)
+            if date_column is None:
+                continue
+            # Earlier than the first reference period of the submission, rows with a stray date aside
+            periods = reference_periods(self.df_dict[dataset][date_column])
+            if not periods:
+                continue
+            previous = self.snapshots.load_previous(dataset, periods[0], self.snapshot_periods)
+            if previous is not None:
+                previous_dict[dataset] = previous
+
+        # Share the identifier codes of the current submission; separate names keep the interner's column bookkeeping apart
+        if self.interner is not None:
+            self.interner.intern({dataset + " (previous)": df for dataset, df in previous_dict.items()})
+        return previous_dict
+
+    def save_snapshot(self):
+        # Store the history attributes of the current submission for next period's run
+        if self.snapshots is None:
+            raise ValueError("No snapshot_dir was given")
+        return self.snapshots.save(self.df_dict, self.rules, self.interner)
+
+    def check_domains(self, code_lists=None):
+        # Pre-flight check of the coded attributes of every loaded table against the code lists of
+        # mapping.xlsx: one row per (dataset, column, invalid value) with its row count, see DomainChecker
+        rows = sum(len(df) for df in self.df_dict.values())
+        with self.profiler.measure("filter", "domains", rows) as record:
+            invalid = DomainChecker(code_lists).check(self.df_dict, self.schemas)
+            record["rows_out"] = int(invalid["Count"].sum())
+        return invalid
+
+    def memory_report(self, nrows=None):
+        # Memory per table/column of an untyped read (the previous pd.read_csv behaviour) against the typed load.
+        # nrows bounds both reads so the comparison can be run on a sample of large submissions.
+        untyped = {
+            dataset: read_dataset(path, self.schemas[dataset], usecols=self.usecols(dataset), nrows=nrows, typed=False)
+            for dataset, path in self.dataset_files().items()
+        }
+        typed = self.load_data(nrows=nrows, interner=IdentifierInterner()) if nrows is not None else self.df_dict
+        return compare_memory(memory_usage(untyped), memory_usage(typed))
+
+    def validate_streaming(self, output_dir, chunksize=1_000_000):
+        # Run the row-local single-table rules chunk by chunk, appending violations to
+        # "<output_dir>/violations_<dataset>.csv". Peak memory is bounded by chunksize, not by file size.
+        self.options.require_serial("validate_streaming()")
+        os.makedirs(output_dir, exist_ok=True)
+        files = self.dataset_files()
+        violation_counts = {}
+
+        row_local = {}
+        for spec in self.rules:
+            if spec.row_local:
+                row_local.setdefault(spec.dataset, []).append(spec)
+
+        for dataset, specs in row_local.items():
+            if dataset not in files:
+                continue
+            output_path = os.path.join(output_dir, "violations_" + dataset_file_name(dataset))
+            write_header = True
+            chunks = read_dataset(files[dataset], self.schemas[dataset], usecols=self.usecols(dataset), chunksize=chunksize)
+
+            for chunk in chunks:
+                chunk = normalize_frame(chunk, self.schemas[dataset])
+                chunk_rules = RecordRules({dataset: chunk})
+
+                for spec in specs:
+                    if not set(spec.inputs[dataset]) <= set(chunk.columns):
+                        continue  # the submission does not carry an attribute this rule reads
+                    rule_id, _, invalid_rows = getattr(chunk_rules, spec.method_name)()
+                    violation_counts[rule_id] = violation_counts.get(rule_id, 0) + len(invalid_rows)
+                    if invalid_rows.empty:
+                        continue
 
-        # Apply each validation rule
-        for rule_name in dir(validation_rules):
-            if callable(getattr(validation_rules, rule_name)) and rule_name.startswith("CR"):  # Adjust as needed for other rule prefixes
-                rule_function = getattr(validation_rules, rule_name)
-                rule_id, table_name, invalid_rows = rule_function()
+                    # Row numbers continue across chunks, so "Row" identifies the record in the source file
+                    out = invalid_rows[[c for c in chunk.columns if not c.endswith(" [sentinel]")]]
+                    out.insert(0, "Row", out.index)
+                    out.insert(0, "Rule", rule_id)
+                    out.to_csv(output_path, mode="w" if write_header else "a", header=write_header, index=False)
+                    write_header = False
 
-                # Create a column "Correct" indicating whether each row is valid (True) or not (False)
-                invalid_rows["Correct"] = False
-                valid_rows = self.df_dict[table_name][~self.df_dict[table_name].index.isin(invalid_rows.index)]
-                valid_rows["Correct"] = True
+        return violation_counts
 
-                # Combine valid and invalid rows
-                combined_df = pd.concat([valid_rows, invalid_rows])
+    def apply_validation_rules(self, report=None):
+        # Apply each registered rule whose input datasets were loaded, grouped by the tables they read.
+        # Only the row positions of the violations are kept per rule, see ValidationResults.
+        # With a ViolationReport, each rule's violations are written as soon as the rule has run.
+        plan = execution_plan(self.rules, available=self.df_dict)
+        validation_results = ValidationResults(self.df_dict)
+        cached_outcomes, cache_keys = self._cached_outcomes(plan)
+        if self.result_cache is not None:
+            plan = [spec for spec in plan if spec.rule_id in cache_keys]
+        polars_outcomes = ()
+        if self.options.backend == "polars":
+            polars_rules = PolarsRules(self.df_dict)
+            polars_outcomes = (polars_rules.evaluate(spec, self.profiler) for spec in plan if spec.rule_id in polars_rules)
+            plan = [spec for spec in plan if spec.rule_id not in polars_rules]
+        precomputed = itertools.chain(cached_outcomes, polars_outcomes)
+        if self.options.partitions is not None:
+            self._apply_partitioned(plan, precomputed, validation_results, report)
+            self._store_results(cache_keys, validation_results)
+            return validation_results
 
-                # Store the results in the dictionary
-                validation_results[rule_id] = combined_df
+        executor = None
+        try:
+            if self.options.workers == 1:
+                self.join_cache = JoinCache(self.df_dict, max_bytes=self.options.join_cache_bytes, profiler=self.profiler)
+                self.mask_cache = MaskCache(self.df_dict, max_bytes=self.options.mask_cache_bytes)
+                validation_rules = RecordRules(self.df_dict, self.join_cache, self.previous_dict, self.mask_cache)  # Create an instance of your validation class
+                outcomes = (evaluate_rule(validation_rules, spec.method_name, self.profiler) for spec in plan)
+            else:
+                executor = ParallelExecutor(self.df_dict, self.options.workers, self.previous_dict, self.options.join_cache_bytes, self.profiler)
+                outcomes = executor.run(plan)
+            outcomes = itertools.chain(precomputed, outcomes)
+
+            for rule_id, dataset, positions in outcomes:
+                if validation_results.add(rule_id, dataset, positions) and report is not None:
+                    report.write(rule_id, dataset, positions)
+        finally:
+            if executor is not None:
+                executor.close()
 
+        self._store_results(cache_keys, validation_results)
         return validation_results
 
-    def generate_report(self, validation_results):
-        # Implement your report generation logic here
-        # You can save the results as an Excel file, CSV, or any other format
-        # Example:
-        writer = pd.ExcelWriter("validation_report.xlsx")
-        for rule_id, df in validation_results.items():
-            df.to_excel(writer, sheet_name=rule_id, index=False)
-        writer.save()
+    def fingerprints(self):
+        # Fingerprint of every loaded table: the hash of its CSV file, and for the earlier periods of the
+        # history rules' tables (keyed "<dataset> (previous)") the hash of their reported values
+        if self._fingerprints is None:
+            files = self.dataset_files()
+            fingerprints = {dataset: self.result_cache.file_fingerprint(files[dataset]) for dataset in self.df_dict if dataset in files}
+            for dataset, previous in self.previous_dict.items():
+                previous = self.interner.decode(previous) if self.interner is not None else previous
+                fingerprints[dataset + " (previous)"] = frame_fingerprint(previous)
+            self._fingerprints = fingerprints
+        return self._fingerprints
 
-if __name__ == "__main__":
-    validator = DataValidator("your_dataset_path.csv")
-    validation_results = validator.apply_validation_rules()
-    validator.generate_report(validation_results)
+    def _cached_outcomes(self, plan):
+        # Outcomes of the rules the result cache holds for these inputs, and the cache keys of the others
+        if self.result_cache is None:
+            return [], {}
+        outcomes, keys = [], {}
+        for spec in plan:
+            key = self.result_cache.key(spec, self.fingerprints())
+            cached = self.result_cache.get(spec.rule_id, key)
+            if cached is None:
+                keys[spec.rule_id] = key
+            else:
+                outcomes.append((spec.rule_id,) + cached)
+        return outcomes, keys
+
+    def _store_results(self, cache_keys, validation_results):
+        for rule_id, key in cache_keys.items():
+            if rule_id in validation_results.positions:
+                self.result_cache.put(rule_id, key, validation_results.datasets[rule_id], validation_results.positions[rule_id])
+
+    def _apply_partitioned(self, plan, precomputed, validation_results, report):
+        # precomputed: outcomes of the result cache and the Polars backend, written first
+        for rule_id, dataset, positions in precomputed:
+            if validation_results.add(rule_id, dataset, positions) and report is not None:
+                report.write(rule_id, dataset, positions)
+
+        # A rule run per partition that reports a table which is not split may report the same row from
+        # several partitions; it is written once all partitions are merged
+        deferred = set()
+        for agents, partition_results in self.validate_by_agent(plan):
+            for rule_id, message in partition_results.errors.items():
+                validation_results.errors[rule_id] = message
+                validation_results.positions.pop(rule_id, None)
+                validation_results.datasets.pop(rule_id, None)
+            for rule_id, positions in partition_results.positions.items():
+                dataset = partition_results.datasets[rule_id]
+                if not validation_results.merge(rule_id, dataset, positions) or report is None:
+                    continue
+                if agents is not None and dataset not in self.partitioning.rows:
+                    deferred.add(rule_id)
+                else:
+                    report.write(rule_id, dataset, positions)
+        for rule_id in deferred - set(validation_results.errors):
+            report.write(rule_id, validation_results.datasets[rule_id], validation_results.positions[rule_id])
+        return validation_results
+
+    def validate_by_agent(self, plan=None):
+        # Hash-partition the tables by observed agent into options.partitions partitions (default: 4 per worker)
+        # and run the rules on each, over the process pool when workers > 1. Yields (observed agents,
+        # ValidationResults of their violations) as soon as each partition has finished; positions refer to
+        # the full tables. Rules that cannot be split (RuleSpec.by_agent) run once over the whole tables
+        # afterwards and are yielded last, with agents None.
+        plan = plan if plan is not None else execution_plan(self.rules, available=self.df_dict)
+        partitions = self.options.partitions or 4 * (self.options.workers or os.cpu_count())
+        self.partitioning = AgentPartitioning(self.df_dict, partitions)
+        split = [spec for spec in plan if self.partitioning.runs_per_partition(spec)]
+        whole = [spec for spec in plan if not self.partitioning.runs_per_partition(spec)]
+
+        executor = None
+        try:
+            if self.options.workers == 1:
+                finished = (
+                    (number, run_partition(RecordRules, self.df_dict, self.previous_dict, self.partitioning, number, split,
+                                           self.options.join_cache_bytes, self.profiler))
+                    for number in self.partitioning.non_empty()
+                )
+            else:
+                executor = PartitionedExecutor(self.df_dict, self.partitioning, self.options.workers, self.previous_dict,
+                                               self.options.join_cache_bytes, self.profiler)
+                finished = executor.run(split)
+            for number, outcomes in finished:
+                yield self._agents(self.partitioning.agents[number]), self._results(outcomes)
+        finally:
+            if executor is not None:
+                executor.close()
+
+        if whole:
+            join_cache = JoinCache(self.df_dict, max_bytes=self.options.join_cache_bytes, profiler=self.profiler)
+            validation_rules = RecordRules(self.df_dict, join_cache, self.previous_dict)
+            yield None, self._results(evaluate_rule(validation_rules, spec.method_name, self.profiler) for spec in whole)
+
+    def _results(self, outcomes):
+        results = ValidationResults(self.df_dict)
+        for rule_id, dataset, positions in outcomes:
+            results.add(rule_id, dataset, positions)
+        return results
+
+    def _agents(self, agents):
+        # Reported observed agent identifiers of a partition
+        agents = pd.Series(sorted(agents))
+        if self.interner is not None and IdentifierDomain.OBSERVED_AGENT in self.interner.domains and pd.api.types.is_integer_dtype(agents.dtype):
+            agents = self.interner.decode_column(agents, IdentifierDomain.OBSERVED_AGENT)
+        return agents.tolist()
+
+    def apply_sql_rules(self, database_path=None, chunksize=1_000_000):
+        # Run the selected rules that have an SQL equivalent (sqlite_backend.SQL_RULES) inside a SQLite
+        # database staged from the CSV files, for submissions that do not fit in memory (options.streaming
+        # skips the pandas load) or to cross-check the pandas results. The database defaults to
+        # "record_rules.sqlite" next to the CSV files.
+        self.options.require_serial("apply_sql_rules()")
+        database_path = database_path if database_path is not None else default_database_path(self.dataset_path)
+        rule_ids = [spec.rule_id for spec in self.rules]
+        validation_results = ValidationResults(self.df_dict)
+        with SQLiteBackend(database_path, self.schemas, self.profiler) as backend:
+            backend.stage(self.dataset_files(), rule_ids, chunksize, load_rule_texts(self.template_path))
+            for rule_id, dataset, positions in backend.run(rule_ids):
+                validation_results.add(rule_id, dataset, positions)
+        return validation_results
+
+    def report(self, output_dir, file_format="parquet"):
+        # Long-format violation files under output_dir, see ViolationReport
+        return ViolationReport(output_dir, self.df_dict, load_rule_texts(self.template_path), self.interner, file_format,
+                               profiler=self.profiler)
+
+    def profile_summary(self, top=None):
+        # Time per stage, then the slowest load/parse/join/filter/report steps first
+        return self.profiler.summary(top)
+
+    def write_profile(self, path):
+        return self.profiler.to_json(path)
+
+    def generate_report(self, validation_results, output_dir="validation_report", file_format="parquet"):
+        # Write the violations of a finished run in long format plus "summary.xlsx" with per-rule and
+        # per-observed-agent counts; returns the summary path. To write while the rules run instead, pass
+        # self.report(output_dir) to apply_validation_rules() and close() it afterwards.
+        report = self.report(output_dir, file_format)
+        for rule_id in validation_results.rule_ids:
+            report.write(rule_id, validation_results.datasets[rule_id], validation_results.positions[rule_id])
+        return report.close()
 
 class RecordRules():
-    def __init__(self, df_dict: dict):
+    def __init__(self, df_dict: dict, join_cache: JoinCache = None, previous_dict: dict = None, mask_cache: MaskCache = None):
         self.df_dict = df_dict
+        self.join_cache = join_cache if join_cache is not None else JoinCache(df_dict)
+        self.masks = mask_cache if mask_cache is not None else MaskCache(df_dict)  # single-column predicates shared by the rules
+        self.temporal = TemporalEngine(df_dict, previous_dict)  # one sorted (identifier, reference date) view per dataset
+        self.roles = RoleEngine(df_dict)  # role bitmasks per Counterparty-instrument key, shared by the role rules
 
+    @rule("CR001", RuleCategory.CRITICAL, {
+        "Counterparty-instrument": ["Counterparty identifier"],
+        "Counterparty-reference": ["Counterparty identifier"],
+    })
     def CR001(self):
         #[Counterparty-instrument.Counterparty identifier] EXISTS IN {[Counterparty reference.Counterparty identifier]}
         df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         df_counterparty_reference = self.df_dict["Counterparty-reference"]
         
-        reference_identifiers = set(df_counterparty_reference["Counterparty identifier"])
+        # Rows without a Counterparty-reference record (anti-join on the identifier)
+        invalid_rows = df_counterparty_instrument.take(anti_join(
+            df_counterparty_instrument, ["Counterparty identifier"], df_counterparty_reference, ["Counterparty identifier"]
+        ))
         
-        invalid_rows = df_counterparty_instrument[~df_counterparty_instrument["Counterparty identifier"].isin(reference_identifiers)]
-        
-        return "CR001", "Counterparty-reference", invalid_rows
+        return "CR001", "Counterparty-instrument", invalid_rows
     
+    @rule("CR002", RuleCategory.CRITICAL, {
+        "Joint liabilities": ["Counterparty identifier"],
+        "Counterparty-reference": ["Counterparty identifier"],
+    })
     def CR002(self):
         #[Joint liabilities.Counterparty identifier] EXISTS IN {[Counterparty reference.Counterparty identifier]}
         df_joint_liabilities = self.df_dict["Joint liabilities"]
         df_counterparty_reference = self.df_dict["Counterparty-reference"]
         
-        reference_identifiers = set(df_counterparty_reference["Counterparty identifier"])
-        
-        invalid_rows = df_joint_liabilities[~df_joint_liabilities["Counterparty identifier"].isin(reference_identifiers)]
+        # Rows without a Counterparty-reference record (anti-join on the identifier)
+        invalid_rows = df_joint_liabilities.take(anti_join(
+            df_joint_liabilities, ["Counterparty identifier"], df_counterparty_reference, ["Counterparty identifier"]
+        ))
         
-        return "CR002", "Counterparty-reference", invalid_rows
+        return "CR002", "Joint liabilities", invalid_rows
     
+    @rule("CR003", RuleCategory.CRITICAL, {
+        "Counterparty risk": ["Counterparty identifier"],
+        "Counterparty-reference": ["Counterparty identifier"],
+    })
     def CR003(self):
         #[Counterparty risk.Counterparty identifier] EXISTS IN {[Counterparty reference.Counterparty identifier]}
         df_counterparty_risk = self.df_dict["Counterparty risk"]
         df_counterparty_reference = self.df_dict["Counterparty-reference"]
         
-        reference_identifiers = set(df_counterparty_reference["Counterparty identifier"])
+        # Rows without a Counterparty-reference record (anti-join on the identifier)
+        invalid_rows = df_counterparty_risk.take(anti_join(
+            df_counterparty_risk, ["Counterparty identifier"], df_counterparty_reference, ["Counterparty identifier"]
+        ))
         
-        invalid_rows = df_counterparty_risk[~df_counterparty_risk["Counterparty identifier"].isin(reference_identifiers)]
-        
-        return "CR003", "Counterparty risk", invalid_rows    
+        return "CR003", "Counterparty risk", invalid_rows
     
+    @rule("CR004", RuleCategory.CRITICAL, {
+        "Counterparty default": ["Counterparty identifier"],
+        "Counterparty-reference": ["Counterparty identifier"],
+    })
     def CR004(self):
         #[Counterparty default.Counterparty identifier] EXISTS IN {[Counterparty reference.Counterparty identifier]}
         df_counterparty_default = self.df_dict["Counterparty default"]
         df_counterparty_reference = self.df_dict["Counterparty-reference"]
         
-        reference_identifiers = set(df_counterparty_reference["Counterparty identifier"])
-        
-        invalid_rows = df_counterparty_default[~df_counterparty_default["Counterparty identifier"].isin(reference_identifiers)]
+        # Rows without a Counterparty-reference record (anti-join on the identifier)
+        invalid_rows = df_counterparty_default.take(anti_join(
+            df_counterparty_default, ["Counterparty identifier"], df_counterparty_reference, ["Counterparty identifier"]
+        ))
         
         return "CR004", "Counterparty default", invalid_rows
     
+    @rule("CR005", RuleCategory.CRITICAL, {
+        "Protection received": ["Protection provider identifier"],
+        "Counterparty-reference": ["Counterparty identifier"],
+    })
     def CR005(self):
         #[Protection received.Protection provider identifier] EXISTS IN {[Counterparty reference.Counterparty identifier]}
         df_protection_received = self.df_dict["Protection received"]
         df_counterparty_reference = self.df_dict["Counterparty-reference"]
         
-        reference_identifiers = set(df_counterparty_reference["Counterparty identifier"])
-        
-        invalid_rows = df_protection_received[~df_protection_received["Protection provider identifier"].isin(reference_identifiers)]
+        # Rows without a Counterparty-reference record (anti-join on the identifier)
+        invalid_rows = df_protection_received.take(anti_join(
+            df_protection_received, ["Protection provider identifier"], df_counterparty_reference, ["Counterparty identifier"]
+        ))
         
         return "CR005", "Protection received", invalid_rows
     
 
+    @rule("CPC001", RuleCategory.COUNTERPARTY_CONSISTENCY, {
+        "Counterparty-instrument": ["Counterparty identifier", "Counterparty role"],
+        "Counterparty-reference": ["Counterparty identifier", "Role 3 Creditor"],
+    })
     def CPC001(self):
         #[Counterparty-instrument.Counterparty role] = 'Creditor' => [Counterparty reference.Role 3 Creditor] = 'True'
-        df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
-        df_counterparty_reference = self.df_dict["Counterparty-reference"]
-        
         # Merge the DataFrames on "Counterparty identifier"
-        merged_df = pd.merge(
-            df_counterparty_instrument,
-            df_counterparty_reference,
-            on="Counterparty identifier",
-            how="left"
-        )
+        merged_df = self.join_cache.merge("Counterparty-instrument", "Counterparty-reference", on="Counterparty identifier", how="left")
         
         # Filter rows where "Counterparty role" is 'Creditor' and "Role 3 Creditor" is not 'True'
         invalid_rows = merged_df[
-            (merged_df["Counterparty role"] == 'Creditor') &
+            ((self.roles.bits(merged_df["Counterparty role"]) & CREDITOR) != 0) &
             (merged_df["Role 3 Creditor"] != 'True')
         ]
         
         return "CPC001", "Counterparty-instrument", invalid_rows
 
+    @rule("CPC002", RuleCategory.COUNTERPARTY_CONSISTENCY, {
+        "Counterparty-instrument": ["Counterparty identifier", "Counterparty role"],
+        "Counterparty-reference": ["Counterparty identifier", "Role 4 Debtor - All instruments originated prior to 1 September 2018", "Role 4 Debtor - At least one instrument originated at or after 1 September 2018"],
+    })
     def CPC002(self):
         # IF [Counterparty-instrument.Counterparty role] = 'Debtor' THEN
         # [Counterparty reference.Role 4 Debtor - All instruments originated prior to 1 September 2018] = 'True'
         # OR [Counterparty reference.Role 4 Debtor - At least one instrument originated at or after 1 September 2018] = 'TRUE'
-        df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
-        df_counterparty_reference = self.df_dict["Counterparty-reference"]
-        
         # Merge the DataFrames on "Counterparty identifier"
-        merged_df = pd.merge(
-            df_counterparty_instrument,
-            df_counterparty_reference,
-            on="Counterparty identifier",
-            how="left"
-        )
+        merged_df = self.join_cache.merge("Counterparty-instrument", "Counterparty-reference", on="Counterparty identifier", how="left")
         
         # Filter rows where "Counterparty role" is 'Debtor' and the specified conditions are not met
         invalid_rows = merged_df[
-            (merged_df["Counterparty role"] == 'Debtor') &
+            ((self.roles.bits(merged_df["Counterparty role"]) & DEBTOR) != 0) &
             ~(
                 (merged_df["Role 4 Debtor - All instruments originated prior to 1 September 2018"] == 'True') |
                 (merged_df["Role 4 Debtor - At least one instrument originated at or after 1 September 2018"] == 'TRUE')
@@ -159,57 +508,50 @@ class RecordRules():
         
         return "CPC002", "Counterparty-instrument", invalid_rows
 
+    @rule("CPC003", RuleCategory.COUNTERPARTY_CONSISTENCY, {
+        "Counterparty-instrument": ["Counterparty identifier", "Counterparty role"],
+        "Counterparty-reference": ["Counterparty identifier", "Role 10 Originator"],
+    })
     def CPC003(self):
         #[Counterparty-instrument.Counterparty role] = 'Originator' => [Counterparty reference.Role 10 Originator] = 'True'
-        df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
-        df_counterparty_reference = self.df_dict["Counterparty-reference"]
-        
         # Merge the DataFrames on "Counterparty identifier"
-        merged_df = pd.merge(
-            df_counterparty_instrument,
-            df_counterparty_reference,
-            on="Counterparty identifier",
-            how="left"
-        )
+        merged_df = self.join_cache.merge("Counterparty-instrument", "Counterparty-reference", on="Counterparty identifier", how="left")
         
         # Filter rows where "Counterparty role" is 'Originator' and "Role 10 Originator" is not 'True'
         invalid_rows = merged_df[
-            (merged_df["Counterparty role"] == 'Originator') &
+            ((self.roles.bits(merged_df["Counterparty role"]) & ORIGINATOR) != 0) &
             (merged_df["Role 10 Originator"] != 'True')
         ]
         
         return "CPC003", "Counterparty-instrument", invalid_rows
 
+    @rule("CPC004", RuleCategory.COUNTERPARTY_CONSISTENCY, {
+        "Counterparty-instrument": ["Counterparty identifier", "Counterparty role"],
+        "Counterparty-reference": ["Counterparty identifier", "Role 11 Servicer"],
+    })
     def CPC004(self):
-            #[Counterparty-instrument.Counterparty role] = 'Servicer' => [Counterparty reference.Role 11 Servicer] = 'True'
-            df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
-            df_counterparty_reference = self.df_dict["Counterparty-reference"]
-            
-            # Merge the DataFrames on "Counterparty identifier"
-            merged_df = pd.merge(
-                df_counterparty_instrument,
-                df_counterparty_reference,
-                on="Counterparty identifier",
-                how="left"
-            )
-            
-            # Filter rows where "Counterparty role" is 'Servicer' and "Role 11 Servicer" is not 'True'
-            invalid_rows = merged_df[
-                (merged_df["Counterparty role"] == 'Servicer') &
-                (merged_df["Role 11 Servicer"] != 'True')
-            ]
-            
-            return "CPC004", "Counterparty-instrument", invalid_rows
+        #[Counterparty-instrument.Counterparty role] = 'Servicer' => [Counterparty reference.Role 11 Servicer] = 'True'
+        # Merge the DataFrames on "Counterparty identifier"
+        merged_df = self.join_cache.merge("Counterparty-instrument", "Counterparty-reference", on="Counterparty identifier", how="left")
+        
+        # Filter rows where "Counterparty role" is 'Servicer' and "Role 11 Servicer" is not 'True'
+        invalid_rows = merged_df[
+            ((self.roles.bits(merged_df["Counterparty role"]) & SERVICER) != 0) &
+            (merged_df["Role 11 Servicer"] != 'True')
+        ]
+        
+        return "CPC004", "Counterparty-instrument", invalid_rows
 
+    @rule("CPC005", RuleCategory.COUNTERPARTY_CONSISTENCY, {
+        "Protection received": ["Protection provider identifier"],
+        "Counterparty-reference": ["Counterparty identifier", "Role 6 Protection provider"],
+    })
     def CPC005(self):
         #[Protection received.Protection provider identifier] NOT IN {'Not applicable', 'Not required'} => [Counterparty referece.Role 6 Protection provider] = 'True'
-        df_protection_received = self.df_dict["Protection received"]
-        df_counterparty_reference = self.df_dict["Counterparty-reference"]
-        
         # Merge the DataFrames on "Counterparty identifier"
-        merged_df = pd.merge(
-            df_protection_received,
-            df_counterparty_reference,
+        merged_df = self.join_cache.merge(
+            "Protection received",
+            "Counterparty-reference",
             left_on="Protection provider identifier",
             right_on="Counterparty identifier",
             how="left"
@@ -218,12 +560,15 @@ class RecordRules():
         # Filter rows where "Protection provider identifier" is not in the specified values
         # and "Role 6 Protection provider" is not 'True'
         invalid_rows = merged_df[
-            (~merged_df["Protection provider identifier"].isin(['Not applicable', 'Not required'])) &
+            (~is_sentinel(merged_df, "Protection provider identifier")) &
             (merged_df["Role 6 Protection provider"] != 'True')
         ]
 
-        return "CPC005", "Protection received and Counterparty-reference", invalid_rows
+        return "CPC005", "Protection received", invalid_rows
 
+    @rule("CN0010", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Inception date", "Settlement date"],
+    }, row_local=True)
     def CN0010(self):
         # 'Checks that if the value reported for attribute [Settlement date] is not equal to 'Non-applicable' {'NA'},
         # then the value reported for [Settlement date] should be greater than or equal to the value reported
@@ -233,13 +578,16 @@ class RecordRules():
         
         # Filter rows where "Settlement date" is not in the specified values and "Settlement date" is less than "Inception date"
         invalid_rows = df_instrument[
-            (~df_instrument["Settlement date"].isin(['Not applicable', 'Not required'])) &
+            (~self.masks.sentinel("Instrument", "Settlement date")) &
             (df_instrument["Settlement date"] < df_instrument["Inception date"])
         ]
         
         return "CN0010", "Instrument", invalid_rows
     
 
+    @rule("CN0030", RuleCategory.CONSISTENCY, {
+        "Instrument": ["End date of interest-only period", "Inception date"],
+    }, row_local=True)
     def CN0030(self):
         # 'IF [Instrument.End date of interest-only period] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Instrument.End date of interest-only period] >= [Instrument.Inception date]'
@@ -249,12 +597,15 @@ class RecordRules():
         # Filter rows where "End date of interest-only period" is not in the specified values
         # and "End date of interest-only period" is less than "Inception date"
         invalid_rows = df_instrument[
-            (~df_instrument["End date of interest-only period"].isin(['Not applicable', 'Not required'])) &
+            (~self.masks.sentinel("Instrument", "End date of interest-only period")) &
             (df_instrument["End date of interest-only period"] < df_instrument["Inception date"])
         ]
         
         return "CN0030", "Instrument", invalid_rows
     
+    @rule("CN0040", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Legal final maturity date", "Settlement date"],
+    }, row_local=True)
     def CN0040(self):
         # 'IF [Instrument.Legal final maturity date] NOT IN {‘Not applicable’, 'Not required'} AND
         # [Instrument.Settlement date] NOT IN {‘Not applicable’, 'Not required'} THEN
@@ -265,13 +616,16 @@ class RecordRules():
         # Filter rows where both "Legal final maturity date" and "Settlement date" are not in the specified values
         # and "Legal final maturity date" is less than "Settlement date"
         invalid_rows = df_instrument[
-            (~df_instrument["Legal final maturity date"].isin(['Not applicable', 'Not required'])) &
-            (~df_instrument["Settlement date"].isin(['Not applicable', 'Not required'])) &
+            (~self.masks.sentinel("Instrument", "Legal final maturity date")) &
+            (~self.masks.sentinel("Instrument", "Settlement date")) &
             (df_instrument["Legal final maturity date"] < df_instrument["Settlement date"])
         ]
         
         return "CN0040", "Instrument", invalid_rows
     
+    @rule("CN0050", RuleCategory.CONSISTENCY, {
+        "Instrument": ["End date of interest-only period", "Legal final maturity date"],
+    }, row_local=True)
     def CN0050(self):
         # 'IF [Instrument.Legal final maturity date] NOT IN {‘Not applicable’, 'Not required'} AND
         # [Instrument.End date of interest-only period] NOT IN {‘Not applicable’, 'Not required'} THEN 
@@ -282,41 +636,40 @@ class RecordRules():
         # Filter rows where both "Legal final maturity date" and "End date of interest-only period" are not in the specified values
         # and "Legal final maturity date" is less than "End date of interest-only period"
         invalid_rows = df_instrument[
-            (~df_instrument["Legal final maturity date"].isin(['Not applicable', 'Not required'])) &
-            (~df_instrument["End date of interest-only period"].isin(['Not applicable', 'Not required'])) &
+            (~self.masks.sentinel("Instrument", "Legal final maturity date")) &
+            (~self.masks.sentinel("Instrument", "End date of interest-only period")) &
             (df_instrument["Legal final maturity date"] < df_instrument["End date of interest-only period"])
         ]
         
         return "CN0050", "Instrument", invalid_rows
     
    
+    @rule("CN0080", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Legal final maturity date"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Next interest rate reset date"],
+    })
     def CN0080(self):
         # 'IF [Financial.Next interest rate reset date] NOT IN {‘Not applicable’, 'Not required'} AND
         # [Instrument.Legal final maturity date] NOT IN {‘Not applicable’, 'Not required'} AND 
         # [Instrument.Legal final maturity date] > [Instrument.Reference date] THEN
         # [Instrument.Legal final maturity date] >= [Financial.Next interest rate reset date]'
         
-        df_instrument = self.df_dict["Instrument"]
-        df_financial = self.df_dict["Financial"]
-        
-        # Merge the "Instrument" and "Financial" DataFrames on the common key "Instrument identifier"
-        merged_df = pd.merge(
-            df_instrument,
-            df_financial,
-            on="Instrument identifier",
-            how="left"
-        )
+        # Merge the "Instrument" and "Financial" DataFrames on the instrument and its reference date
+        merged_df = self.join_cache.merge("Instrument", "Financial", on=["Reference date"] + INSTRUMENT_KEY, how="left")
         
         # Filter rows where the specified conditions are not met
         invalid_rows = merged_df[
-            (~merged_df["Financial.Next interest rate reset date"].isin(['Not applicable', 'Not required'])) &
-            (~merged_df["Instrument.Legal final maturity date"].isin(['Not applicable', 'Not required'])) &
-            (merged_df["Instrument.Legal final maturity date"] > merged_df["Instrument.Reference date"]) &
-            (merged_df["Instrument.Legal final maturity date"] < merged_df["Financial.Next interest rate reset date"])
+            (~is_sentinel(merged_df, "Next interest rate reset date")) &
+            (~is_sentinel(merged_df, "Legal final maturity date")) &
+            (merged_df["Legal final maturity date"] > merged_df["Reference date"]) &
+            (merged_df["Legal final maturity date"] < merged_df["Next interest rate reset date"])
         ]
         
-        return "CN0080", "Instrument and Financial", invalid_rows
+        return "CN0080", "Instrument", invalid_rows
     
+    @rule("CN0140", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Inception date", "Reference date"],
+    }, row_local=True)
     def CN0140(self):
         # '[Instrument.Reference date] >= [Instrument.Inception date]'
         
@@ -327,6 +680,9 @@ class RecordRules():
         
         return "CN0140", "Instrument", invalid_rows
 
+    @rule("CN0141", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date", "Settlement date"],
+    }, row_local=True)
     def CN0141(self):
         # 'IF [Instrument.Settlement date] <> ‘Non-applicable’ THEN [Instrument.Reference date] >= [Instrument.Settlement date]'
         
@@ -334,12 +690,15 @@ class RecordRules():
         
         # Filter rows where "Settlement date" is not 'Non-applicable' and "Reference date" is less than "Settlement date"
         invalid_rows = df_instrument[
-            (df_instrument["Settlement date"] != 'Non-applicable') &
+            (~self.masks.sentinel("Instrument", "Settlement date", [NON_APPLICABLE])) &
             (df_instrument["Reference date"] < df_instrument["Settlement date"])
         ]
         
         return "CN0141", "Instrument", invalid_rows
 
+    @rule("CN0142", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Date of original protection value", "Date of protection value"],
+    }, row_local=True)
     def CN0142(self):
         # '[Protection received. Date of protection value] >= [Protection received.Date of original protection value]'
         
@@ -351,105 +710,92 @@ class RecordRules():
         return "CN0142", "Protection received", invalid_rows            
 
     
+    @rule("CN0150", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Inception date"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Next interest rate reset date"],
+    })
     def CN0150(self):
         # 'IF [Financial.Next interest rate reset date] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Next interest rate reset date] >= [Instrument.Inception date]'
         
-        df_instrument = self.df_dict["Instrument"]
-        df_financial = self.df_dict["Financial"]
-        
-        # Merge the "Instrument" and "Financial" DataFrames on the common key "Instrument identifier"
-        merged_df = pd.merge(
-            df_instrument,
-            df_financial,
-            on="Instrument identifier",
-            how="left"
-        )
+        # Merge the "Instrument" and "Financial" DataFrames on the instrument and its reference date
+        merged_df = self.join_cache.merge("Instrument", "Financial", on=["Reference date"] + INSTRUMENT_KEY, how="left")
         
         # Filter rows where "Next interest rate reset date" is not in the specified values
         # and "Next interest rate reset date" is less than "Inception date"
         invalid_rows = merged_df[
-            (~merged_df["Financial.Next interest rate reset date"].isin(['Not applicable', 'Not required'])) &
-            (merged_df["Financial.Next interest rate reset date"] < merged_df["Instrument.Inception date"])
+            (~is_sentinel(merged_df, "Next interest rate reset date")) &
+            (merged_df["Next interest rate reset date"] < merged_df["Inception date"])
         ]
         
-        return "CN0150", "Instrument and Financial", invalid_rows
+        return "CN0150", "Instrument", invalid_rows
     
+    @rule("CN0160", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Inception date"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Date of the default status of the instrument"],
+    })
     def CN0160(self):
         # 'IF [Financial.Date of the default status of the instrument] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Date of the default status of the instrument] >= [Instrument.Inception date]'
         
-        df_instrument = self.df_dict["Instrument"]
-        df_financial = self.df_dict["Financial"]
-        
-        # Merge the "Instrument" and "Financial" DataFrames on the common key "Instrument identifier"
-        merged_df = pd.merge(
-            df_instrument,
-            df_financial,
-            on="Instrument identifier",
-            how="left"
-        )
+        # Merge the "Instrument" and "Financial" DataFrames on the instrument and its reference date
+        merged_df = self.join_cache.merge("Instrument", "Financial", on=["Reference date"] + INSTRUMENT_KEY, how="left")
         
         # Filter rows where "Date of the default status of the instrument" is not in the specified values
         # and "Date of the default status of the instrument" is less than "Inception date"
         invalid_rows = merged_df[
-            (~merged_df["Financial.Date of the default status of the instrument"].isin(['Not applicable', 'Not required'])) &
-            (merged_df["Financial.Date of the default status of the instrument"] < merged_df["Instrument.Inception date"])
+            (~is_sentinel(merged_df, "Date of the default status of the instrument")) &
+            (merged_df["Date of the default status of the instrument"] < merged_df["Inception date"])
         ]
         
-        return "CN0160", "Instrument and Financial", invalid_rows
+        return "CN0160", "Instrument", invalid_rows
 
+    @rule("CN0170", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Inception date"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Date of past due for the instrument"],
+    })
     def CN0170(self):
         # 'IF [Financial.Date of past due for the instrument] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Date of past due for the instrument] >= [Instrument.Inception date]'
         
-        df_instrument = self.df_dict["Instrument"]
-        df_financial = self.df_dict["Financial"]
-        
-        # Merge the "Instrument" and "Financial" DataFrames on the common key "Instrument identifier"
-        merged_df = pd.merge(
-            df_instrument,
-            df_financial,
-            on="Instrument identifier",
-            how="left"
-        )
+        # Merge the "Instrument" and "Financial" DataFrames on the instrument and its reference date
+        merged_df = self.join_cache.merge("Instrument", "Financial", on=["Reference date"] + INSTRUMENT_KEY, how="left")
         
         # Filter rows where "Date of past due for the instrument" is not in the specified values
         # and "Date of past due for the instrument" is less than "Inception date"
         invalid_rows = merged_df[
-            (~merged_df["Financial.Date of past due for the instrument"].isin(['Not applicable', 'Not required'])) &
-            (merged_df["Financial.Date of past due for the instrument"] < merged_df["Instrument.Inception date"])
+            (~is_sentinel(merged_df, "Date of past due for the instrument")) &
+            (merged_df["Date of past due for the instrument"] < merged_df["Inception date"])
         ]
         
-        return "CN0170", "Instrument and Financial", invalid_rows
+        return "CN0170", "Instrument", invalid_rows
 
+    @rule("CN0200", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Settlement date"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Next interest rate reset date"],
+    })
     def CN0200(self):
         # 'IF [Financial.Next interest rate reset date] NOT IN {‘Not applicable’, 'Not required'} AND
         # [Instrument.Settlement date] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Next interest reset date] >= [Instrument.Settlement date]'
         
-        df_instrument = self.df_dict["Instrument"]
-        df_financial = self.df_dict["Financial"]
-        
-        # Merge the "Instrument" and "Financial" DataFrames on the common key "Instrument identifier"
-        merged_df = pd.merge(
-            df_instrument,
-            df_financial,
-            on="Instrument identifier",
-            how="left"
-        )
+        # Merge the "Instrument" and "Financial" DataFrames on the instrument and its reference date
+        merged_df = self.join_cache.merge("Instrument", "Financial", on=["Reference date"] + INSTRUMENT_KEY, how="left")
         
         # Filter rows where "Next interest rate reset date" is not in the specified values
         # and "Settlement date" is not in the specified values
         # and "Next interest rate reset date" is less than "Settlement date"
         invalid_rows = merged_df[
-            (~merged_df["Financial.Next interest rate reset date"].isin(['Not applicable', 'Not required'])) &
-            (~merged_df["Instrument.Settlement date"].isin(['Not applicable', 'Not required'])) &
-            (merged_df["Financial.Next interest rate reset date"] < merged_df["Instrument.Settlement date"])
+            (~is_sentinel(merged_df, "Next interest rate reset date")) &
+            (~is_sentinel(merged_df, "Settlement date")) &
+            (merged_df["Next interest rate reset date"] < merged_df["Settlement date"])
         ]
         
-        return "CN0200", "Instrument and Financial", invalid_rows
+        return "CN0200", "Instrument", invalid_rows
 
+    @rule("CN0210", RuleCategory.CONSISTENCY, {
+        "Financial": ["Next interest rate reset date", "Reference date"],
+    }, row_local=True)
     def CN0210(self):
         # 'IF [Financial.Next interest rate reset date] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Next interest rate reset date] >= [Financial.Reference date]'
@@ -459,12 +805,15 @@ class RecordRules():
         # Filter rows where "Next interest rate reset date" is not in the specified values
         # and "Next interest rate reset date" is less than "Reference date"
         invalid_rows = df_financial[
-            (~df_financial["Financial.Next interest rate reset date"].isin(['Not applicable', 'Not required'])) &
-            (df_financial["Financial.Next interest rate reset date"] < df_financial["Financial.Reference date"])
+            (~self.masks.sentinel("Financial", "Next interest rate reset date")) &
+            (df_financial["Next interest rate reset date"] < df_financial["Reference date"])
         ]
         
         return "CN0210", "Financial", invalid_rows
 
+    @rule("CN0220", RuleCategory.CONSISTENCY, {
+        "Instrument": ["End date of interest-only period", "Settlement date"],
+    }, row_local=True)
     def CN0220(self):
         # 'IF [Instrument.End date of interest-only period] NOT IN {‘Not applicable’, 'Not required'} AND
         # [Instrument.Settlement date] NOT IN {‘Not applicable’, 'Not required'} THEN
@@ -476,48 +825,52 @@ class RecordRules():
         # and "Settlement date" is not in the specified values
         # and "End date of interest-only period" is less than "Settlement date"
         invalid_rows = df_instrument[
-            (~df_instrument["Instrument.End date of interest-only period"].isin(['Not applicable', 'Not required'])) &
-            (~df_instrument["Instrument.Settlement date"].isin(['Not applicable', 'Not required'])) &
-            (df_instrument["Instrument.End date of interest-only period"] < df_instrument["Instrument.Settlement date"])
+            (~self.masks.sentinel("Instrument", "End date of interest-only period")) &
+            (~self.masks.sentinel("Instrument", "Settlement date")) &
+            (df_instrument["End date of interest-only period"] < df_instrument["Settlement date"])
         ]
         
         return "CN0220", "Instrument", invalid_rows
 
+    @rule("CN0230", RuleCategory.CONSISTENCY, {
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Type of securitisation"],
+        "Instrument-protection received": ["Reference date"] + INSTRUMENT_KEY + ["Protection identifier"],
+        "Protection received": ["Reference date"] + PROTECTION_KEY + ["Type of protection"],
+    })
     def CN0230(self):
         # 'IF [Financial.Type of securitisation]='Synthetic securitisation' THEN EXISTS protection item such that
         # [Protection received.Type of protection] IN {'Credit derivatives', 'Financial guarantees other than credit derivatives',
         # 'Currency and deposits', 'Securities'}'
         
         df_financial = self.df_dict["Financial"]
+        df_instrument_protection_received = self.df_dict["Instrument-protection received"]
         df_protection_received = self.df_dict["Protection received"]
         
-        # Filter rows where "Type of securitisation" is 'Synthetic securitisation'
-        synthetic_securitisation = df_financial[df_financial["Financial.Type of securitisation"] == 'Synthetic securitisation']
-        
-        # Filter protection received items where "Type of protection" is in the specified values
-        valid_protection_items = df_protection_received[
-            df_protection_received["Protection received.Type of protection"].isin([
+        # Links of instruments to such a protection item (semi-join on the protection and its reference date)
+        covered = key_isin(
+            df_instrument_protection_received, ["Reference date"] + PROTECTION_KEY,
+            df_protection_received, ["Reference date"] + PROTECTION_KEY,
+            build_mask=self.masks.isin("Protection received", "Type of protection", [
                 'Credit derivatives',
                 'Financial guarantees other than credit derivatives',
                 'Currency and deposits',
                 'Securities'
             ])
-        ]
-        
-        # Merge the synthetic securitisation and valid protection items DataFrames on the common key "Instrument identifier"
-        merged_df = pd.merge(
-            synthetic_securitisation,
-            valid_protection_items,
-            on="Instrument identifier",
-            how="inner"
         )
         
-        # If there are any rows in the merged DataFrame, the condition is met
-        if not merged_df.empty:
-            return "CN0230", "Financial and Protection received", merged_df
-        else:
-            return "CN0230", "Financial and Protection received", pd.DataFrame(columns=df_financial.columns)  # Empty DataFrame
+        # Synthetic securitisations without such a link (anti-join on the instrument and its reference date)
+        invalid_rows = df_financial.take(anti_join(
+            df_financial, ["Reference date"] + INSTRUMENT_KEY, df_instrument_protection_received, ["Reference date"] + INSTRUMENT_KEY,
+            probe_mask=self.masks.mask("Financial", "Type of securitisation", "==", 'Synthetic securitisation'),
+            build_mask=covered
+        ))
+        
+        return "CN0230", "Financial", invalid_rows
         
+
+    @rule("CN0240", RuleCategory.CONSISTENCY, {
+        "Financial": ["Date of the default status of the instrument", "Reference date"],
+    }, row_local=True)
     def CN0240(self):
         # 'IF [Financial.Date of the default status of the instrument] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Reference date] >= [Financial.Date of the default status of the instrument]'
@@ -527,12 +880,15 @@ class RecordRules():
         # Filter rows where "Date of the default status of the instrument" is not in the specified values
         # and "Reference date" is less than "Date of the default status of the instrument"
         invalid_rows = df_financial[
-            (~df_financial["Financial.Date of the default status of the instrument"].isin(['Not applicable', 'Not required'])) &
-            (df_financial["Financial.Reference date"] < df_financial["Financial.Date of the default status of the instrument"])
+            (~self.masks.sentinel("Financial", "Date of the default status of the instrument")) &
+            (df_financial["Reference date"] < df_financial["Date of the default status of the instrument"])
         ]
         
         return "CN0240", "Financial", invalid_rows    
 
+    @rule("CN0250", RuleCategory.CONSISTENCY, {
+        "Financial": ["Date of past due for the instrument", "Reference date"],
+    }, row_local=True)
     def CN0250(self):
         # 'IF [Financial.Date of past due for the instrument] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Reference date] >= [Financial.Date of past due for the instrument]'
@@ -542,12 +898,15 @@ class RecordRules():
         # Filter rows where "Date of past due for the instrument" is not in the specified values
         # and "Reference date" is less than "Date of past due for the instrument"
         invalid_rows = df_financial[
-            (~df_financial["Financial.Date of past due for the instrument"].isin(['Not applicable', 'Not required'])) &
-            (df_financial["Financial.Reference date"] < df_financial["Financial.Date of past due for the instrument"])
+            (~self.masks.sentinel("Financial", "Date of past due for the instrument")) &
+            (df_financial["Reference date"] < df_financial["Date of past due for the instrument"])
         ]
         
         return "CN0250", "Financial", invalid_rows
 
+    @rule("CN0270A", RuleCategory.CONSISTENCY, {
+        "Financial": ["Arrears for the instrument", "Date of past due for the instrument"],
+    }, row_local=True)
     def CN0270A(self):
         # 'IF [Financial.Date of past due for the instrument] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Financial.Arrears for the instrument] > 0'
@@ -557,12 +916,15 @@ class RecordRules():
         # Filter rows where "Date of past due for the instrument" is not in the specified values
         # and "Arrears for the instrument" is not greater than 0
         invalid_rows = df_financial[
-            (~df_financial["Financial.Date of past due for the instrument"].isin(['Not applicable', 'Not required'])) &
-            (df_financial["Financial.Arrears for the instrument"] <= 0)
+            (~self.masks.sentinel("Financial", "Date of past due for the instrument")) &
+            (self.masks.mask("Financial", "Arrears for the instrument", "<=", 0))
         ]
         
         return "CN0270A", "Financial", invalid_rows
     
+    @rule("CN0270B", RuleCategory.CONSISTENCY, {
+        "Financial": ["Arrears for the instrument", "Date of past due for the instrument"],
+    }, row_local=True)
     def CN0270B(self):
         # 'IF [Financial.Arrears for the instrument] > 0 THEN
         # [Financial.Date of past due for the instrument] NOT IN {‘Not applicable’, 'Not required'}'
@@ -572,35 +934,39 @@ class RecordRules():
         # Filter rows where "Arrears for the instrument" is greater than 0
         # and "Date of past due for the instrument" is in the specified values
         invalid_rows = df_financial[
-            (df_financial["Financial.Arrears for the instrument"] > 0) &
-            (df_financial["Financial.Date of past due for the instrument"].isin(['Not applicable', 'Not required']))
+            (self.masks.mask("Financial", "Arrears for the instrument", ">", 0)) &
+            (self.masks.sentinel("Financial", "Date of past due for the instrument"))
         ]
         
         return "CN0270B", "Financial", invalid_rows
     
+    @rule("CN0290", RuleCategory.CONSISTENCY, {
+        "Financial": INSTRUMENT_KEY + ["Reference date", "Default status of the instrument", "Date of the default status of the instrument"],
+    }, history=True)
     def CN0290(self):
         # 'Let T be the reference date,
         # IF [Financial.Default status of the instrument] (T) <> [Financial.Default status of the instrument] (T - 1)
         # THEN [Financial.Date of default status of the instrument] (T) > [Financial.Date of default status of the instrument] (T - 1)'
         
         df_financial = self.df_dict["Financial"]
+        history = self.temporal.view("Financial", INSTRUMENT_KEY, "Reference date")
         
-        # Sort the DataFrame by "Instrument identifier" and "Financial.Reference date" to prepare for comparison
-        df_financial_sorted = df_financial.sort_values(by=["Instrument identifier", "Financial.Reference date"])
-        
-        # Create a new DataFrame that shifts the "Financial.Default status of the instrument" and "Financial.Date of default status of the instrument" columns by 1 row for comparison
-        shifted_df = df_financial_sorted.groupby("Instrument identifier")[["Financial.Default status of the instrument", "Financial.Date of default status of the instrument"]].shift(1)
-        
-        # Filter rows where the current "Default status of the instrument" is different from the previous
-        # and where the current "Date of default status of the instrument" is not greater than the previous
-        invalid_rows = df_financial_sorted[
-            (df_financial_sorted["Financial.Default status of the instrument"] != shifted_df["Financial.Default status of the instrument"]) &
-            ~(df_financial_sorted["Financial.Date of default status of the instrument"] > shifted_df["Financial.Date of default status of the instrument"])
+        # Filter rows where the current "Default status of the instrument" is different from T-1
+        # and where the current "Date of the default status of the instrument" is not greater than at T-1
+        invalid_rows = df_financial[
+            history.changed("Default status of the instrument") &
+            ~(df_financial["Date of the default status of the instrument"] > history.previous("Date of the default status of the instrument")).fillna(False)
         ]
         
         return "CN0290", "Financial", invalid_rows
 
     
+
+    @rule("CN0620", RuleCategory.CONSISTENCY, {
+        "Counterparty-instrument": ["Reference date"] + INSTRUMENT_KEY + ["Counterparty identifier", "Counterparty role"],
+        "Counterparty-reference": ["Counterparty identifier", "Institutional sector"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Type of securitisation"],
+    })
     def CN0620(self):
         # 'LET [Counterparty reference.Counterparty identifier] = X.
         # IF [Counterparty reference.Institutional sector] ='Financial vehicle corporations (FVCs) engaged in securitisation transactions' 
@@ -609,40 +975,35 @@ class RecordRules():
         # AND [Counterparty-instrument.Counterparty role](X) = 'Creditor', 
         # THEN EXISTS [Counterparty-instrument.Counterparty role] = 'Originator'
         
-        df_counterparty_reference = self.df_dict["Counterparty reference"]
+        df_counterparty_reference = self.df_dict["Counterparty-reference"]
         df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
+        df_financial = self.df_dict["Financial"]
         
-        # Define X as a Counterparty identifier (you can replace X with the specific identifier you want to check)
-        X = 'Your_Counterparty_Identifier'
-        
-        # Check if the specified conditions are met
-        condition = (
-            (df_counterparty_reference["Counterparty identifier"] == X) &
-            (df_counterparty_reference["Institutional sector"] == 'Financial vehicle corporations (FVCs) engaged in securitisation transactions') &
-            (df_counterparty_reference["Counterparty identifier"] == X) &
-            (df_counterparty_instrument["Counterparty role"] == 'Creditor') &
-            (df_counterparty_reference["Counterparty identifier"] == df_counterparty_instrument["Counterparty identifier"]) &
-            (df_counterparty_reference["Counterparty identifier"] == X) &
-            (df_counterparty_reference["Financial.Type of securitisation"] == 'Traditional securitisation')
+        # Creditor rows of traditionally securitised instruments without an originator, kept if their
+        # counterparty X is an FVC engaged in securitisation (semi-join on X)
+        instrument_roles = self.roles.table(
+            "Counterparty-instrument", ["Observed agent identifier", "Contract identifier", "Instrument identifier"], "Counterparty role"
+        ).row_roles()
+        traditionally_securitised = key_isin(
+            df_counterparty_instrument, ["Reference date"] + INSTRUMENT_KEY, df_financial, ["Reference date"] + INSTRUMENT_KEY,
+            build_mask=self.masks.mask("Financial", "Type of securitisation", "==", 'Traditional securitisation')
+        ).to_numpy()
+        creditor_without_originator = (
+            ((self.roles.rows("Counterparty-instrument", "Counterparty role") & CREDITOR) != 0) &
+            ((instrument_roles & ORIGINATOR) == 0) &
+            traditionally_securitised
         )
+        invalid_rows = df_counterparty_instrument.take(semi_join(
+            df_counterparty_instrument, ["Counterparty identifier"], df_counterparty_reference, ["Counterparty identifier"],
+            probe_mask=creditor_without_originator,
+            build_mask=self.masks.mask("Counterparty-reference", "Institutional sector", "==", 'Financial vehicle corporations (FVCs) engaged in securitisation transactions')
+        ))
         
-        # If the conditions are met, check for the existence of 'Originator' role
-        if condition.any():
-            exists_originator = df_counterparty_instrument[
-                (df_counterparty_instrument["Counterparty role"] == 'Originator') &
-                (df_counterparty_instrument["Counterparty identifier"] == X)
-            ]
-            
-            # If 'Originator' exists, return the result, otherwise, return an empty DataFrame
-            if not exists_originator.empty:
-                return "CN0620", "Counterparty-instrument", exists_originator
-            else:
-                return "CN0620", "Counterparty-instrument", pd.DataFrame(columns=df_counterparty_instrument.columns)
-        
-        # If the conditions are not met, return an empty DataFrame
-        return "CN0620", "Counterparty-instrument", pd.DataFrame(columns=df_counterparty_instrument.columns)    
-
+        return "CN0620", "Counterparty-instrument", invalid_rows
 
+    @rule("CN0621", RuleCategory.CONSISTENCY, {
+        "Counterparty-instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier", "Counterparty identifier", "Counterparty role"],
+    })
     def CN0621(self):
         # 'Let A := {[Counterparty-instrument.Counterparty role]} for 
         # ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],
@@ -651,23 +1012,27 @@ class RecordRules():
         
         df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         
-        # Create a DataFrame 'A' that contains the unique combinations of columns
-        # ([Observed agent identifier], [Contract identifier], [Instrument identifier], [Counterparty identifier]) 
-        # along with the set of Counterparty roles for each combination.
-        A = df_counterparty_instrument.groupby(
-            ["Observed agent identifier", "Contract identifier", "Instrument identifier", "Counterparty identifier"]
-        )["Counterparty role"].unique().reset_index()
-        
-        # Check if 'Creditor' is in 'A' and 'Debtor' is not in 'A' for each unique combination
-        condition = A.apply(lambda row: ('Creditor' in row["Counterparty role"]) == ('Debtor' not in row["Counterparty role"]), axis=1)
+        # A as a role bitmask per ([Observed agent identifier], [Contract identifier], [Instrument identifier],
+        # [Counterparty identifier]), spread back onto the rows of each combination
+        A = self.roles.table(
+            "Counterparty-instrument",
+            ["Observed agent identifier", "Contract identifier", "Instrument identifier", "Counterparty identifier"],
+            "Counterparty role"
+        )
+        roles = A.row_roles()
         
-        # Filter the rows that satisfy the condition
-        valid_rows = A[condition]
+        # Rows of combinations that are both creditor and debtor, or neither
+        invalid_rows = df_counterparty_instrument[(A.codes >= 0) & (((roles & CREDITOR) != 0) == ((roles & DEBTOR) != 0))]
         
-        return "CN0621", "Counterparty-instrument", valid_rows
+        return "CN0621", "Counterparty-instrument", invalid_rows
 
 
     
+    @rule("CN0622", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Reference date"] + PROTECTION_KEY + ["Protection provider identifier"],
+        "Instrument-protection received": ["Reference date"] + INSTRUMENT_KEY + ["Protection identifier"],
+        "Counterparty-instrument": ["Reference date"] + INSTRUMENT_KEY + ["Counterparty identifier", "Counterparty role"],
+    })
     def CN0622(self):
         # '[Protection received.Protection provider identifier] DOES NOT EXIST IN 
         # {[Counterparty-instrument.Counterparty identifier] GIVEN THAT 
@@ -677,32 +1042,24 @@ class RecordRules():
         # [Counterparty-instrument.Instrument identifier]) AND [Counterparty-instrument.Counterparty role] = ‘Creditor’ }'
         
         df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
-        df_protection_received = self.df_dict["Protection received"]
-        df_instrument_protection_received = self.df_dict["Instrument-Protection received"]
-        
-        # Merge the "Counterparty-instrument" and "Protection received" DataFrames on the common key
-        merged_df = pd.merge(
-            df_counterparty_instrument[df_counterparty_instrument["Counterparty role"] == 'Creditor'],
-            df_protection_received,
-            left_on=["Observed agent identifier", "Contract identifier", "Instrument identifier"],
-            right_on=["Observed agent identifier", "Contract identifier", "Instrument identifier"],
-            how="inner"
-        )
         
-        # Extract the set of "Counterparty identifier" from the merged DataFrame
-        existing_protection_providers = set(merged_df["Counterparty identifier_x"])
+        # Every protection item with the instruments it protects
+        merged_df = self.join_cache.merge("Protection received", "Instrument-protection received", on=["Reference date"] + PROTECTION_KEY, how="inner")
         
-        # Get the set of all "Counterparty identifier" from "Counterparty-instrument"
-        all_counterparty_identifiers = set(df_counterparty_instrument["Counterparty identifier"])
+        # Protection items whose provider is a creditor of an instrument they protect: semi-join of
+        # (instrument key, provider) on the creditors' (instrument key, counterparty)
+        invalid_rows = merged_df.take(semi_join(
+            merged_df, ["Reference date"] + INSTRUMENT_KEY + ["Protection provider identifier"],
+            df_counterparty_instrument, ["Reference date"] + INSTRUMENT_KEY + ["Counterparty identifier"],
+            build_mask=(self.roles.rows("Counterparty-instrument", "Counterparty role") & CREDITOR) != 0
+        ))
         
-        # Calculate the set of "Counterparty identifier" that do not exist in the existing_protection_providers set
-        invalid_protection_providers = all_counterparty_identifiers.difference(existing_protection_providers)
-        
-        # Create a DataFrame to store the invalid protection providers
-        invalid_protection_providers_df = pd.DataFrame({"Counterparty identifier": list(invalid_protection_providers)})
-        
-        return "CN0622", "Counterparty-instrument", invalid_protection_providers_df
+        return "CN0622", "Protection received", invalid_rows
     
+
+    @rule("CN0630", RuleCategory.CONSISTENCY, {
+        "Counterparty default": ["Date of the default status of the counterparty", "Reference date"],
+    }, row_local=True)
     def CN0630(self):
         # 'IF [Counterparty default.Date of the default status of the counterparty] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Counterparty default.Reference date] >= [Counterparty default.Date of the default status of the counterparty]'
@@ -712,12 +1069,15 @@ class RecordRules():
         # Filter rows where "Date of the default status of the counterparty" is not in the specified values
         # and "Reference date" is less than "Date of the default status of the counterparty"
         invalid_rows = df_counterparty_default[
-            (~df_counterparty_default["Counterparty default.Date of the default status of the counterparty"].isin(['Not applicable', 'Not required'])) &
-            (df_counterparty_default["Counterparty default.Reference date"] < df_counterparty_default["Counterparty default.Date of the default status of the counterparty"])
+            (~self.masks.sentinel("Counterparty default", "Date of the default status of the counterparty")) &
+            (df_counterparty_default["Reference date"] < df_counterparty_default["Date of the default status of the counterparty"])
         ]
         
         return "CN0630", "Counterparty default", invalid_rows
 
+    @rule("CN0640", RuleCategory.CONSISTENCY, {
+        "Counterparty default": COUNTERPARTY_KEY + ["Reference date", "Default status of the counterparty", "Date of the default status of the counterparty"],
+    }, history=True)
     def CN0640(self):
         # 'Let T be the reference date
         # IF [Counterparty default.Default status of the counterparty] (T) <>
@@ -726,47 +1086,46 @@ class RecordRules():
         # [Counterparty default.Date of the default status of the counterparty] (T - 1)'
         
         df_counterparty_default = self.df_dict["Counterparty default"]
+        history = self.temporal.view("Counterparty default", COUNTERPARTY_KEY, "Reference date")
         
-        # Sort the DataFrame by "Counterparty identifier" and "Counterparty default.Reference date" to prepare for comparison
-        df_counterparty_default_sorted = df_counterparty_default.sort_values(by=["Counterparty identifier", "Counterparty default.Reference date"])
-        
-        # Create a new DataFrame that shifts the "Counterparty default.Default status of the counterparty" and "Counterparty default.Date of the default status of the counterparty" columns by 1 row for comparison
-        shifted_df = df_counterparty_default_sorted.groupby("Counterparty identifier")[["Counterparty default.Default status of the counterparty", "Counterparty default.Date of the default status of the counterparty"]].shift(1)
-        
-        # Filter rows where the current "Default status of the counterparty" is different from the previous
-        # and where the current "Date of the default status of the counterparty" is not greater than the previous
-        invalid_rows = df_counterparty_default_sorted[
-            (df_counterparty_default_sorted["Counterparty default.Default status of the counterparty"] != shifted_df["Counterparty default.Default status of the counterparty"]) &
-            ~(df_counterparty_default_sorted["Counterparty default.Date of the default status of the counterparty"] > shifted_df["Counterparty default.Date of the default status of the counterparty"])
+        # Filter rows where the current "Default status of the counterparty" is different from T-1
+        # and where the current "Date of the default status of the counterparty" is not greater than at T-1
+        invalid_rows = df_counterparty_default[
+            history.changed("Default status of the counterparty") &
+            ~(df_counterparty_default["Date of the default status of the counterparty"] > history.previous("Date of the default status of the counterparty")).fillna(False)
         ]
         
         return "CN0640", "Counterparty default", invalid_rows
     
+
+    @rule("CN0650", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Reference date"] + PROTECTION_KEY + ["Maturity date of protection"],
+        "Instrument-protection received": ["Reference date"] + INSTRUMENT_KEY + ["Protection identifier"],
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Inception date"],
+    })
     def CN0650(self):
         # 'IF [Protection received.Maturity date of the protection] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Protection received.Maturity date of the protection] >= [Instrument.Inception date]'
         
-        df_protection_received = self.df_dict["Protection received"]
         df_instrument = self.df_dict["Instrument"]
         
-        # Merge the "Protection received" and "Instrument" DataFrames on the common key
-        merged_df = pd.merge(
-            df_protection_received,
-            df_instrument,
-            left_on=["Observed agent identifier", "Contract identifier", "Instrument identifier"],
-            right_on=["Observed agent identifier", "Contract identifier", "Instrument identifier"],
-            how="inner"
-        )
+        # Every protection item with the instruments it protects, and the inception date of each of those instruments
+        merged_df = self.join_cache.merge("Protection received", "Instrument-protection received", on=["Reference date"] + PROTECTION_KEY, how="inner")
+        inception_date = key_lookup(merged_df, ["Reference date"] + INSTRUMENT_KEY, df_instrument, ["Reference date"] + INSTRUMENT_KEY, "Inception date")
         
-        # Filter rows where "Maturity date of the protection" is not in the specified values
-        # and "Maturity date of the protection" is less than "Inception date"
+        # Filter rows where "Maturity date of protection" is not in the specified values
+        # and "Maturity date of protection" is less than "Inception date"
         invalid_rows = merged_df[
-            (~merged_df["Protection received.Maturity date of the protection"].isin(['Not applicable', 'Not required'])) &
-            (merged_df["Protection received.Maturity date of the protection"] < merged_df["Instrument.Inception date"])
+            (~is_sentinel(merged_df, "Maturity date of protection")) &
+            (merged_df["Maturity date of protection"] < inception_date)
         ]
         
         return "CN0650", "Protection received", invalid_rows
     
+
+    @rule("CN0660", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Date of protection value", "Reference date"],
+    }, row_local=True)
     def CN0660(self):
         # 'IF [Protection received.Date of protection value] NOT IN {‘Not applicable’, 'Not required'} THEN
         # [Protection received.Reference date] >= [Protection received.Date of protection value]'
@@ -776,29 +1135,30 @@ class RecordRules():
         # Filter rows where "Date of protection value" is not in the specified values
         # and "Reference date" is less than "Date of protection value"
         invalid_rows = df_protection_received[
-            (~df_protection_received["Protection received.Date of protection value"].isin(['Not applicable', 'Not required'])) &
-            (df_protection_received["Protection received.Reference date"] < df_protection_received["Protection received.Date of protection value"])
+            (~self.masks.sentinel("Protection received", "Date of protection value")) &
+            (df_protection_received["Reference date"] < df_protection_received["Date of protection value"])
         ]
         
         return "CN0660", "Protection received", invalid_rows
 
+    @rule("CN0661", RuleCategory.CONSISTENCY, {
+        "Protection received": PROTECTION_KEY + ["Date of protection value", "Reference date"],
+    }, history=True)
     def CN0661(self):
         # '[Protection received.Date of protection value](T) >= [Protection received.Date of protection value](T-1)'
         
         df_protection_received = self.df_dict["Protection received"]
+        history = self.temporal.view("Protection received", PROTECTION_KEY, "Reference date")
         
-        # Sort the DataFrame by "Protection received.Date of protection value" and "Protection received.Reference date" to prepare for comparison
-        df_protection_received_sorted = df_protection_received.sort_values(by=["Protection received.Reference date", "Protection received.Date of protection value"])
-        
-        # Create a new DataFrame that shifts the "Protection received.Date of protection value" column by 1 row for comparison
-        shifted_df = df_protection_received_sorted.groupby("Protection received.Reference date")["Protection received.Date of protection value"].shift(1)
-        
-        # Filter rows where the current "Date of protection value" is not greater than or equal to the previous
-        invalid_rows = df_protection_received_sorted[
-            ~(df_protection_received_sorted["Protection received.Date of protection value"] >= shifted_df)
+        # Filter rows where the current "Date of protection value" is not greater than or equal to T-1
+        invalid_rows = df_protection_received[
+            (df_protection_received["Date of protection value"] < history.previous("Date of protection value")).fillna(False)
         ]
         return "CN0661", "Protection received", invalid_rows  
 
+    @rule("CN0701", RuleCategory.CONSISTENCY, {
+        "Financial": ["Outstanding nominal amount", "Transferred amount"],
+    }, row_local=True)
     def CN0701(self):
         # 'IF [Financial.Transferred amount] > 0 THEN [Financial.Outstanding nominal amount] >= [Financial.Transferred amount]'
         
@@ -806,22 +1166,28 @@ class RecordRules():
         
         # Filter rows where "Transferred amount" is greater than 0 and "Outstanding nominal amount" is less than "Transferred amount"
         invalid_rows = df_financial[
-            (df_financial["Financial.Transferred amount"] > 0) &
-            (df_financial["Financial.Outstanding nominal amount"] < df_financial["Financial.Transferred amount"])
+            (self.masks.mask("Financial", "Transferred amount", ">", 0)) &
+            (df_financial["Outstanding nominal amount"] < df_financial["Transferred amount"])
         ]
         
         return "CN0701", "Financial", invalid_rows    
 
+    @rule("CN0704", RuleCategory.CONSISTENCY, {
+        "Financial": ["Outstanding nominal amount", "Arrears for the instrument"],
+    }, row_local=True)
     def CN0704(self):
         # '[Financial.Outstanding nominal amount] >= [Financial.Arrears for the instrument]'
         
         df_financial = self.df_dict["Financial"]
         
         # Filter rows where "Outstanding nominal amount" is less than "Arrears for the instrument"
-        invalid_rows = df_financial[df_financial["Financial.Outstanding nominal amount"] < df_financial["Financial.Arrears for the instrument"]]
+        invalid_rows = df_financial[df_financial["Outstanding nominal amount"] < df_financial["Arrears for the instrument"]]
         
         return "CN0704", "Financial", invalid_rows
 
+    @rule("CN0705", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Commitment amount at inception"],
+    }, row_local=True)
     def CN0705(self):
         # 'IF [Instrument.Commitment amount at inception] <> 'Non-applicable' THEN [Instrument.Commitment amount at inception] > 0'
         
@@ -829,245 +1195,224 @@ class RecordRules():
         
         # Filter rows where "Commitment amount at inception" is not 'Non-applicable' and not greater than 0
         invalid_rows = df_instrument[
-            (df_instrument["Instrument.Commitment amount at inception"] != 'Non-applicable') &
-            (df_instrument["Instrument.Commitment amount at inception"] <= 0)
+            (~self.masks.sentinel("Instrument", "Commitment amount at inception", [NON_APPLICABLE])) &
+            (self.masks.mask("Instrument", "Commitment amount at inception", "<=", 0))
         ]
         
         return "CN0705", "Instrument", invalid_rows
 
+    @rule("CN0804", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Commitment amount at inception"],
+    }, history=True)
     def CN0804(self):
         # 'Let T be the reference date:  
         # [Instrument.Commitment amount at inception]  (T) = [Instrument.Commitment amount at inception] (T-1)'
         
         df_instrument = self.df_dict["Instrument"]
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
-        # Sort the DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_sorted = df_instrument.sort_values(by=["Instrument.Reference date"])
-        
-        # Create a new DataFrame that shifts the "Commitment amount at inception" column by 1 row for comparison
-        shifted_df = df_instrument_sorted.groupby("Instrument.Identifier")["Instrument.Commitment amount at inception"].shift(1)
-        
-        # Filter rows where the current "Commitment amount at inception" is not equal to the previous
-        invalid_rows = df_instrument_sorted[
-            df_instrument_sorted["Instrument.Commitment amount at inception"] != shifted_df
-        ]
+        # Filter rows where the current "Commitment amount at inception" is not equal to T-1
+        invalid_rows = df_instrument[history.changed("Commitment amount at inception")]
         
         return "CN0804", "Instrument", invalid_rows
 
+    @rule("CN0805", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Project finance loan"],
+        "Accounting": INSTRUMENT_KEY + ["Reference date", "Date of the forbearance and renegotiation status"],
+    }, history=True)
     def CN0805(self):
         # 'Let T be the reference date and T' the end of quarter reference date such that T'>=T:
         # For each T IN{T', T'-1, T'-2}, IF [Instrument.Project finance loan]  (T) <> [Instrument.Project finance loan]  (T-1) 
         # THEN [Accounting.Date of the forbearance and renegotiation status] (T') > (T-1)'
         
         df_instrument = self.df_dict["Instrument"]
-        df_accounting = self.df_dict["Accounting"]
-        
-        # Sort the "Instrument" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_sorted = df_instrument.sort_values(by=["Instrument.Reference date"])
-        
-        # Group the "Instrument" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_sorted.groupby("Instrument.Identifier")
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
-        # Create a new DataFrame that shifts the "Project finance loan" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument.Project finance loan"].shift(1)
-        
-        # Define the end of quarter reference date T'
-        end_of_quarter_reference_date = grouped_df["Instrument.Reference date"].max()
-        
-        # Filter rows where the current "Project finance loan" is different from the previous for T, T-1, T-2
-        invalid_rows = df_instrument_sorted[
-            (df_instrument_sorted["Instrument.Reference date"].isin([end_of_quarter_reference_date, end_of_quarter_reference_date - pd.DateOffset(1), end_of_quarter_reference_date - pd.DateOffset(2)])) &
-            (df_instrument_sorted["Instrument.Project finance loan"] != shifted_df)
-        ]
+        # Rows T IN {T', T'-1, T'-2} of a quarter whose accounting data (T') is reported, where "Project finance loan" changed since T-1
+        accounting_reported = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Reference date").notna()
+        changed = accounting_reported & history.changed("Project finance loan")
         
         # Filter rows where the "Date of the forbearance and renegotiation status" (T') is not greater than (T-1)
-        invalid_rows = invalid_rows[invalid_rows["Accounting.Date of the forbearance and renegotiation status"] <= invalid_rows["Instrument.Reference date"] - pd.DateOffset(1)]
+        forbearance_date = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Date of the forbearance and renegotiation status")
+        invalid_rows = df_instrument[changed & ~(forbearance_date > history.previous("Reference date")).fillna(False)]
         
         return "CN0805", "Instrument", invalid_rows
     
 
     
+    @rule("CN0806", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Purpose"],
+        "Accounting": INSTRUMENT_KEY + ["Reference date", "Date of the forbearance and renegotiation status"],
+    }, history=True)
     def CN0806(self):
         # 'Let T be the reference date and T' the end of quarter reference date such that T'>=T:
-        # For each T IN {T’, T’-1, T’-2}, IF [Instrument.Purpose] (T) <> [Instrument.Purpose] (T-1)
+        # For each T IN{T', T'-1, T'-2}, IF [Instrument.Purpose]  (T) <> [Instrument.Purpose]  (T-1) 
         # THEN [Accounting.Date of the forbearance and renegotiation status] (T') > (T-1)'
         
         df_instrument = self.df_dict["Instrument"]
-        df_accounting = self.df_dict["Accounting"]
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
-        # Sort the "Instrument" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_sorted = df_instrument.sort_values(by=["Instrument.Reference date"])
-        
-        # Group the "Instrument" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_sorted.groupby("Instrument.Identifier")
-        
-        # Create a new DataFrame that shifts the "Purpose" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument.Purpose"].shift(1)
-        
-        # Define the end of quarter reference date T'
-        end_of_quarter_reference_date = grouped_df["Instrument.Reference date"].max()
-        
-        # Filter rows where the current "Purpose" is different from the previous for T, T-1, T-2
-        invalid_rows = df_instrument_sorted[
-            (df_instrument_sorted["Instrument.Reference date"].isin([end_of_quarter_reference_date, end_of_quarter_reference_date - pd.DateOffset(1), end_of_quarter_reference_date - pd.DateOffset(2)])) &
-            (df_instrument_sorted["Instrument.Purpose"] != shifted_df)
-        ]
+        # Rows T IN {T', T'-1, T'-2} of a quarter whose accounting data (T') is reported, where "Purpose" changed since T-1
+        accounting_reported = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Reference date").notna()
+        changed = accounting_reported & history.changed("Purpose")
         
         # Filter rows where the "Date of the forbearance and renegotiation status" (T') is not greater than (T-1)
-        invalid_rows = invalid_rows[invalid_rows["Accounting.Date of the forbearance and renegotiation status"] <= invalid_rows["Instrument.Reference date"] - pd.DateOffset(1)]
+        forbearance_date = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Date of the forbearance and renegotiation status")
+        invalid_rows = df_instrument[changed & ~(forbearance_date > history.previous("Reference date")).fillna(False)]
         
         return "CN0806", "Instrument", invalid_rows
     
+    @rule("CN0807", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Recourse"],
+        "Accounting": INSTRUMENT_KEY + ["Reference date", "Date of the forbearance and renegotiation status"],
+    }, history=True)
     def CN0807(self):
         # 'Let T be the reference date and T' the end of quarter reference date such that T'>=T:
-        # For each T IN{T', T'-1, T'-2}, IF [Instrument.Recourse]  (T) <> [Instrument.Recourse] (T-1)
-        # THEN [Accounting.Date of the forbearance and renegotiation status] (T') > (T-1) '
+        # For each T IN{T', T'-1, T'-2}, IF [Instrument.Recourse]  (T) <> [Instrument.Recourse]  (T-1) 
+        # THEN [Accounting.Date of the forbearance and renegotiation status] (T') > (T-1)'
         
         df_instrument = self.df_dict["Instrument"]
-        df_accounting = self.df_dict["Accounting"]
-        
-        # Sort the "Instrument" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_sorted = df_instrument.sort_values(by=["Instrument.Reference date"])
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
-        # Group the "Instrument" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_sorted.groupby("Instrument.Identifier")
-        
-        # Create a new DataFrame that shifts the "Recourse" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument.Recourse"].shift(1)
-        
-        # Define the end of quarter reference date T'
-        end_of_quarter_reference_date = grouped_df["Instrument.Reference date"].max()
-        
-        # Filter rows where the current "Recourse" is different from the previous for T, T-1, T-2
-        invalid_rows = df_instrument_sorted[
-            (df_instrument_sorted["Instrument.Reference date"].isin([end_of_quarter_reference_date, end_of_quarter_reference_date - pd.DateOffset(1), end_of_quarter_reference_date - pd.DateOffset(2)])) &
-            (df_instrument_sorted["Instrument.Recourse"] != shifted_df)
-        ]
+        # Rows T IN {T', T'-1, T'-2} of a quarter whose accounting data (T') is reported, where "Recourse" changed since T-1
+        accounting_reported = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Reference date").notna()
+        changed = accounting_reported & history.changed("Recourse")
         
         # Filter rows where the "Date of the forbearance and renegotiation status" (T') is not greater than (T-1)
-        invalid_rows = invalid_rows[invalid_rows["Accounting.Date of the forbearance and renegotiation status"] <= invalid_rows["Instrument.Reference date"] - pd.DateOffset(1)]
+        forbearance_date = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Date of the forbearance and renegotiation status")
+        invalid_rows = df_instrument[changed & ~(forbearance_date > history.previous("Reference date")).fillna(False)]
         
         return "CN0807", "Instrument", invalid_rows
     
     
+    @rule("CN0809", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Repayment rights"],
+        "Accounting": INSTRUMENT_KEY + ["Reference date", "Date of the forbearance and renegotiation status"],
+    }, history=True)
     def CN0809(self):
         # 'Let T be the reference date and T' the end of quarter reference date such that T'>=T:
-        # For each T IN{T', T'-1, T'-2}, IF [Instrument.Repayment rights]  (T) <> [Instrument.Repayment rights] (T-1) 
-        # THEN [Accounting.Date of the forbearance and renegotiation status] (T') > (T-1) '
+        # For each T IN{T', T'-1, T'-2}, IF [Instrument.Repayment rights]  (T) <> [Instrument.Repayment rights]  (T-1) 
+        # THEN [Accounting.Date of the forbearance and renegotiation status] (T') > (T-1)'
         
         df_instrument = self.df_dict["Instrument"]
-        df_accounting = self.df_dict["Accounting"]
-        
-        # Sort the "Instrument" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_sorted = df_instrument.sort_values(by=["Instrument.Reference date"])
-        
-        # Group the "Instrument" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_sorted.groupby("Instrument.Identifier")
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
-        # Create a new DataFrame that shifts the "Repayment rights" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument.Repayment rights"].shift(1)
-        
-        # Define the end of quarter reference date T'
-        end_of_quarter_reference_date = grouped_df["Instrument.Reference date"].max()
-        
-        # Filter rows where the current "Repayment rights" is different from the previous for T, T-1, T-2
-        invalid_rows = df_instrument_sorted[
-            (df_instrument_sorted["Instrument.Reference date"].isin([end_of_quarter_reference_date, end_of_quarter_reference_date - pd.DateOffset(1), end_of_quarter_reference_date - pd.DateOffset(2)])) &
-            (df_instrument_sorted["Instrument.Repayment rights"] != shifted_df)
-        ]
+        # Rows T IN {T', T'-1, T'-2} of a quarter whose accounting data (T') is reported, where "Repayment rights" changed since T-1
+        accounting_reported = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Reference date").notna()
+        changed = accounting_reported & history.changed("Repayment rights")
         
         # Filter rows where the "Date of the forbearance and renegotiation status" (T') is not greater than (T-1)
-        invalid_rows = invalid_rows[invalid_rows["Accounting.Date of the forbearance and renegotiation status"] <= invalid_rows["Instrument.Reference date"] - pd.DateOffset(1)]
+        forbearance_date = self.temporal.at_dates("Accounting", INSTRUMENT_KEY, "Reference date", df_instrument, history.quarter_end, "Date of the forbearance and renegotiation status")
+        invalid_rows = df_instrument[changed & ~(forbearance_date > history.previous("Reference date")).fillna(False)]
         
         return "CN0809", "Instrument", invalid_rows
     
+    @rule("CN0810", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Fair value changes due to changes in credit risk before purchase"],
+    }, history=True)
     def CN0810(self):
         # 'Let T be the reference date:
         # [Instrument.Fair value changes due to changes in credit risk before purchase]  (T) = [Instrument.Fair value changes due to changes in credit risk before purchase] (T-1)'
         
         df_instrument = self.df_dict["Instrument"]
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
-        # Sort the "Instrument" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_sorted = df_instrument.sort_values(by=["Instrument.Reference date"])
-        
-        # Group the "Instrument" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_sorted.groupby("Instrument.Identifier")
-        
-        # Create a new DataFrame that shifts the "Fair value changes due to changes in credit risk before purchase" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument.Fair value changes due to changes in credit risk before purchase"].shift(1)
-        
-        # Filter rows where the current "Fair value changes due to changes in credit risk before purchase" is not equal to the previous
-        invalid_rows = df_instrument_sorted[df_instrument_sorted["Instrument.Fair value changes due to changes in credit risk before purchase"] != shifted_df]
+        # Filter rows where the current "Fair value changes due to changes in credit risk before purchase" is not equal to T-1
+        invalid_rows = df_instrument[history.changed("Fair value changes due to changes in credit risk before purchase")]
         
         return "CN0810", "Instrument", invalid_rows    
 
     
+    @rule("CN0812", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Observed agent identifier", "Protection identifier", "Reference date", "Original protection value"],
+        "Instrument-protection received": ["Observed agent identifier", "Protection identifier", "Reference date"],
+    }, history=True)
     def CN0812(self):
         # 'Let T be the reference date:
         # IF [Instrument-protection received.Instrument ID] (T) IN [Instrument-protection received.Instrument ID] (T-1) THEN
         # [Protection received.Original protection value]  (T) = [Protection received.Original protection value] (T-1)'
         
-        df_instrument_protection_received = self.df_dict["Instrument-protection received"]
         df_protection_received = self.df_dict["Protection received"]
-        
-        # Sort the "Instrument-protection received" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_protection_received_sorted = df_instrument_protection_received.sort_values(by=["Instrument.Reference date"])
-        
-        # Group the "Instrument-protection received" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_protection_received_sorted.groupby("Instrument.Identifier")
-        
-        # Create a new DataFrame that shifts the "Instrument ID" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument-protection received.Instrument ID"].shift(1)
-        
-        # Filter rows where the current "Instrument ID" is the same as the previous for T and T-1
-        matching_ids = df_instrument_protection_received_sorted["Instrument-protection received.Instrument ID"] == shifted_df
-        invalid_rows = df_protection_received[matching_ids]
+        df_instrument_protection_received = self.temporal.all_periods(
+            "Instrument-protection received",
+            ["Observed agent identifier", "Protection identifier", "Reference date"]
+        )
+        history = self.temporal.view("Protection received", PROTECTION_KEY, "Reference date")
+        
+        # Protections that were already linked to an instrument at T-1
+        linked_at_t_minus_1 = key_isin(
+            pd.DataFrame({
+                "Observed agent identifier": df_protection_received["Observed agent identifier"],
+                "Protection identifier": df_protection_received["Protection identifier"],
+                "Reference date": history.previous("Reference date"),
+            }),
+            ["Observed agent identifier", "Protection identifier", "Reference date"],
+            df_instrument_protection_received,
+            ["Observed agent identifier", "Protection identifier", "Reference date"]
+        )
         
         # Filter rows where the "Original protection value" (T) is not equal to (T-1)
-        invalid_rows = invalid_rows[invalid_rows["Protection received.Original protection value"] != invalid_rows["Protection received.Original protection value"].shift(1)]
+        invalid_rows = df_protection_received[linked_at_t_minus_1 & history.changed("Original protection value")]
         
         return "CN0812", "Protection received", invalid_rows
     
+    @rule("CN0813", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Observed agent identifier", "Protection identifier", "Reference date", "Date of original protection value"],
+        "Instrument-protection received": ["Observed agent identifier", "Protection identifier", "Reference date"],
+    }, history=True)
     def CN0813(self):
         # 'Let T be the reference date:
         # IF [Instrument-protection received.Instrument ID] (T) IN [Instrument-protection received.Instrument ID] (T-1) THEN
         # [Protection received.Date of original protection value]  (T) = [Protection received.Date of original protection value] (T-1)'
         
-        df_instrument_protection_received = self.df_dict["Instrument-protection received"]
         df_protection_received = self.df_dict["Protection received"]
-        
-        # Sort the "Instrument-protection received" DataFrame by "Instrument.Reference date" to prepare for comparison
-        df_instrument_protection_received_sorted = df_instrument_protection_received.sort_values(by=["Instrument.Reference date"])
-        
-        # Group the "Instrument-protection received" DataFrame by "Instrument.Identifier" for efficient processing
-        grouped_df = df_instrument_protection_received_sorted.groupby("Instrument.Identifier")
-        
-        # Create a new DataFrame that shifts the "Instrument ID" column by 1 row for comparison
-        shifted_df = grouped_df["Instrument-protection received.Instrument ID"].shift(1)
-        
-        # Filter rows where the current "Instrument ID" is the same as the previous for T and T-1
-        matching_ids = df_instrument_protection_received_sorted["Instrument-protection received.Instrument ID"] == shifted_df
-        invalid_rows = df_protection_received[matching_ids]
+        df_instrument_protection_received = self.temporal.all_periods(
+            "Instrument-protection received",
+            ["Observed agent identifier", "Protection identifier", "Reference date"]
+        )
+        history = self.temporal.view("Protection received", PROTECTION_KEY, "Reference date")
+        
+        # Protections that were already linked to an instrument at T-1
+        linked_at_t_minus_1 = key_isin(
+            pd.DataFrame({
+                "Observed agent identifier": df_protection_received["Observed agent identifier"],
+                "Protection identifier": df_protection_received["Protection identifier"],
+                "Reference date": history.previous("Reference date"),
+            }),
+            ["Observed agent identifier", "Protection identifier", "Reference date"],
+            df_instrument_protection_received,
+            ["Observed agent identifier", "Protection identifier", "Reference date"]
+        )
         
         # Filter rows where the "Date of original protection value" (T) is not equal to (T-1)
-        invalid_rows = invalid_rows[invalid_rows["Protection received.Date of original protection value"] != invalid_rows["Protection received.Date of original protection value"].shift(1)]
+        invalid_rows = df_protection_received[linked_at_t_minus_1 & history.changed("Date of original protection value")]
         
         return "CN0813", "Protection received", invalid_rows
     
+    @rule("CN0814", RuleCategory.CONSISTENCY, {
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Off-balance sheet amount"],
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Settlement date"],
+    })
     def CN0814(self):
         # 'IF [Instrument.Settlement date] = 'Non-applicable' THEN [Financial.Off-balance sheet amount] > 0'
         
         df_instrument = self.df_dict["Instrument"]
         df_financial = self.df_dict["Financial"]
         
-        # Filter rows where "Settlement date" is 'Non-applicable'
-        non_applicable_settlement = df_instrument["Instrument.Settlement date"] == 'Non-applicable'
+        # Filter rows whose instrument has a "Settlement date" of 'Non-applicable' in the same reference period
+        non_applicable_settlement = key_isin(
+            df_financial, ["Reference date"] + INSTRUMENT_KEY, df_instrument, ["Reference date"] + INSTRUMENT_KEY,
+            build_mask=self.masks.sentinel("Instrument", "Settlement date", [NON_APPLICABLE])
+        )
         
         # Filter rows where "Off-balance sheet amount" is not greater than 0
-        invalid_rows = df_financial[(non_applicable_settlement) & (df_financial["Financial.Off-balance sheet amount"] <= 0)]
+        invalid_rows = df_financial[(non_applicable_settlement) & (self.masks.mask("Financial", "Off-balance sheet amount", "<=", 0))]
         
         return "CN0814", "Financial", invalid_rows
     
+    @rule("CN0816", RuleCategory.CONSISTENCY, {
+        "Counterparty default": ["Date of the default status of the counterparty", "Default status of the counterparty"],
+    }, row_local=True)
     def CN0816(self):
         # 'IF [Counterparty default.Date of the default status of the counterparty] = 'Non-applicable' AND
         # [Counterparty default.Default status of the counterparty] <> 'Non-applicable' THEN
@@ -1076,33 +1421,43 @@ class RecordRules():
         df_counterparty_default = self.df_dict["Counterparty default"]
         
         # Filter rows where "Date of the default status of the counterparty" is 'Non-applicable'
-        non_applicable_date = df_counterparty_default["Counterparty default.Date of the default status of the counterparty"] == 'Non-applicable'
+        non_applicable_date = self.masks.sentinel("Counterparty default", "Date of the default status of the counterparty", [NON_APPLICABLE])
         
         # Filter rows where "Default status of the counterparty" is not 'Non-applicable'
-        not_non_applicable_status = df_counterparty_default["Counterparty default.Default status of the counterparty"] != 'Non-applicable'
+        not_non_applicable_status = self.masks.mask("Counterparty default", "Default status of the counterparty", "!=", 'Non-applicable')
         
         # Filter rows where the above conditions are met and "Default status of the counterparty" is not 'Not in default'
-        invalid_rows = df_counterparty_default[(non_applicable_date) & (not_non_applicable_status) & (df_counterparty_default["Counterparty default.Default status of the counterparty"] != 'Not in default')]
+        invalid_rows = df_counterparty_default[(non_applicable_date) & (not_non_applicable_status) & (self.masks.mask("Counterparty default", "Default status of the counterparty", "!=", 'Not in default'))]
         
         return "CN0816", "Counterparty default", invalid_rows
     
+    @rule("CN0821", RuleCategory.CONSISTENCY, {
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Off-balance sheet amount"],
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Type of instrument"],
+    })
     def CN0821(self):
         # 'IF [Instrument.Type of instrument] = 'Reverse repurchase agreements' THEN [Financial.Off-balance sheet amount] = 'Non-applicable'
         
         df_instrument = self.df_dict["Instrument"]
         df_financial = self.df_dict["Financial"]
         
-        # Filter rows where "Type of instrument" is 'Reverse repurchase agreements'
-        reverse_repurchase = df_instrument["Instrument.Type of instrument"] == 'Reverse repurchase agreements'
+        # Filter rows whose instrument is a 'Reverse repurchase agreements' in the same reference period
+        reverse_repurchase = key_isin(
+            df_financial, ["Reference date"] + INSTRUMENT_KEY, df_instrument, ["Reference date"] + INSTRUMENT_KEY,
+            build_mask=self.masks.mask("Instrument", "Type of instrument", "==", 'Reverse repurchase agreements')
+        )
         
         # Filter rows where "Off-balance sheet amount" is not 'Non-applicable'
-        non_applicable_off_balance = df_financial["Financial.Off-balance sheet amount"] != 'Non-applicable'
+        non_applicable_off_balance = ~self.masks.sentinel("Financial", "Off-balance sheet amount", [NON_APPLICABLE])
         
         # Filter rows where the above conditions are met
         invalid_rows = df_financial[(reverse_repurchase) & (non_applicable_off_balance)]
         
         return "CN0821", "Financial", invalid_rows  
 
+    @rule("CN0833", RuleCategory.CONSISTENCY, {
+        "Financial": ["Default status of the instrument", "Date of the default status of the instrument"],
+    }, row_local=True)
     def CN0833(self):
         # '[Financial.Default status of the instrument] <> {'Non-applicable'} IF AND ONLY IF
         # [Financial.Date of the Default status of the instrument] <> 'Non-applicable'
@@ -1110,16 +1465,19 @@ class RecordRules():
         df_financial = self.df_dict["Financial"]
         
         # Filter rows where "Default status of the instrument" is not 'Non-applicable'
-        not_non_applicable_status = df_financial["Financial.Default status of the instrument"] != 'Non-applicable'
+        not_non_applicable_status = self.masks.mask("Financial", "Default status of the instrument", "!=", 'Non-applicable')
         
-        # Filter rows where "Date of the Default status of the instrument" is 'Non-applicable'
-        non_applicable_date = df_financial["Financial.Date of the Default status of the instrument"] == 'Non-applicable'
+        # Filter rows where "Date of the default status of the instrument" is 'Non-applicable'
+        non_applicable_date = self.masks.sentinel("Financial", "Date of the default status of the instrument", [NON_APPLICABLE])
         
         # Check if the condition is met for one and not the other or vice versa
         invalid_rows = df_financial[(not_non_applicable_status & non_applicable_date) | (~not_non_applicable_status & ~non_applicable_date)]
         
         return "CN0833", "Financial", invalid_rows
     
+    @rule("CN0835", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Amortisation type", "End date of interest-only period"],
+    }, row_local=True)
     def CN0835(self):
         # 'IF [Instrument.Amortisation type] IN {'French', 'Fixed amortisation schedule'} THEN
         # [Instrument.End date of interest-only period]  = 'Non-applicable'
@@ -1127,80 +1485,95 @@ class RecordRules():
         df_instrument = self.df_dict["Instrument"]
         
         # Filter rows where "Amortisation type" is in {'French', 'Fixed amortisation schedule'}
-        valid_amortisation_types = df_instrument["Instrument.Amortisation type"].isin(['French', 'Fixed amortisation schedule'])
+        valid_amortisation_types = self.masks.isin("Instrument", "Amortisation type", ['French', 'Fixed amortisation schedule'])
         
         # Filter rows where "End date of interest-only period" is not 'Non-applicable'
-        non_applicable_end_date = df_instrument["Instrument.End date of interest-only period"] != 'Non-applicable'
+        non_applicable_end_date = ~self.masks.sentinel("Instrument", "End date of interest-only period", [NON_APPLICABLE])
         
         # Filter rows where the above conditions are met
         invalid_rows = df_instrument[(valid_amortisation_types) & (non_applicable_end_date)]
         
         return "CN0835", "Instrument", invalid_rows
     
+    @rule("CN0836", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Interest rate type", "Interest rate cap"],
+    }, row_local=True)
     def CN0836(self):
         # 'IF [Instrument.Interest rate type] = 'Fixed' THEN [Instrument.Interest rate cap] = 'Non-applicable'
         
         df_instrument = self.df_dict["Instrument"]
         
         # Filter rows where "Interest rate type" is 'Fixed'
-        fixed_interest_rate = df_instrument["Instrument.Interest rate type"] == 'Fixed'
+        fixed_interest_rate = self.masks.mask("Instrument", "Interest rate type", "==", 'Fixed')
         
         # Filter rows where "Interest rate cap" is not 'Non-applicable'
-        non_applicable_cap = df_instrument["Instrument.Interest rate cap"] != 'Non-applicable'
+        non_applicable_cap = ~self.masks.sentinel("Instrument", "Interest rate cap", [NON_APPLICABLE])
         
         # Filter rows where the above conditions are met
         invalid_rows = df_instrument[(fixed_interest_rate) & (non_applicable_cap)]
         
         return "CN0836", "Instrument", invalid_rows
     
+    @rule("CN0837", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Interest rate type", "Interest rate floor"],
+    }, row_local=True)
     def CN0837(self):
         # 'IF [Instrument.Interest rate type] = 'Fixed' THEN [Instrument.Interest rate floor] = 'Non-applicable'
         
         df_instrument = self.df_dict["Instrument"]
         
         # Filter rows where "Interest rate type" is 'Fixed'
-        fixed_interest_rate = df_instrument["Instrument.Interest rate type"] == 'Fixed'
+        fixed_interest_rate = self.masks.mask("Instrument", "Interest rate type", "==", 'Fixed')
         
         # Filter rows where "Interest rate floor" is not 'Non-applicable'
-        non_applicable_floor = df_instrument["Instrument.Interest rate floor"] != 'Non-applicable'
+        non_applicable_floor = ~self.masks.sentinel("Instrument", "Interest rate floor", [NON_APPLICABLE])
         
         # Filter rows where the above conditions are met
         invalid_rows = df_instrument[(fixed_interest_rate) & (non_applicable_floor)]
         
         return "CN0837", "Instrument", invalid_rows
     
+    @rule("CN0838", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Interest rate type", "Interest rate spread/margin"],
+    }, row_local=True)
     def CN0838(self):
         # 'IF [Instrument.Interest rate type] = 'Fixed' THEN [Instrument.Interest rate spread / margin] = 'Non-applicable'
         
         df_instrument = self.df_dict["Instrument"]
         
         # Filter rows where "Interest rate type" is 'Fixed'
-        fixed_interest_rate = df_instrument["Instrument.Interest rate type"] == 'Fixed'
+        fixed_interest_rate = self.masks.mask("Instrument", "Interest rate type", "==", 'Fixed')
         
-        # Filter rows where "Interest rate spread / margin" is not 'Non-applicable'
-        non_applicable_spread = df_instrument["Instrument.Interest rate spread / margin"] != 'Non-applicable'
+        # Filter rows where "Interest rate spread/margin" is not 'Non-applicable'
+        non_applicable_spread = ~self.masks.sentinel("Instrument", "Interest rate spread/margin", [NON_APPLICABLE])
         
         # Filter rows where the above conditions are met
         invalid_rows = df_instrument[(fixed_interest_rate) & (non_applicable_spread)]
         
         return "CN0838", "Instrument", invalid_rows
     
+    @rule("CN0839", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Interest rate type", "Reference rate"],
+    }, row_local=True)
     def CN0839(self):
         # 'IF [Instrument.Interest rate type] = 'Fixed' THEN [Instrument.Reference rate] = 'Non-applicable'
         
         df_instrument = self.df_dict["Instrument"]
         
         # Filter rows where "Interest rate type" is 'Fixed'
-        fixed_interest_rate = df_instrument["Instrument.Interest rate type"] == 'Fixed'
+        fixed_interest_rate = self.masks.mask("Instrument", "Interest rate type", "==", 'Fixed')
         
         # Filter rows where "Reference rate" is not 'Non-applicable'
-        non_applicable_reference = df_instrument["Instrument.Reference rate"] != 'Non-applicable'
+        non_applicable_reference = self.masks.mask("Instrument", "Reference rate", "!=", 'Non-applicable')
         
         # Filter rows where the above conditions are met
         invalid_rows = df_instrument[(fixed_interest_rate) & (non_applicable_reference)]
         
         return "CN0839", "Instrument", invalid_rows
     
+    @rule("CN0847", RuleCategory.CONSISTENCY, {
+        "Financial": ["Off-balance sheet amount", "Outstanding nominal amount", "Type of securitisation"],
+    }, row_local=True)
     def CN0847(self):
         # 'IF [Financial.Off-balance sheet amount] > 0 AND [Financial.Outstanding nominal amount] = 0 THEN
         # [Financial.Type of securitisation] <> 'Traditionally securitised'
@@ -1208,29 +1581,32 @@ class RecordRules():
         df_financial = self.df_dict["Financial"]
         
         # Filter rows where "Off-balance sheet amount" is greater than 0
-        off_balance_positive = df_financial["Financial.Off-balance sheet amount"] > 0
+        off_balance_positive = self.masks.mask("Financial", "Off-balance sheet amount", ">", 0)
         
         # Filter rows where "Outstanding nominal amount" is 0
-        nominal_amount_zero = df_financial["Financial.Outstanding nominal amount"] == 0
+        nominal_amount_zero = self.masks.mask("Financial", "Outstanding nominal amount", "==", 0)
         
-        # Filter rows where "Type of securitisation" is 'Traditionally securitised'
-        traditional_securitised = df_financial["Financial.Type of securitisation"] == 'Traditionally securitised'
+        # Filter rows where "Type of securitisation" is 'Traditional securitisation'
+        traditional_securitised = self.masks.mask("Financial", "Type of securitisation", "==", 'Traditional securitisation')
         
         # Filter rows where the above conditions are met
         invalid_rows = df_financial[(off_balance_positive) & (nominal_amount_zero) & (traditional_securitised)]
         
         return "CN0847", "Financial", invalid_rows
     
+    @rule("CN0901", RuleCategory.CONSISTENCY, {
+        "Financial": ["Interest rate", "Accrued interest"],
+    }, row_local=True)
     def CN0901(self):
         # 'IF [Financial.Interest rate] <> 'Non-applicable' THEN [Financial.Accrued interest] <> 'Non-applicable'
         
         df_financial = self.df_dict["Financial"]
         
         # Filter rows where "Interest rate" is not 'Non-applicable'
-        non_applicable_interest = df_financial["Financial.Interest rate"] != 'Non-applicable'
+        non_applicable_interest = ~self.masks.sentinel("Financial", "Interest rate", [NON_APPLICABLE])
         
         # Filter rows where "Accrued interest" is 'Non-applicable'
-        non_applicable_accrued = df_financial["Financial.Accrued interest"] == 'Non-applicable'
+        non_applicable_accrued = self.masks.sentinel("Financial", "Accrued interest", [NON_APPLICABLE])
         
         # Filter rows where the above conditions are met
         invalid_rows = df_financial[(non_applicable_interest) & (non_applicable_accrued)]
@@ -1238,6 +1614,10 @@ class RecordRules():
         return "CN0901", "Financial", invalid_rows
 
     
+    @rule("CN0925", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Type of instrument", "Legal final maturity date", "Inception date"],
+        "Financial": INSTRUMENT_KEY + ["Reference date", "Off-balance sheet amount"],
+    }, history=True)
     def CN0925(self):
         # Let T be the reference date: 
         # IF [Instrument] NOT IN ({[Instrument.Type of instrument] = 'Overdraft' AND [Financial.Off- balance sheet amount] = 'Non-applicable'} 
@@ -1245,23 +1625,25 @@ class RecordRules():
         # THEN [Instrument.Inception date] (T) = [Instrument.Inception date] (T-1)
         
         df_instrument = self.df_dict["Instrument"]
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
         # Create conditions for filtering rows
-        condition1 = (df_instrument["Instrument.Type of instrument"] == 'Overdraft') & (df_instrument["Financial.Off-balance sheet amount"] == 'Non-applicable')
-        condition2 = (df_instrument["Instrument.Type of instrument"] == 'Deposits other than reverse repurchase agreements') & (df_instrument["Instrument.Legal final maturity date"] == 'Non-applicable')
-        
-        # Apply the conditions
-        filtered_rows = df_instrument[~(condition1 | condition2)]
-        
-        # Shift the "Inception date" column to get T-1 values
-        t_inception_date = df_instrument["Instrument.Inception date"]
-        t_minus_1_inception_date = t_inception_date.shift(1)
+        off_balance_non_applicable = key_isin(
+            df_instrument, ["Reference date"] + INSTRUMENT_KEY, self.df_dict["Financial"], ["Reference date"] + INSTRUMENT_KEY,
+            build_mask=self.masks.sentinel("Financial", "Off-balance sheet amount", [NON_APPLICABLE])
+        )
+        condition1 = (self.masks.mask("Instrument", "Type of instrument", "==", 'Overdrafts')) & off_balance_non_applicable
+        condition2 = (self.masks.mask("Instrument", "Type of instrument", "==", 'Deposits other than reverse repurchase agreements')) & (self.masks.sentinel("Instrument", "Legal final maturity date", [NON_APPLICABLE]))
         
         # Check if T Inception date is equal to T-1 Inception date
-        invalid_rows = filtered_rows[~(t_inception_date == t_minus_1_inception_date)]
+        invalid_rows = df_instrument[~(condition1 | condition2) & history.changed("Inception date")]
         
         return "CN0925", "Instrument", invalid_rows
     
+    @rule("CN0935", RuleCategory.CONSISTENCY, {
+        "Instrument": INSTRUMENT_KEY + ["Reference date", "Type of instrument", "Legal final maturity date", "Settlement date"],
+        "Financial": INSTRUMENT_KEY + ["Reference date", "Off-balance sheet amount"],
+    }, history=True)
     def CN0935(self):
         # Let T be the reference date: 
         # IF [Instrument] NOT IN ({ [Instrument.Type of instrument] = 'Overdraft' AND [Financial.Off- balance sheet amount] = 'Non-applicable'} 
@@ -1270,29 +1652,33 @@ class RecordRules():
         # IF AND ONLY IF [Instrument.Settlement date] (T-1) is not 'Non-applicable'
         
         df_instrument = self.df_dict["Instrument"]
+        history = self.temporal.view("Instrument", INSTRUMENT_KEY, "Reference date")
         
         # Create conditions for filtering rows
-        condition1 = (df_instrument["Instrument.Type of instrument"] == 'Overdraft') & (df_instrument["Financial.Off-balance sheet amount"] == 'Non-applicable')
-        condition2 = (df_instrument["Instrument.Type of instrument"] == 'Deposits other than reverse repurchase agreements') & (df_instrument["Instrument.Legal final maturity date"] == 'Non-applicable')
-        
-        # Apply the conditions
-        filtered_rows = df_instrument[~(condition1 | condition2)]
-        
-        # Get the "Settlement date" at T and T-1
-        t_settlement_date = df_instrument["Instrument.Settlement date"]
-        t_minus_1_settlement_date = t_settlement_date.shift(1)
+        off_balance_non_applicable = key_isin(
+            df_instrument, ["Reference date"] + INSTRUMENT_KEY, self.df_dict["Financial"], ["Reference date"] + INSTRUMENT_KEY,
+            build_mask=self.masks.sentinel("Financial", "Off-balance sheet amount", [NON_APPLICABLE])
+        )
+        condition1 = (self.masks.mask("Instrument", "Type of instrument", "==", 'Overdrafts')) & off_balance_non_applicable
+        condition2 = (self.masks.mask("Instrument", "Type of instrument", "==", 'Deposits other than reverse repurchase agreements')) & (self.masks.sentinel("Instrument", "Legal final maturity date", [NON_APPLICABLE]))
         
-        # Get a boolean series indicating if T-1 Settlement date is not 'Non-applicable'
-        t_minus_1_not_non_applicable = t_minus_1_settlement_date != 'Non-applicable'
+        # Whether the "Settlement date" at T and at T-1 is not 'Non-applicable'
+        not_non_applicable = lambda df: ~is_sentinel(df, "Settlement date", [NON_APPLICABLE])
+        t_not_non_applicable = not_non_applicable(df_instrument)
+        t_minus_1_not_non_applicable = history.previous(not_non_applicable).fillna(False).astype(bool)
         
         # Check if the conditions are met for T and T-1
-        condition_met_t = (t_settlement_date != 'Non-applicable') & (t_settlement_date == t_minus_1_settlement_date)
+        condition_met_t = t_not_non_applicable & ~history.changed("Settlement date")
         
-        # Check if the IF AND ONLY IF condition is met
-        invalid_rows = filtered_rows[(condition_met_t & t_minus_1_not_non_applicable) | (~condition_met_t & ~t_minus_1_not_non_applicable)]
+        # Rows with a T-1 record where the IF AND ONLY IF condition does not hold
+        invalid_rows = df_instrument[~(condition1 | condition2) & history.has_previous & (condition_met_t != t_minus_1_not_non_applicable)]
         
         return "CN0935", "Instrument", invalid_rows
     
+    @rule("CN0945", RuleCategory.CONSISTENCY, {
+        "Instrument": ["Reference date"] + INSTRUMENT_KEY + ["Settlement date", "Inception date", "Type of instrument", "Recourse", "Commitment amount at inception"],
+        "Financial": ["Reference date"] + INSTRUMENT_KEY + ["Off-balance sheet amount"],
+    })
     def CN0945(self):
         # IF [Instrument.Settlement date] is not ‘Non-applicable’
         # AND [Instrument.Inception date] < [Instrument.Settlement date] 
@@ -1305,20 +1691,26 @@ class RecordRules():
         df_financial = self.df_dict["Financial"]
         
         # Create conditions for filtering rows
-        condition1 = df_instrument["Instrument.Settlement date"] != 'Non-applicable'
-        condition2 = df_instrument["Instrument.Inception date"] < df_instrument["Instrument.Settlement date"]
-        condition3 = df_financial["Financial.Off-balance sheet amount"] == 'Non-applicable'
-        condition4 = ~((df_instrument["Instrument.Type of instrument"] == 'Deposits other than reverse repurchase agreements') & (df_instrument["Instrument.Type of instrument"] == 'Trade receivables') & (df_instrument["Instrument.HAVING Recourse attribute reported"] == 'No recourse'))
+        condition1 = ~self.masks.sentinel("Instrument", "Settlement date", [NON_APPLICABLE])
+        condition2 = df_instrument["Inception date"] < df_instrument["Settlement date"]
+        condition3 = key_isin(
+            df_instrument, ["Reference date"] + INSTRUMENT_KEY, df_financial, ["Reference date"] + INSTRUMENT_KEY,
+            build_mask=self.masks.sentinel("Financial", "Off-balance sheet amount", [NON_APPLICABLE])
+        )
+        condition4 = ~((self.masks.mask("Instrument", "Type of instrument", "==", 'Deposits other than reverse repurchase agreements')) & (self.masks.mask("Instrument", "Type of instrument", "==", 'Trade receivables')) & (self.masks.mask("Instrument", "Recourse", "==", 'No recourse')))
         
         # Combine the conditions
         combined_condition = condition1 & condition2 & condition3 & condition4
         
         # Filter rows where the above conditions are met
-        invalid_rows = df_instrument[combined_condition & (df_instrument["Instrument.Commitment amount at inception"] == 'Non-applicable')]
+        invalid_rows = df_instrument[combined_condition & (self.masks.sentinel("Instrument", "Commitment amount at inception", [NON_APPLICABLE]))]
         
         return "CN0945", "Instrument", invalid_rows
 
     
+    @rule("CN0950", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Observed agent identifier", "Protection identifier", "Reference date", "Type of protection"],
+    }, history=True)
     def CN0950(self):
         # Let T be the reference date: 
         # IF [Protection received.Type of protection] (T) OR [Protection received.Type of protection] (T-1) 
@@ -1326,19 +1718,24 @@ class RecordRules():
         # THEN [Protection received.Type of protection] (T) = [Protection received.Type of protection] (T-1)
         
         df_protection_received = self.df_dict["Protection received"]
+        history = self.temporal.view("Protection received", PROTECTION_KEY, "Reference date")
         
         # Create a set of valid protection types
-        valid_protection_types = {"Residential real estate", "Commercial real estate", "Offices and commercial premises"}
+        valid_protection_types = {"Residential real estate collateral", "Commercial real estate collateral", "Offices and commercial premises"}
         
-        # Get the protection types at T and T-1
-        t_protection_types = df_protection_received["Protection received.Type of protection"]
-        t_minus_1_protection_types = t_protection_types.shift(1)
+        # Check if the protection type at T or T-1 is not in the valid set
+        t_protection_types = df_protection_received["Type of protection"]
+        t_minus_1_protection_types = history.previous("Type of protection")
+        outside_real_estate = ~t_protection_types.isin(valid_protection_types) | ~t_minus_1_protection_types.isin(valid_protection_types)
         
-        # Check if any of the protection types at T or T-1 are not in the valid set
-        invalid_rows = df_protection_received[~(t_protection_types.isin(valid_protection_types) | t_minus_1_protection_types.isin(valid_protection_types))]
+        # Filter rows where the protection type changed since T-1
+        invalid_rows = df_protection_received[outside_real_estate & history.changed("Type of protection")]
         
         return "CN0950", "Protection received", invalid_rows
     
+    @rule("CN0960", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Real estate collateral location", "Type of protection"],
+    }, row_local=True)
     def CN0960(self):
         # [Protection received.Real estate collateral location] = 'Non-applicable' 
         # IF AND ONLY IF [Protection received.Type of protection] NOT IN {'Residential real estate collateral', 
@@ -1349,15 +1746,17 @@ class RecordRules():
         # Create a set of valid collateral types
         valid_collateral_types = {'Residential real estate collateral', 'Commercial real estate collateral', 'Offices and commercial premises'}
         
-        # Get the collateral location and protection types
-        collateral_location = df_protection_received["Protection received.Real estate collateral location"]
-        protection_types = df_protection_received["Protection received.Type of protection"]
-        
         # Check if collateral location is 'Non-applicable' if protection type is not in the valid set
-        invalid_rows = df_protection_received[(collateral_location != 'Non-applicable') & (~protection_types.isin(valid_collateral_types))]
+        invalid_rows = df_protection_received[
+            (self.masks.mask("Protection received", "Real estate collateral location", "!=", 'Non-applicable')) &
+            (~self.masks.isin("Protection received", "Type of protection", valid_collateral_types))
+        ]
         
         return "CN0960", "Protection received", invalid_rows
     
+    @rule("CN0961", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Real estate collateral location - Country", "Type of protection"],
+    }, row_local=True)
     def CN0961(self):
         # [Protection received.Real Estate Collateral Location Country] = 'Non-applicable' 
         # IF AND ONLY IF [Protection received.Type of protection] NOT IN {'Residential real estate collateral', 
@@ -1368,15 +1767,17 @@ class RecordRules():
         # Create a set of valid collateral types
         valid_collateral_types = {'Residential real estate collateral', 'Commercial real estate collateral', 'Offices and commercial premises'}
         
-        # Get the collateral location country and protection types
-        collateral_location_country = df_protection_received["Protection received.Real Estate Collateral Location Country"]
-        protection_types = df_protection_received["Protection received.Type of protection"]
-        
         # Check if collateral location country is 'Non-applicable' if protection type is not in the valid set
-        invalid_rows = df_protection_received[(collateral_location_country != 'Non-applicable') & (~protection_types.isin(valid_collateral_types))]
+        invalid_rows = df_protection_received[
+            (self.masks.mask("Protection received", "Real estate collateral location - Country", "!=", 'Non-applicable')) &
+            (~self.masks.isin("Protection received", "Type of protection", valid_collateral_types))
+        ]
         
         return "CN0961", "Protection received", invalid_rows
     
+    @rule("CN0962", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Real estate collateral location - Region", "Type of protection"],
+    }, row_local=True)
     def CN0962(self):
         # [Protection received.Real Estate Collateral Location Region] = 'Non-applicable' 
         # IF AND ONLY IF [Protection received.Type of protection] 
@@ -1387,15 +1788,17 @@ class RecordRules():
         # Create a set of valid collateral types
         valid_collateral_types = {'Residential real estate collateral', 'Commercial real estate collateral', 'Offices and commercial premises'}
         
-        # Get the collateral location region and protection types
-        collateral_location_region = df_protection_received["Protection received.Real Estate Collateral Location Region"]
-        protection_types = df_protection_received["Protection received.Type of protection"]
-        
         # Check if collateral location region is 'Non-applicable' if protection type is not in the valid set
-        invalid_rows = df_protection_received[(collateral_location_region != 'Non-applicable') & (~protection_types.isin(valid_collateral_types))]
+        invalid_rows = df_protection_received[
+            (self.masks.mask("Protection received", "Real estate collateral location - Region", "!=", 'Non-applicable')) &
+            (~self.masks.isin("Protection received", "Type of protection", valid_collateral_types))
+        ]
         
         return "CN0962", "Protection received", invalid_rows
     
+    @rule("CN0963", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Real estate collateral location - Post Code", "Type of protection"],
+    }, row_local=True)
     def CN0963(self):
         # [Protection received.Real Estate Collateral Location Postal Code] = 'Non-applicable' 
         # IF AND ONLY IF [Protection received.Type of protection] 
@@ -1406,15 +1809,17 @@ class RecordRules():
         # Create a set of valid collateral types
         valid_collateral_types = {'Residential real estate collateral', 'Commercial real estate collateral', 'Offices and commercial premises'}
         
-        # Get the collateral location postal code and protection types
-        collateral_location_postal_code = df_protection_received["Protection received.Real Estate Collateral Location Postal Code"]
-        protection_types = df_protection_received["Protection received.Type of protection"]
-        
         # Check if collateral location postal code is 'Non-applicable' if protection type is not in the valid set
-        invalid_rows = df_protection_received[(collateral_location_postal_code != 'Non-applicable') & (~protection_types.isin(valid_collateral_types))]
+        invalid_rows = df_protection_received[
+            (self.masks.mask("Protection received", "Real estate collateral location - Post Code", "!=", 'Non-applicable')) &
+            (~self.masks.isin("Protection received", "Type of protection", valid_collateral_types))
+        ]
         
         return "CN0963", "Protection received", invalid_rows
     
+    @rule("CN0980", RuleCategory.CONSISTENCY, {
+        "Protection received": ["Real estate collateral location", "Real estate collateral location - Country", "Real estate collateral location - Region", "Real estate collateral location - Post Code"],
+    }, row_local=True)
     def CN0980(self):
         # IF [Protection received.Real estate collateral location] <> <empty> THEN
         # [Protection received.Real estate collateral location country] = <empty> AND
@@ -1424,10 +1829,10 @@ class RecordRules():
         df_protection_received = self.df_dict["Protection received"]
         
         # Get the collateral location, country, region, and postal code
-        collateral_location = df_protection_received["Protection received.Real estate collateral location"]
-        collateral_location_country = df_protection_received["Protection received.Real estate collateral location country"]
-        collateral_location_region = df_protection_received["Protection received.Real estate collateral location region"]
-        collateral_location_postal_code = df_protection_received["Protection received.Real estate collateral location postal code"]
+        collateral_location = df_protection_received["Real estate collateral location"]
+        collateral_location_country = df_protection_received["Real estate collateral location - Country"]
+        collateral_location_region = df_protection_received["Real estate collateral location - Region"]
+        collateral_location_postal_code = df_protection_received["Real estate collateral location - Post Code"]
         
         # Check if collateral location is not empty, then other fields should be empty
         invalid_rows = df_protection_received[
@@ -1440,6 +1845,10 @@ class RecordRules():
         return "CN0980", "Protection received", invalid_rows
     
     
+    @rule("RI0030", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+    })
     def RI0030(self):
         # ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
         # EXISTS IN {([Instrument.Observed agent identifier],[Instrument.Contract identifier],[Instrument.Instrument identifier])}
@@ -1447,85 +1856,95 @@ class RecordRules():
         df_financial = self.df_dict["Financial"]
         df_instrument = self.df_dict["Instrument"]
         
-        # Create a set of tuples for ([Instrument.Observed agent identifier],[Instrument.Contract identifier],[Instrument.Instrument identifier])
-        instrument_keys = set(
-            tuple(row)
-            for row in df_instrument[["Instrument.Observed agent identifier", "Instrument.Contract identifier", "Instrument.Instrument identifier"]].values
-        )
-        
-        # Check if the financial keys exist in the instrument keys set
+        # Check if the financial keys exist in the instrument keys
         invalid_rows = df_financial[
-            ~df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].apply(tuple, axis=1).isin(instrument_keys)
+            ~key_isin(
+                df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+                df_instrument, ["Observed agent identifier", "Contract identifier", "Instrument identifier"]
+            )
         ]
         
         return "RI0030", "Financial", invalid_rows
 
+    @rule("RI0050", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Counterparty-instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier", "Counterparty role"],
+    })
     def RI0050(self):
         # ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
         # EXISTS IN {([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])},
         # where [Counterparty-instrument.Counterparty role]='Creditor'
         
         df_financial = self.df_dict["Financial"]
-        df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         
-        # Create a set of tuples for ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])
-        creditor_instrument_keys = set(
-            tuple(row)
-            for row in df_counterparty_instrument[df_counterparty_instrument["Counterparty-instrument.Counterparty role"] == "Creditor"]
-            [["Counterparty-instrument.Observed agent identifier", "Counterparty-instrument.Contract identifier", "Counterparty-instrument.Instrument identifier"]].values
+        # Roles per instrument key of Counterparty-instrument
+        instrument_roles = self.roles.table(
+            "Counterparty-instrument",
+            ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+            "Counterparty role"
         )
         
-        # Check if the financial keys exist in the creditor instrument keys set
+        # Check if the financial keys exist in the creditor instrument keys
         invalid_rows = df_financial[
-            ~df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].apply(tuple, axis=1).isin(creditor_instrument_keys)
+            ~instrument_roles.has_role(df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"], CREDITOR)
         ]
         
         return "RI0050", "Financial", invalid_rows
 
+    @rule("RI0060", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Counterparty-instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier", "Counterparty role"],
+    })
     def RI0060(self):
         # ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
         # EXISTS IN {([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])},
         # where [Counterparty-instrument.Counterparty role]='Debtor'
         
         df_financial = self.df_dict["Financial"]
-        df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         
-        # Create a set of tuples for ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])
-        debtor_instrument_keys = set(
-            tuple(row)
-            for row in df_counterparty_instrument[df_counterparty_instrument["Counterparty-instrument.Counterparty role"] == "Debtor"]
-            [["Counterparty-instrument.Observed agent identifier", "Counterparty-instrument.Contract identifier", "Counterparty-instrument.Instrument identifier"]].values
+        # Roles per instrument key of Counterparty-instrument
+        instrument_roles = self.roles.table(
+            "Counterparty-instrument",
+            ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+            "Counterparty role"
         )
         
-        # Check if the financial keys exist in the debtor instrument keys set
+        # Check if the financial keys exist in the debtor instrument keys
         invalid_rows = df_financial[
-            ~df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].apply(tuple, axis=1).isin(debtor_instrument_keys)
+            ~instrument_roles.has_role(df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"], DEBTOR)
         ]
         
         return "RI0060", "Financial", invalid_rows    
     
+    @rule("RI0070", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Counterparty-instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier", "Counterparty role"],
+    })
     def RI0070(self):
         # ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
         # EXISTS IN {([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])},
         # where [Counterparty-instrument.Counterparty role]='Servicer'
         
         df_financial = self.df_dict["Financial"]
-        df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         
-        # Create a set of tuples for ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])
-        servicer_instrument_keys = set(
-            tuple(row)
-            for row in df_counterparty_instrument[df_counterparty_instrument["Counterparty-instrument.Counterparty role"] == "Servicer"]
-            [["Counterparty-instrument.Observed agent identifier", "Counterparty-instrument.Contract identifier", "Counterparty-instrument.Instrument identifier"]].values
+        # Roles per instrument key of Counterparty-instrument
+        instrument_roles = self.roles.table(
+            "Counterparty-instrument",
+            ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+            "Counterparty role"
         )
         
-        # Check if the financial keys exist in the servicer instrument keys set
+        # Check if the financial keys exist in the servicer instrument keys
         invalid_rows = df_financial[
-            ~df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].apply(tuple, axis=1).isin(servicer_instrument_keys)
+            ~instrument_roles.has_role(df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"], SERVICER)
         ]
         
         return "RI0070", "Financial", invalid_rows
 
+    @rule("RI0090", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+    })
     def RI0090(self):
         # ([Instrument.Observed agent identifier],[Instrument.Contract identifier],[Instrument.Instrument identifier])
         # EXISTS IN {([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])}
@@ -1533,19 +1952,20 @@ class RecordRules():
         df_instrument = self.df_dict["Instrument"]
         df_financial = self.df_dict["Financial"]
         
-        # Create a set of tuples for ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
-        financial_keys = set(
-            tuple(row)
-            for row in df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].values
-        )
-        
-        # Check if the instrument keys exist in the financial keys set
+        # Check if the instrument keys exist in the financial keys
         invalid_rows = df_instrument[
-            ~df_instrument[["Instrument.Observed agent identifier", "Instrument.Contract identifier", "Instrument.Instrument identifier"]].apply(tuple, axis=1).isin(financial_keys)
+            ~key_isin(
+                df_instrument, ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+                df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"]
+            )
         ]
         
         return "RI0090", "Instrument", invalid_rows
 
+    @rule("RI0110", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Counterparty-instrument": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+    })
     def RI0110(self):
         # ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Contract identifier],[Counterparty-instrument.Instrument identifier])
         # EXISTS IN {([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])}
@@ -1553,20 +1973,21 @@ class RecordRules():
         df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         df_financial = self.df_dict["Financial"]
         
-        # Create a set of tuples for ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
-        financial_keys = set(
-            tuple(row)
-            for row in df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].values
-        )
-        
-        # Check if the counterparty instrument keys exist in the financial keys set
+        # Check if the counterparty instrument keys exist in the financial keys
         invalid_rows = df_counterparty_instrument[
-            ~df_counterparty_instrument[["Counterparty-instrument.Observed agent identifier", "Counterparty-instrument.Contract identifier", "Counterparty-instrument.Instrument identifier"]].apply(tuple, axis=1).isin(financial_keys)
+            ~key_isin(
+                df_counterparty_instrument, ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+                df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"]
+            )
         ]
         
         return "RI0110", "Counterparty-instrument", invalid_rows
     
 
+    @rule("RI0130", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Instrument-protection received": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+        "Financial": ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+    })
     def RI0130(self):
         # ([Instrument-protection received.Observed agent identifier],[Instrument-protection received.Contract identifier],[Instrument-protection received.Instrument identifier])
         # EXISTS IN {([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])}
@@ -1574,19 +1995,21 @@ class RecordRules():
         df_instrument_protection_received = self.df_dict["Instrument-protection received"]
         df_financial = self.df_dict["Financial"]
         
-        # Create a set of tuples for ([Financial.Observed agent identifier],[Financial.Contract identifier],[Financial.Instrument identifier])
-        financial_keys = set(
-            tuple(row)
-            for row in df_financial[["Financial.Observed agent identifier", "Financial.Contract identifier", "Financial.Instrument identifier"]].values
-        )
-        
-        # Check if the instrument-protection received keys exist in the financial keys set
+        # Check if the instrument-protection received keys exist in the financial keys
         invalid_rows = df_instrument_protection_received[
-            ~df_instrument_protection_received[["Instrument-protection received.Observed agent identifier", "Instrument-protection received.Contract identifier", "Instrument-protection received.Instrument identifier"]].apply(tuple, axis=1).isin(financial_keys)
+            ~key_isin(
+                df_instrument_protection_received, ["Observed agent identifier", "Contract identifier", "Instrument identifier"],
+                df_financial, ["Observed agent identifier", "Contract identifier", "Instrument identifier"]
+            )
         ]
         
         return "RI0130", "Instrument-protection received", invalid_rows
 
+    @rule("RI0191", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Counterparty default": ["Observed agent identifier", "Counterparty identifier"],
+        "Counterparty-instrument": ["Observed agent identifier", "Counterparty identifier", "Counterparty role"],
+        "Protection received": ["Observed agent identifier", "Protection provider identifier"],
+    })
     def RI0191(self):
         # ([Counterparty default.Observed agent identifier],[Counterparty default.Counterparty Identifier])
         # EXISTS IN {(([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Counterparty Identifier]) | [Counterparty-instrument.Counterparty role]='Debtor')
@@ -1596,26 +2019,31 @@ class RecordRules():
         df_counterparty_instrument = self.df_dict["Counterparty-instrument"]
         df_protection_received = self.df_dict["Protection received"]
         
-        # Create sets of tuples for ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Counterparty Identifier])
-        debtor_counterparty_instrument_keys = set(
-            tuple(row)
-            for row in df_counterparty_instrument[df_counterparty_instrument["Counterparty-instrument.Counterparty role"] == "Debtor"]
-            [["Counterparty-instrument.Observed agent identifier", "Counterparty-instrument.Counterparty Identifier"]].values
+        default_keys = ["Observed agent identifier", "Counterparty identifier"]
+        
+        # Keys of debtors in ([Counterparty-instrument.Observed agent identifier],[Counterparty-instrument.Counterparty Identifier])
+        in_debtor_keys = key_isin(
+            df_counterparty_default, default_keys,
+            df_counterparty_instrument, ["Observed agent identifier", "Counterparty identifier"],
+            build_mask=(self.roles.rows("Counterparty-instrument", "Counterparty role") & DEBTOR) != 0
         )
         
-        protection_received_keys = set(
-            tuple(row)
-            for row in df_protection_received[["Protection received.Observed agent identifier", "Protection received.Protection provider identifier"]].values
+        # Keys of protection providers in ([Protection received.Observed agent identifier],[Protection received.Protection provider identifier])
+        in_protection_received_keys = key_isin(
+            df_counterparty_default, default_keys,
+            df_protection_received, ["Observed agent identifier", "Protection provider identifier"]
         )
         
         # Check if the counterparty default keys exist in the union of debtor counterparty instrument keys and protection received keys
-        invalid_rows = df_counterparty_default[
-            ~df_counterparty_default[["Counterparty default.Observed agent identifier", "Counterparty default.Counterparty Identifier"]].apply(tuple, axis=1).isin(debtor_counterparty_instrument_keys.union(protection_received_keys))
-        ]
+        invalid_rows = df_counterparty_default[~(in_debtor_keys | in_protection_received_keys)]
         
         return "RI0191", "Counterparty default", invalid_rows    
 
 
+    @rule("RI0220", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Protection received": ["Observed agent identifier", "Protection identifier"],
+        "Instrument-protection received": ["Observed agent identifier", "Protection identifier"],
+    })
     def RI0220(self):
         # ([Protection received.Observed agent identifier],[Protection received.Protection identifier])
         # EXISTS IN {([Instrument-protection received.Observed agent identifier],[Instrument-protection received.Protection identifier])}
@@ -1623,19 +2051,20 @@ class RecordRules():
         df_protection_received = self.df_dict["Protection received"]
         df_instrument_protection_received = self.df_dict["Instrument-protection received"]
         
-        # Create a set of tuples for ([Instrument-protection received.Observed agent identifier],[Instrument-protection received.Protection identifier])
-        instrument_protection_received_keys = set(
-            tuple(row)
-            for row in df_instrument_protection_received[["Instrument-protection received.Observed agent identifier", "Instrument-protection received.Protection identifier"]].values
-        )
-        
-        # Check if the protection received keys exist in the instrument-protection received keys set
+        # Check if the protection received keys exist in the instrument-protection received keys
         invalid_rows = df_protection_received[
-            ~df_protection_received[["Protection received.Observed agent identifier", "Protection received.Protection identifier"]].apply(tuple, axis=1).isin(instrument_protection_received_keys)
+            ~key_isin(
+                df_protection_received, ["Observed agent identifier", "Protection identifier"],
+                df_instrument_protection_received, ["Observed agent identifier", "Protection identifier"]
+            )
         ]
         
         return "RI0220", "Protection received", invalid_rows
 
+    @rule("RI0250", RuleCategory.REFERENTIAL_INTEGRITY, {
+        "Instrument-protection received": ["Observed agent identifier", "Protection identifier"],
+        "Protection received": ["Observed agent identifier", "Protection identifier"],
+    })
     def RI0250(self):
         # ([Instrument-protection received.Observed agent identifier],[Instrument-protection received.Protection identifier])
         # EXISTS IN {([Protection received.Observed agent identifier],[Protection received.Protection identifier])}
@@ -1643,40 +2072,18 @@ class RecordRules():
         df_instrument_protection_received = self.df_dict["Instrument-protection received"]
         df_protection_received = self.df_dict["Protection received"]
         
-        # Create a set of tuples for ([Protection received.Observed agent identifier],[Protection received.Protection identifier])
-        protection_received_keys = set(
-            tuple(row)
-            for row in df_protection_received[["Protection received.Observed agent identifier", "Protection received.Protection identifier"]].values
-        )
-        
-        # Check if the instrument-protection received keys exist in the protection received keys set
+        # Check if the instrument-protection received keys exist in the protection received keys
         invalid_rows = df_instrument_protection_received[
-            ~df_instrument_protection_received[["Instrument-protection received.Observed agent identifier", "Instrument-protection received.Protection identifier"]].apply(tuple, axis=1).isin(protection_received_keys)
+            ~key_isin(
+                df_instrument_protection_received, ["Observed agent identifier", "Protection identifier"],
+                df_protection_received, ["Observed agent identifier", "Protection identifier"]
+            )
         ]
         
         return "RI0250", "Instrument-protection received", invalid_rows
     
 
-# Example usage
-# Assuming you have your dataframes ready
-# df_counterparty_instrument = ...
-# df_counterparty_reference = ...
-
-# Store the dataframes in a dictionary
-df_dict = {
-    "Counterparty-instrument": df_counterparty_instrument,
-    "Counterparty-reference": df_counterparty_reference
-}
-
-# Create an instance of RecordRules
-record_rules = RecordRules(df_dict)
-
-# Perform the validation check CR001
-rule_code, reference_name, invalid_rows = record_rules.CR001()
-
-# Display the results
-print("Rule Code:", rule_code)
-print("Reference Name:", reference_name)
-print("Invalid rows:")
-print(invalid_rows)
-
+if __name__ == "__main__":
+    validator = DataValidator("your_dataset_path.csv")
+    validation_results = validator.apply_validation_rules()
+    validator.generate_report(validation_results)
@@ -0,0 +1,64 @@
+# Benchmark of the composite-key membership used by the RI rules against the previous
+# tuple-set implementation (set of row tuples + DataFrame.apply(tuple, axis=1)).
+#
+#   python benchmarks/bench_composite_keys.py --rows 1000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keys import key_isin  # noqa: E402
+
+KEYS = ["Observed agent identifier", "Contract identifier", "Instrument identifier"]
+
+
+def make_tables(rows, missing_rate, seed=0):
+    rng = np.random.default_rng(seed)
+    agents = np.array(["OA%03d" % i for i in range(20)])
+    instruments = pd.DataFrame({
+        "Observed agent identifier": agents[rng.integers(0, len(agents), rows)],
+        "Contract identifier": ["CTR%09d" % i for i in range(rows)],
+        "Instrument identifier": ["INS%09d" % i for i in range(rows)],
+    })
+    financial = instruments.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+    broken = rng.random(rows) < missing_rate
+    financial.loc[broken, "Instrument identifier"] = "UNKNOWN"
+    return financial, instruments
+
+
+def tuple_set_isin(probe, build):
+    build_keys = set(tuple(row) for row in build[KEYS].values)
+    return probe[KEYS].apply(tuple, axis=1).isin(build_keys)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--missing-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    financial, instruments = make_tables(args.rows, args.missing_rate)
+
+    old, old_seconds = timed(tuple_set_isin, financial, instruments)
+    new, new_seconds = timed(key_isin, financial, KEYS, instruments, KEYS)
+    assert (old.to_numpy() == new.to_numpy()).all(), "key_isin disagrees with the tuple-set implementation"
+
+    print("rows: %d, keys not found: %d" % (args.rows, (~new).sum()))
+    print("tuple set + apply(tuple): %8.3f s" % old_seconds)
+    print("key_isin:                 %8.3f s" % new_seconds)
+    print("speedup:                  %8.1fx" % (old_seconds / new_seconds))
+
+
+if __name__ == "__main__":
+    main()
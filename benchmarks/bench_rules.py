@@ -0,0 +1,115 @@
+# Benchmark of every registered rule on a synthetic submission (see synthetic.py): time, CPU, peak memory
+# and throughput per rule and per rule family, written as JSON. With --baseline, rules that got slower than
+# the baseline run by more than --tolerance are listed and the exit status is 1.
+#
+#   python benchmarks/bench_rules.py --instruments 1000000 --violation-rate 0.01 --output bench_1m.json
+#   python benchmarks/bench_rules.py --instruments 1000000 --baseline bench_1m.json
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RecordRules import DataValidator, RecordRules  # noqa: E402
+from joins import JoinCache  # noqa: E402
+from options import ExecutionOptions  # noqa: E402
+from profiling import Profiler  # noqa: E402
+from registry import execution_plan  # noqa: E402
+from results import RuleFailure, evaluate_rule  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+# Timings below this are noise and are not compared against the baseline
+MIN_COMPARED_SECONDS = 0.05
+
+
+def run(directory, trace_memory=True):
+    profiler = Profiler(trace_memory=trace_memory)
+    validator = DataValidator(directory, options=ExecutionOptions(profile=profiler))
+    rules = RecordRules(validator.df_dict, JoinCache(validator.df_dict, profiler=profiler))
+
+    errors = {}
+    for spec in execution_plan(validator.rules, available=validator.df_dict):
+        _, _, positions = evaluate_rule(rules, spec.method_name, profiler)
+        if isinstance(positions, RuleFailure):  # a broken rule is reported, it does not stop the benchmark
+            errors[spec.rule_id] = positions.message
+
+    frame = profiler.frame()
+    steps = frame[frame["stage"] == "filter"].rename(columns={"name": "rule"})
+    specs = {spec.rule_id: spec for spec in validator.rules}
+    steps = steps.assign(
+        category=[specs[r].category for r in steps["rule"]],
+        dataset=[specs[r].dataset for r in steps["rule"]],
+        rows_per_second=steps["rows_in"].astype(float) / steps["wall_seconds"],
+    )
+    return frame, steps, errors
+
+
+def compare(steps, baseline, tolerance):
+    previous = {r["rule"]: r for r in baseline["rules"]}
+    regressions = []
+    for row in steps.to_dict("records"):
+        old = previous.get(row["rule"])
+        if old is None or max(old["wall_seconds"], row["wall_seconds"]) < MIN_COMPARED_SECONDS:
+            continue
+        if row["wall_seconds"] > old["wall_seconds"] * (1 + tolerance):
+            regressions.append((row["rule"], old["wall_seconds"], row["wall_seconds"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instruments", type=int, default=10_000, help="e.g. 10000, 1000000, 10000000")
+    parser.add_argument("--violation-rate", type=float, default=0.01)
+    parser.add_argument("--periods", type=int, default=2)
+    parser.add_argument("--data-dir", help="reuse (or keep) the generated submission in this directory")
+    parser.add_argument("--no-memory", action="store_true", help="do not trace memory (tracemalloc slows rules down)")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON written by a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.data_dir or scratch
+        if not os.path.exists(os.path.join(directory, "instrument.csv")):
+            generate(directory, args.instruments, args.violation_rate, args.periods)
+        frame, steps, errors = run(directory, trace_memory=not args.no_memory)
+
+    pd.set_option("display.width", 200)
+    stages = frame.groupby("stage")[["wall_seconds", "cpu_seconds"]].sum()
+    families = steps.groupby("category").agg(
+        rules=("rule", "size"), wall_seconds=("wall_seconds", "sum"), violations=("rows_out", "sum"),
+    )
+    columns = ["rule", "category", "dataset", "rows_in", "rows_out", "wall_seconds", "cpu_seconds", "peak_memory_bytes", "rows_per_second"]
+    print(stages.to_string(float_format="%.3f"), end="\n\n")
+    print(families.to_string(float_format="%.3f"), end="\n\n")
+    print(steps.sort_values("wall_seconds", ascending=False)[columns].to_string(index=False, float_format="%.3f"))
+    for rule_id, error in errors.items():
+        print("%s failed: %s" % (rule_id, error))
+
+    results = {
+        "instruments": args.instruments,
+        "violation_rate": args.violation_rate,
+        "periods": args.periods,
+        "stages": stages.to_dict("index"),
+        "rules": json.loads(steps[columns].to_json(orient="records")),
+        "errors": errors,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(steps, json.load(f), args.tolerance)
+        for rule_id, before, after in regressions:
+            print("REGRESSION %s: %.3f s -> %.3f s" % (rule_id, before, after))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Parity check of the partitioned execution (partitions.py) against a plain run on the same submission:
+# per rule the violation counts of both and whether the violating rows agree, plus the total timings.
+# The exit status is 1 if a rule reports different rows.
+#
+#   python benchmarks/compare_partitions.py /tmp/anacredit_1m --workers 4 --partitions 16
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RecordRules import DataValidator  # noqa: E402
+from options import ExecutionOptions  # noqa: E402
+from registry import RULES  # noqa: E402
+
+
+def compare(directory, workers, partitions):
+    started = time.perf_counter()
+    plain = DataValidator(directory).apply_validation_rules()
+    plain_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    partitioned = DataValidator(directory, options=ExecutionOptions(workers=workers, partitions=partitions)).apply_validation_rules()
+    partitioned_seconds = time.perf_counter() - started
+
+    rows = []
+    for rule_id, message in {**plain.errors, **partitioned.errors}.items():
+        rows.append({"rule": rule_id, "by_agent": RULES[rule_id].by_agent, "status": "failed: " + message})
+    for rule_id in plain.rule_ids:
+        if rule_id in partitioned.errors:
+            continue
+        row = {"rule": rule_id, "dataset": plain.datasets[rule_id], "by_agent": RULES[rule_id].by_agent,
+               "violations": len(plain.positions[rule_id]), "partitioned_violations": len(partitioned.positions[rule_id])}
+        if partitioned.datasets[rule_id] != plain.datasets[rule_id]:
+            row["status"] = "reported dataset differs"
+        elif row["violations"] == row["partitioned_violations"] and (plain.positions[rule_id] == partitioned.positions[rule_id]).all():
+            row["status"] = "same"
+        else:
+            row["status"] = "DIFFERENT"
+        rows.append(row)
+    return pd.DataFrame(rows), plain_seconds, partitioned_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="submission directory, e.g. written by synthetic.py")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes of the partitioned run")
+    parser.add_argument("--partitions", type=int, default=8, help="observed agent partitions")
+    args = parser.parse_args()
+
+    frame, plain_seconds, partitioned_seconds = compare(args.directory, args.workers, args.partitions)
+    pd.set_option("display.width", 200)
+    print(frame.to_string(index=False))
+    print("\nplain: %.3f s, partitioned (%d workers, %d partitions): %.3f s" % (plain_seconds, args.workers, args.partitions, partitioned_seconds))
+    if (frame["status"] == "DIFFERENT").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Parity check of the Polars backend (polars_backend.py) against the pandas rules on the same submission:
+# per rule the violation counts, the timings of both and whether the violating rows agree.
+# The exit status is 1 if a rule reports different rows.
+#
+#   python benchmarks/compare_polars.py /tmp/anacredit_1m
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RecordRules import DataValidator, RecordRules  # noqa: E402
+from polars_backend import POLARS_RULES, PolarsRules  # noqa: E402
+from registry import RULES  # noqa: E402
+from results import RuleFailure, evaluate_rule  # noqa: E402
+
+
+def compare(directory):
+    validator = DataValidator(directory, rules=list(POLARS_RULES))
+    pandas_rules = RecordRules(validator.df_dict)
+    polars_rules = PolarsRules(validator.df_dict)
+
+    rows = []
+    for rule_id in POLARS_RULES:
+        spec = RULES[rule_id]
+        if not set(spec.datasets) <= set(validator.df_dict):
+            continue
+        started = time.perf_counter()
+        _, polars_dataset, polars_positions = polars_rules.evaluate(spec)
+        row = {"rule": rule_id, "polars_dataset": polars_dataset, "polars_seconds": time.perf_counter() - started}
+        started = time.perf_counter()
+        _, dataset, positions = evaluate_rule(pandas_rules, spec.method_name)
+        if isinstance(positions, RuleFailure) or isinstance(polars_positions, RuleFailure):
+            failure = positions if isinstance(positions, RuleFailure) else polars_positions
+            row["status"] = "failed: " + failure.message
+            rows.append(row)
+            continue
+        row.update(polars_violations=len(polars_positions), pandas_dataset=dataset, pandas_violations=len(positions),
+                   pandas_seconds=time.perf_counter() - started)
+        if dataset != polars_dataset:
+            row["status"] = "reported dataset differs"
+        elif len(positions) == len(polars_positions) and (positions == polars_positions).all():
+            row["status"] = "same"
+        else:
+            row["status"] = "DIFFERENT"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="submission directory, e.g. written by synthetic.py")
+    args = parser.parse_args()
+
+    frame = compare(args.directory)
+    pd.set_option("display.width", 200)
+    print(frame.to_string(index=False, float_format="%.3f"))
+    if (frame["status"] == "DIFFERENT").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
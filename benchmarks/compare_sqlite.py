@@ -0,0 +1,62 @@
+# Runs the rules that have an SQL equivalent both in pandas and in SQLite (sqlite_backend.py) on the same
+# submission and lists, per rule, the violation counts, the timings and whether the violating rows agree.
+# The exit status is 1 if a rule reports different rows.
+#
+#   python benchmarks/compare_sqlite.py /tmp/anacredit_1m --database /tmp/anacredit_1m.sqlite
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RecordRules import DataValidator, RecordRules  # noqa: E402
+from results import RuleFailure, evaluate_rule  # noqa: E402
+from sqlite_backend import SQL_RULES  # noqa: E402
+
+
+def compare(directory, database_path=None):
+    validator = DataValidator(directory, rules=list(SQL_RULES))
+    started = time.perf_counter()
+    sql_results = validator.apply_sql_rules(database_path)
+    sql_seconds = time.perf_counter() - started
+
+    rules = RecordRules(validator.df_dict)
+    rows = [{"rule": rule_id, "status": "SQLite failed: " + message} for rule_id, message in sql_results.errors.items()]
+    for rule_id in sql_results.rule_ids:
+        row = {"rule": rule_id, "sql_dataset": sql_results.datasets[rule_id], "sql_violations": len(sql_results.positions[rule_id])}
+        started = time.perf_counter()
+        _, dataset, positions = evaluate_rule(rules, SQL_RULES[rule_id].rule_id)
+        if isinstance(positions, RuleFailure):
+            row["status"] = "pandas failed: " + positions.message
+            rows.append(row)
+            continue
+        row.update(pandas_dataset=dataset, pandas_violations=len(positions), pandas_seconds=time.perf_counter() - started)
+        if dataset != row["sql_dataset"]:
+            row["status"] = "reported dataset differs"
+        elif len(positions) == row["sql_violations"] and (positions == sql_results.positions[rule_id]).all():
+            row["status"] = "same"
+        else:
+            row["status"] = "DIFFERENT"
+        rows.append(row)
+    return pd.DataFrame(rows), sql_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="submission directory, e.g. written by synthetic.py")
+    parser.add_argument("--database", help="SQLite file to stage into (default: next to the CSV files)")
+    args = parser.parse_args()
+
+    frame, sql_seconds = compare(args.directory, args.database)
+    pd.set_option("display.width", 200)
+    print(frame.to_string(index=False, float_format="%.3f"))
+    print("\nSQLite staging + rules: %.3f s" % sql_seconds)
+    if (frame["status"] == "DIFFERENT").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# Synthetic AnaCredit-style submission for benchmarks. Every dataset has the attributes of the template
+# (schema.load_schemas, with the attributes of the external datasets from schema.EXTERNAL_ATTRIBUTES) and
+# every coded attribute reports descriptions of its code list (code_lists.load_code_lists), so the data
+# passes the domain checks and the rules compare it with the values they expect.
+# Records are consistent across datasets (same observed agent / contract / instrument keys, counterparties and
+# protections referenced from the instruments) and stable across reference periods; a fraction
+# violation_rate of the values is replaced by an invalid one (unknown identifier, out-of-order date,
+# negative amount, 'Non-applicable' code).
+#
+#   python benchmarks/synthetic.py /tmp/anacredit_1m --instruments 1000000 --violation-rate 0.01
+import argparse
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from code_lists import load_code_lists  # noqa: E402
+from domains import DomainChecker  # noqa: E402
+from interning import IdentifierDomain, identifier_domain  # noqa: E402
+from schema import AttributeKind, dataset_file_name, load_schemas, normalise_name  # noqa: E402
+
+OBSERVED_AGENTS = 20
+CHUNK_ROWS = 1_000_000
+
+# Codes that are sentinels rather than values: coded attributes draw from the other codes of their list
+SENTINEL_CODES = {"NA", "NR"}
+
+# RIAD institutional sectors (not part of the AnaCredit code lists), as the counterparty reference reports them
+INSTITUTIONAL_SECTORS = ["Non-financial corporations", "Households", "General government", "Other financial intermediaries",
+                         "Financial vehicle corporations (FVCs) engaged in securitisation transactions"]
+
+# Days after an entity's base date, so that dates of one record are in a plausible order
+DATE_OFFSETS = {
+    "inception date": 0,
+    "settlement date": 10,
+    "date of original protection value": 0,
+    "date of protection value": 100,
+    "end date of interest-only period": 400,
+    "legal final maturity date": 5000,
+    "next interest rate reset date": 5000,
+    "maturity date of protection": 6000,
+}
+
+# Dates that a share of the records (1 in n) reports as 'Non-applicable', e.g. instruments never in default
+NON_APPLICABLE_DATES = {
+    "end date of interest-only period": 2,
+    "date of default status of instrument": 4,
+    "date of default status of counterparty": 4,
+    "date of past due for instrument": 4,
+    "date of forbearance and renegotiation status": 4,
+}
+
+IDENTIFIER_PREFIXES = {
+    IdentifierDomain.OBSERVED_AGENT: "OA",
+    IdentifierDomain.REPORTING_AGENT: "RA",
+    IdentifierDomain.CONTRACT: "CTR",
+    IdentifierDomain.INSTRUMENT: "INS",
+    IdentifierDomain.COUNTERPARTY: "CP",
+    IdentifierDomain.PROTECTION: "PRO",
+}
+
+
+def dataset_sizes(instruments: int) -> dict:
+    # Entities (rows per reference period) of each dataset
+    counterparties = max(1, instruments // 2)
+    protections = max(1, instruments // 2)
+    return {
+        "Instrument": instruments,
+        "Financial": instruments,
+        "Accounting": instruments,
+        "Counterparty-instrument": 2 * instruments,  # creditor and debtor of each instrument
+        "Counterparty-reference": counterparties,
+        "Joint liabilities": counterparties,
+        "Counterparty risk": counterparties,
+        "Counterparty default": counterparties,
+        "Protection received": protections,
+        "Instrument-protection received": protections,
+    }
+
+
+def entities(dataset: str, rows: np.ndarray, instruments: int) -> dict:
+    # Identifier domain -> entity numbers of the given rows of a dataset
+    counterparties = max(1, instruments // 2)
+    if dataset == "Counterparty-instrument":
+        instrument = rows // 2
+        counterparty = np.where(rows % 2 == 0, (instrument * 7 + 1) % counterparties, instrument % counterparties)
+    elif dataset in ("Protection received", "Instrument-protection received"):
+        instrument = (2 * rows) % instruments
+        counterparty = rows % counterparties
+    elif dataset in ("Counterparty-reference", "Joint liabilities", "Counterparty risk", "Counterparty default"):
+        instrument = (2 * rows) % instruments
+        counterparty = rows
+    else:
+        instrument = rows
+        counterparty = instrument % counterparties
+    return {
+        IdentifierDomain.OBSERVED_AGENT: instrument % OBSERVED_AGENTS,
+        IdentifierDomain.REPORTING_AGENT: instrument % OBSERVED_AGENTS,
+        IdentifierDomain.CONTRACT: instrument,
+        IdentifierDomain.INSTRUMENT: instrument,
+        IdentifierDomain.COUNTERPARTY: counterparty,
+        IdentifierDomain.PROTECTION: rows if dataset in ("Protection received", "Instrument-protection received") else instrument,
+        "row": rows,
+    }
+
+
+def _hash(values: np.ndarray, salt: str) -> np.ndarray:
+    # Deterministic per-entity pseudo random numbers, identical in every reference period
+    return (values.astype("uint64") * np.uint64(2654435761) + np.uint64(zlib.crc32(salt.encode()))) % np.uint64(2 ** 31)
+
+
+def column_values(column: str, kind: str, code_list, ids: dict, reference_date: pd.Timestamp) -> np.ndarray:
+    # code_list is the Mapping of a coded attribute, None for the others
+    name = normalise_name(column)
+    domain = identifier_domain(column)
+    row = ids["row"]
+    if domain is not None:
+        prefix = IDENTIFIER_PREFIXES.get(domain, "ID")
+        return (prefix + pd.Series(ids.get(domain, row)).astype(str).str.zfill(9)).to_numpy(dtype=object)
+    if name.startswith("role "):
+        return np.where(_hash(row, name) % 2 == 0, "True", "False").astype(object)
+    if name == "institutional sector":
+        return np.array(INSTITUTIONAL_SECTORS, dtype=object)[_hash(row, name) % len(INSTITUTIONAL_SECTORS)]
+
+    if kind == AttributeKind.DATE:
+        if name == "reference date":
+            return np.full(len(row), reference_date.strftime("%Y-%m-%d"), dtype=object)
+        base = pd.Timestamp("2005-01-01") + pd.to_timedelta(_hash(ids[IdentifierDomain.INSTRUMENT], "date") % 3000, unit="D")
+        dates = (base + pd.Timedelta(days=DATE_OFFSETS.get(name, 50))).strftime("%Y-%m-%d").to_numpy(dtype=object)
+        if name in NON_APPLICABLE_DATES:
+            dates[_hash(row, name) % NON_APPLICABLE_DATES[name] == 0] = "Non-applicable"
+        return dates
+    if kind == AttributeKind.AMOUNT:
+        return (pd.Series(_hash(row, name) % 1_000_000 + 1).astype(str)).to_numpy(dtype=object)
+    if code_list is not None:
+        vocabulary = np.array([description for code, description in code_list.mapdict.items() if code not in SENTINEL_CODES], dtype=object)
+        return vocabulary[_hash(row, name) % len(vocabulary)]
+    # Free text, e.g. the real estate collateral post code
+    return (pd.Series(_hash(row, name) % 90000 + 10000).astype(str)).to_numpy(dtype=object)
+
+
+def invalid_values(column: str, kind: str, rows: np.ndarray) -> np.ndarray:
+    if identifier_domain(column) is not None:
+        return ("UNKNOWN" + pd.Series(rows).astype(str)).to_numpy(dtype=object)
+    if kind == AttributeKind.DATE:
+        return np.where(rows % 2 == 0, "1900-01-01", "2099-12-31").astype(object)
+    if kind == AttributeKind.AMOUNT:
+        return np.full(len(rows), "-1", dtype=object)
+    return np.full(len(rows), "Non-applicable", dtype=object)
+
+
+def generate_chunk(dataset: str, schema, code_lists: dict, start: int, stop: int, instruments: int, reference_date,
+                   violation_rate: float, rng) -> pd.DataFrame:
+    # code_lists: attribute -> Mapping of the coded attributes of the dataset
+    rows = np.arange(start, stop, dtype="int64")
+    ids = entities(dataset, rows, instruments)
+    data = {}
+    for column, kind in schema.attributes.items():
+        values = column_values(column, kind, code_lists.get(column), ids, reference_date)
+        broken = rng.random(len(rows)) < violation_rate
+        if broken.any():
+            values[broken] = invalid_values(column, kind, rows[broken])
+        data[column] = values
+    if "Counterparty role" in data and dataset == "Counterparty-instrument":
+        data["Counterparty role"] = np.where(rows % 2 == 0, "Creditor", "Debtor").astype(object)
+    return pd.DataFrame(data, columns=list(schema.attributes))
+
+
+def generate(directory: str, instruments: int, violation_rate: float = 0.01, periods: int = 2, seed: int = 0,
+             last_reference_date: str = "2023-12-31") -> dict:
+    # Write one CSV per dataset into directory, in chunks of CHUNK_ROWS rows; returns dataset -> rows written
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    reference_dates = pd.date_range(end=last_reference_date, periods=periods, freq="ME")
+    schemas = load_schemas()
+    checker = DomainChecker(load_code_lists())
+    written = {}
+    for dataset, entity_count in dataset_sizes(instruments).items():
+        schema = schemas[dataset]
+        code_lists = {}
+        for column in schema.attributes:
+            code_list = checker.code_list(column, schema)
+            if code_list is not None:
+                code_lists[column] = checker.code_lists[code_list]
+        path = os.path.join(directory, dataset_file_name(dataset))
+        header = True
+        # Datasets without a reference date (the counterparty reference) hold one record per entity
+        dataset_dates = reference_dates if "Reference date" in schema.attributes else reference_dates[-1:]
+        for reference_date in dataset_dates:
+            for start in range(0, entity_count, CHUNK_ROWS):
+                stop = min(start + CHUNK_ROWS, entity_count)
+                chunk = generate_chunk(dataset, schema, code_lists, start, stop, instruments, reference_date, violation_rate, rng)
+                chunk.to_csv(path, mode="w" if header else "a", header=header, index=False)
+                header = False
+        written[dataset] = entity_count * len(dataset_dates)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--instruments", type=int, default=10_000)
+    parser.add_argument("--violation-rate", type=float, default=0.01)
+    parser.add_argument("--periods", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    written = generate(args.directory, args.instruments, args.violation_rate, args.periods, args.seed)
+    for dataset, rows in written.items():
+        print("%-32s %12d rows" % (dataset, rows))
+
+
+if __name__ == "__main__":
+    main()
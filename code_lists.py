@@ -0,0 +1,104 @@
+import datetime
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from mapping import Mapping
+
+CODE_LISTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mapping.xlsx")
+ARTIFACT_VERSION = 1
+
+
+def artifact_path_for(workbook_path: str) -> str:
+    # "mapping.xlsx" -> "mapping.code_lists.json", next to the workbook
+    return os.path.splitext(workbook_path)[0] + ".code_lists.json"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cell(value) -> str:
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d")
+    return "" if pd.isna(value) else str(value).strip()
+
+
+def _sheet_code_list(sheet: pd.DataFrame) -> dict:
+    # {code: description} of one sheet. Most sheets have a "Code" / "Description" header in one of their
+    # first rows (after an optional title row); "RECL Postal code" maps country ISO codes to the postal code
+    # RegEx; "Reference date" is a plain list of dates, each mapped to itself.
+    header_rows = sheet.head(3).map(_cell).values.tolist()
+    for number, header in enumerate(header_rows):
+        if header[:1] == ["Code"]:
+            rows = sheet.iloc[number + 1:, :2]
+            break
+        if "Country ISO code" in header:
+            regex = next(i for i, name in enumerate(header) if name.startswith("Reporting format: RegEx"))
+            rows = sheet.iloc[number + 1:, [header.index("Country ISO code"), regex]]
+            break
+    else:
+        rows = sheet.iloc[1:, [0, 0]]
+
+    code_list = {}
+    for code, description in rows.itertuples(index=False):
+        if _cell(code):
+            code_list.setdefault(_cell(code), _cell(description))
+    return code_list
+
+
+def read_code_lists(workbook_path: str = CODE_LISTS_PATH) -> dict:
+    # {sheet name: {code: description}} of every sheet of the workbook, keyed as ValueMapping names them
+    # keep_default_na=False: "NA" (Non-applicable) is a code
+    sheets = pd.read_excel(workbook_path, sheet_name=None, header=None, keep_default_na=False)
+    return {sheet_name: _sheet_code_list(sheet) for sheet_name, sheet in sheets.items()}
+
+
+def build_artifact(workbook_path: str = CODE_LISTS_PATH, artifact_path: str = None) -> dict:
+    # Parse the workbook once and write the code lists as JSON with the hash of the workbook they came
+    # from (to detect changes) and of their own content (to identify a code list version)
+    artifact_path = artifact_path or artifact_path_for(workbook_path)
+    code_lists = read_code_lists(workbook_path)
+    content = json.dumps(code_lists, sort_keys=True, ensure_ascii=False)
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "source_sha256": file_hash(workbook_path),
+        "content_sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "code_lists": code_lists,
+    }
+    try:
+        with open(artifact_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(artifact_path + ".tmp", artifact_path)
+    except OSError:
+        pass  # read-only installation: the code lists are still returned, just not cached
+    return artifact
+
+
+def load_artifact(workbook_path: str = CODE_LISTS_PATH, artifact_path: str = None) -> dict:
+    # The compiled artifact if it was built from the current workbook, otherwise rebuild it
+    artifact_path = artifact_path or artifact_path_for(workbook_path)
+    try:
+        with open(artifact_path, encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        artifact = None
+    if artifact is None or artifact.get("version") != ARTIFACT_VERSION or artifact.get("source_sha256") != file_hash(workbook_path):
+        artifact = build_artifact(workbook_path, artifact_path)
+    return artifact
+
+
+def load_code_lists(workbook_path: str = CODE_LISTS_PATH, artifact_path: str = None) -> dict:
+    # {sheet name: Mapping}, e.g. load_code_lists()[ValueMapping.CounterpartyRole].to_descriptions(column)
+    return {name: Mapping(code_list) for name, code_list in load_artifact(workbook_path, artifact_path)["code_lists"].items()}
+
+
+if __name__ == "__main__":
+    artifact = build_artifact()
+    print("%d code lists, content %s" % (len(artifact["code_lists"]), artifact["content_sha256"]))
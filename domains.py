@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from code_lists import CODE_LISTS_PATH, load_code_lists
+from schema import CODE_LIST_ALIASES, AttributeKind, attribute_kind, base_attribute, normalise_name
+
+DOMAIN_COLUMNS = ["Dataset", "Column", "Code list", "Value", "Count"]
+
+
+def allowed_values(mapping) -> pd.Index:
+    # A coded attribute may be reported as the code ("2"), the description ("Debtor") or both ("2 - Debtor")
+    combined = [mapping.combined_from_key(code) for code in mapping.mapdict]
+    return pd.Index(list(mapping.codes) + list(mapping.descriptions) + combined).unique()
+
+
+def distinct_counts(values: pd.Series):
+    # (distinct values, rows per distinct value) in one pass over the categorical codes; missing values
+    # are not counted
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return pd.Index(uniques, dtype=object), counts
+
+
+class DomainChecker():
+    # Checks every coded attribute of a submission against its code list from mapping.xlsx (see
+    # code_lists.py). Only the distinct values of a column are compared with the code list, the rows are
+    # counted per distinct value through the categorical codes, so a check costs one pass per column.
+    # Missing values are left to the completeness rules.
+
+    def __init__(self, code_lists: dict = None, workbook_path: str = CODE_LISTS_PATH):
+        self.code_lists = code_lists if code_lists is not None else load_code_lists(workbook_path)
+        self._names = {normalise_name(name): name for name in self.code_lists}
+        self._allowed = {}  # code list name -> allowed values
+
+    def code_list(self, column: str, schema=None):
+        # Name of the code list of a coded column, None for other columns
+        kind = schema.kind(column) if schema is not None else attribute_kind(column, frozenset(self._names))
+        if kind != AttributeKind.CODED:
+            return None
+        name = normalise_name(base_attribute(column.strip()))
+        return self._names.get(CODE_LIST_ALIASES.get(name, name))
+
+    def allowed(self, code_list: str) -> pd.Index:
+        if code_list not in self._allowed:
+            self._allowed[code_list] = allowed_values(self.code_lists[code_list])
+        return self._allowed[code_list]
+
+    def check_column(self, values: pd.Series, code_list: str) -> pd.Series:
+        # Rows per value outside the code list, indexed by value
+        uniques, counts = distinct_counts(values)
+        reported = uniques.map(lambda value: str(value).strip())
+        invalid = ~reported.isin(self.allowed(code_list)) & (reported != "") & (counts > 0)
+        return pd.Series(counts[invalid], index=uniques[invalid], dtype="int64")
+
+    def check(self, df_dict: dict, schemas: dict = None) -> pd.DataFrame:
+        # One row per (dataset, column, invalid value) with the number of rows reporting it
+        rows = []
+        for dataset, df in df_dict.items():
+            schema = schemas.get(dataset) if schemas is not None else None
+            for column in df.columns:
+                code_list = self.code_list(column, schema)
+                if code_list is None:
+                    continue
+                for value, count in self.check_column(df[column], code_list).items():
+                    rows.append((dataset, column, code_list, value, count))
+        return pd.DataFrame(rows, columns=DOMAIN_COLUMNS)
@@ -0,0 +1,100 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from normalize import SENTINEL_CODES, Sentinel, sentinel_column
+from schema import AttributeKind, attribute_kind, base_attribute, normalise_name
+
+
+class IdentifierDomain():
+    OBSERVED_AGENT = "Observed agent identifier"
+    REPORTING_AGENT = "Reporting agent identifier"
+    CONTRACT = "Contract identifier"
+    INSTRUMENT = "Instrument identifier"
+    COUNTERPARTY = "Counterparty identifier"
+    PROTECTION = "Protection identifier"
+
+
+# Normalised attribute name -> identifier domain. Protection providers are counterparties (CR005, CPC005),
+# syndicated contracts are contracts, "Instrument ID" is the instrument identifier of the history rules.
+DOMAIN_ATTRIBUTES = {
+    "observed agent identifier": IdentifierDomain.OBSERVED_AGENT,
+    "reporting agent identifier": IdentifierDomain.REPORTING_AGENT,
+    "contract identifier": IdentifierDomain.CONTRACT,
+    "syndicated contract identifier": IdentifierDomain.CONTRACT,
+    "instrument identifier": IdentifierDomain.INSTRUMENT,
+    "instrument id": IdentifierDomain.INSTRUMENT,
+    "counterparty identifier": IdentifierDomain.COUNTERPARTY,
+    "protection provider identifier": IdentifierDomain.COUNTERPARTY,
+    "protection identifier": IdentifierDomain.PROTECTION,
+}
+
+
+def identifier_domain(column: str):
+    name = re.sub(r"_[xy]$", "", normalise_name(base_attribute(column)))  # merge suffixes
+    if name == "identifier":
+        # "Instrument.Identifier": the dataset qualifier names the domain
+        name = normalise_name(column.partition(".")[0]) + " identifier"
+    if name in DOMAIN_ATTRIBUTES:
+        return DOMAIN_ATTRIBUTES[name]
+    if attribute_kind(column) == AttributeKind.IDENTIFIER:
+        return name  # an identifier outside the known domains gets a code space of its own
+    return None
+
+
+class IdentifierInterner():
+    # Replaces identifier columns of every table by dense integer codes. All columns of one domain share
+    # the same code space, so merges, isin and groupby across tables compare integers.
+    # Sentinel tokens reported as identifiers ('Not applicable', ...) also get a "<column> [sentinel]" column.
+
+    def __init__(self):
+        self.domains = {}  # domain -> pd.Index of identifier values, position = code
+        self.columns = {}  # (table, column) -> domain
+
+    def intern(self, df_dict: dict) -> dict:
+        for table, df in df_dict.items():
+            for column in list(df.columns):
+                if column.endswith(" [sentinel]") or (table, column) in self.columns:
+                    continue
+                domain = identifier_domain(column)
+                if domain is None or pd.api.types.is_integer_dtype(df[column].dtype):
+                    continue
+                self._intern_column(df, column, domain)
+                self.columns[(table, column)] = domain
+        return df_dict
+
+    def _intern_column(self, df, column, domain):
+        row_codes, uniques = pd.factorize(df[column])
+        uniques = pd.Index(uniques)
+        vocabulary = self.domains.get(domain, pd.Index([], dtype=object))
+        new_values = uniques[vocabulary.get_indexer(uniques) == -1]
+        if len(new_values):
+            vocabulary = vocabulary.append(pd.Index(new_values, dtype=object))
+            self.domains[domain] = vocabulary
+
+        unique_codes = vocabulary.get_indexer(uniques)
+        dtype = "int32" if len(vocabulary) < np.iinfo("int32").max else "int64"
+        codes = np.append(unique_codes, -1).astype(dtype)[row_codes]  # -1 stays -1 (missing)
+
+        sentinels = np.array([SENTINEL_CODES.get(str(value).strip(), Sentinel.VALUE) for value in uniques], dtype="int8")
+        if sentinels.any():
+            df[sentinel_column(column)] = np.append(sentinels, Sentinel.EMPTY).astype("int8")[row_codes]
+        df[column] = codes
+
+    def encode(self, domain: str, values) -> np.ndarray:
+        # Codes of literal identifier values, -1 for values never seen in the submission
+        return self.domains.get(domain, pd.Index([], dtype=object)).get_indexer(pd.Index(values, dtype=object))
+
+    def decode_column(self, values: pd.Series, domain: str) -> pd.Series:
+        vocabulary = self.domains[domain].append(pd.Index([None], dtype=object))
+        return pd.Series(vocabulary.take(values.to_numpy()), index=values.index, name=values.name)
+
+    def decode(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Copy of df with interned identifier columns turned back into their reported values
+        decoded = df.copy()
+        for column in df.columns:
+            domain = identifier_domain(column)
+            if domain in self.domains and pd.api.types.is_integer_dtype(df[column].dtype):
+                decoded[column] = self.decode_column(df[column], domain)
+        return decoded
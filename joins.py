@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from profiling import DISABLED
+
+DEFAULT_JOIN_CACHE_BYTES = 2 * 1024 ** 3
+
+_LEFT_ROW = "__left_row__"
+
+
+class JoinCache():
+    # Builds each distinct join of two df_dict tables once per run and hands the same frame to every rule.
+    # Rules that read the same pair of tables on the same keys share one merge this way: CPC001-CPC004 join
+    # Counterparty-instrument with Counterparty-reference, the Instrument/Financial date rules (CN0080-CN0200)
+    # join Instrument with Financial, and CN0622/CN0650 join Protection received with its instrument links.
+    # Entries are evicted least-recently-used first once their total size exceeds max_bytes.
+    # Cached frames are shared between rules and must not be modified in place.
+
+    def __init__(self, df_dict: dict, max_bytes: int = DEFAULT_JOIN_CACHE_BYTES, profiler=DISABLED):
+        self.df_dict = df_dict
+        self.max_bytes = max_bytes
+        self.profiler = profiler
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (DataFrame, size in bytes)
+        self._bytes = 0
+
+    def merge(self, left: str, right: str, on=None, left_on=None, right_on=None, how: str = "left") -> pd.DataFrame:
+        key = (left, right, _as_key(on), _as_key(left_on), _as_key(right_on), how)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        self.misses += 1
+        rows_in = len(self.df_dict[left]) + len(self.df_dict[right])
+        with self.profiler.measure("join", "%s x %s" % (left, right), rows_in) as record:
+            merged = self._build(left, right, on, left_on, right_on, how)
+            record["rows_out"] = len(merged)
+        self._store(key, merged)
+        return merged
+
+    def _build(self, left, right, on, left_on, right_on, how):
+        df_left = self.df_dict[left]
+        df_right = self.df_dict[right]
+        # Carry the left row position through the merge, so the result is indexed like the left table
+        merged = pd.merge(
+            df_left.assign(**{_LEFT_ROW: np.arange(len(df_left))}),
+            df_right,
+            on=on,
+            left_on=left_on,
+            right_on=right_on,
+            how=how,
+        )
+        positions = merged.pop(_LEFT_ROW).to_numpy()
+        merged.index = df_left.index[positions]
+        return merged
+
+    def _store(self, key, merged):
+        size = int(merged.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return  # larger than the whole budget, let the caller use it once
+        self._entries[key] = (merged, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+def _as_key(columns):
+    if columns is None or isinstance(columns, str):
+        return columns
+    return tuple(columns)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+
+def composite_key_codes(probe: pd.DataFrame, probe_columns, build: pd.DataFrame, build_columns):
+    # Encodes a multi-column key of both frames as one int64 per row, in the code space of the probe side.
+    # Each column pair is factorized on the probe side and the build side is mapped onto those codes;
+    # the running key is re-factorized after every column so it never overflows.
+    # Rows with a missing value, or a build value the probe side never uses, get -1.
+    if len(probe_columns) != len(build_columns):
+        raise ValueError("Key column lists differ in length: %s / %s" % (probe_columns, build_columns))
+
+    probe_key = np.zeros(len(probe), dtype="int64")
+    build_key = np.zeros(len(build), dtype="int64")
+    probe_missing = np.zeros(len(probe), dtype=bool)
+    build_missing = np.zeros(len(build), dtype=bool)
+
+    for probe_column, build_column in zip(probe_columns, build_columns):
+        probe_codes, uniques = pd.factorize(probe[probe_column])
+        build_codes = pd.Index(uniques).get_indexer(build[build_column])
+        probe_missing |= probe_codes == -1
+        build_missing |= build_codes == -1
+
+        width = len(uniques) + 1
+        probe_key = probe_key * width + probe_codes
+        build_key = build_key * width + build_codes
+
+        # Compress back to dense codes before the next column multiplies the range again
+        probe_key, key_uniques = pd.factorize(probe_key)
+        build_key = pd.Index(key_uniques).get_indexer(build_key)
+        build_missing |= build_key == -1
+
+    probe_key = np.where(probe_missing, -1, probe_key)
+    build_key = np.where(build_missing, -1, build_key)
+    return probe_key, build_key
+
+
+def key_isin(probe: pd.DataFrame, probe_columns, build: pd.DataFrame, build_columns, build_mask=None) -> pd.Series:
+    # Vectorized "(probe columns) EXISTS IN {(build columns)}", one boolean per probe row.
+    # build_mask restricts the build side (e.g. to a counterparty role) without copying the frame.
+    probe_key, build_key = composite_key_codes(probe, list(probe_columns), build, list(build_columns))
+    if build_mask is not None:
+        build_key = build_key[np.asarray(build_mask, dtype=bool)]
+
+    present = np.zeros(probe_key.max(initial=-1) + 2, dtype=bool)
+    present[build_key[build_key >= 0]] = True
+    present[-1] = False  # slot used by probe rows with a missing key value
+    return pd.Series(present[probe_key], index=probe.index)
+
+
+def _positions(mask: np.ndarray, probe_mask=None) -> np.ndarray:
+    if probe_mask is not None:
+        mask = mask & np.asarray(probe_mask, dtype=bool)
+    return np.flatnonzero(mask)
+
+
+def semi_join(probe: pd.DataFrame, probe_columns, build: pd.DataFrame, build_columns, probe_mask=None, build_mask=None) -> np.ndarray:
+    # Row positions of the probe rows whose key EXISTS IN {(build columns)}, without building the joined frame.
+    # probe_mask / build_mask restrict either side to the rows a predicate holds for.
+    exists = key_isin(probe, probe_columns, build, build_columns, build_mask).to_numpy()
+    return _positions(exists, probe_mask)
+
+
+def anti_join(probe: pd.DataFrame, probe_columns, build: pd.DataFrame, build_columns, probe_mask=None, build_mask=None) -> np.ndarray:
+    # Row positions of the probe rows whose key does NOT EXIST IN {(build columns)}; a key with a missing
+    # value never exists (as NOT EXISTS in SQL)
+    exists = key_isin(probe, probe_columns, build, build_columns, build_mask).to_numpy()
+    return _positions(~exists, probe_mask)
+
+
+def key_lookup(probe: pd.DataFrame, probe_columns, build: pd.DataFrame, build_columns, column: str) -> pd.Series:
+    # Value of a build column at the first build row with the key of each probe row, one per probe row and
+    # missing where the key does not exist (a lookup of a unique key, e.g. an instrument in one reference period)
+    probe_key, build_key = composite_key_codes(probe, list(probe_columns), build, list(build_columns))
+    size = max(probe_key.max(initial=-1), build_key.max(initial=-1)) + 2
+    first_row = np.full(size, -1, dtype="intp")  # last slot: probe rows with a missing key
+    rows = np.flatnonzero(build_key >= 0)[::-1]
+    first_row[build_key[rows]] = rows  # assigned last to first, so the first row of a key wins
+    values = build[column]
+    return pd.Series(take(values.array, first_row[probe_key], allow_fill=True), index=probe.index, name=column)
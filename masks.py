@@ -0,0 +1,79 @@
+import operator
+from collections import OrderedDict
+
+import pandas as pd
+
+from normalize import NOT_APPLICABLE_OR_REQUIRED, is_sentinel
+
+DEFAULT_MASK_CACHE_BYTES = 256 * 1024 ** 2
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "isin": lambda values, operand: values.isin(operand),
+}
+
+
+def _operand_key(op: str, operand):
+    if op in ("isin", "sentinel"):
+        return frozenset(operand)
+    return operand
+
+
+class MaskCache():
+    # Computes each distinct single-column predicate of a run once, keyed by (dataset, column, operator,
+    # operand), e.g. ("Instrument", "Settlement date", "sentinel", {'Not applicable', 'Not required'}), and
+    # hands the same boolean Series to every rule. Entries are evicted least-recently-used first once their
+    # total size exceeds max_bytes. Cached masks are shared between rules and must not be modified in place.
+
+    def __init__(self, df_dict: dict, max_bytes: int = DEFAULT_MASK_CACHE_BYTES):
+        self.df_dict = df_dict
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> boolean Series
+        self._bytes = 0
+
+    def mask(self, dataset: str, column: str, op: str, operand) -> pd.Series:
+        key = (dataset, column, op, _operand_key(op, operand))
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        df = self.df_dict[dataset]
+        if op == "sentinel":
+            mask = is_sentinel(df, column, operand)
+        else:
+            mask = OPERATORS[op](df[column], operand)
+        self._store(key, mask)
+        return mask
+
+    def sentinel(self, dataset: str, column: str, values=NOT_APPLICABLE_OR_REQUIRED) -> pd.Series:
+        # normalize.is_sentinel, computed once per run
+        return self.mask(dataset, column, "sentinel", values)
+
+    def isin(self, dataset: str, column: str, values) -> pd.Series:
+        return self.mask(dataset, column, "isin", values)
+
+    def _store(self, key, mask):
+        size = len(mask)  # one byte per row; the index is the table's own
+        if size > self.max_bytes:
+            return
+        self._entries[key] = mask
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from schema import AttributeKind, DatasetSchema
+
+NOT_APPLICABLE = "Not applicable"
+NOT_REQUIRED = "Not required"
+NON_APPLICABLE = "Non-applicable"
+EMPTY = ""
+
+# The pair most rules exclude with "NOT IN {'Not applicable', 'Not required'}"
+NOT_APPLICABLE_OR_REQUIRED = (NOT_APPLICABLE, NOT_REQUIRED)
+
+
+class Sentinel():
+    VALUE = 0  # a real date / amount was reported
+    NOT_APPLICABLE = 1
+    NOT_REQUIRED = 2
+    NON_APPLICABLE = 3
+    EMPTY = 4
+    INVALID = 5  # neither a sentinel nor a parseable value
+
+
+SENTINEL_CODES = {
+    NOT_APPLICABLE: Sentinel.NOT_APPLICABLE,
+    NOT_REQUIRED: Sentinel.NOT_REQUIRED,
+    NON_APPLICABLE: Sentinel.NON_APPLICABLE,
+    EMPTY: Sentinel.EMPTY,
+    # Code list spellings ("NA - Non-applicable", "NR - Not required")
+    "NA": Sentinel.NON_APPLICABLE,
+    "NR": Sentinel.NOT_REQUIRED,
+}
+
+
+def sentinel_column(column: str) -> str:
+    return column + " [sentinel]"
+
+
+def _parse_uniques(uniques: pd.Index, kind: str):
+    # Returns the parsed values and the sentinel code of each distinct token
+    tokens = pd.Index(uniques.astype(str).str.strip())
+    codes = np.asarray(tokens.map(lambda t: SENTINEL_CODES.get(t, Sentinel.VALUE)), dtype="int8")
+    candidates = tokens.where(codes == Sentinel.VALUE)
+    if kind == AttributeKind.DATE:
+        parsed = pd.to_datetime(candidates, errors="coerce", format="mixed")
+    else:
+        parsed = pd.to_numeric(candidates, errors="coerce").astype("float64")
+    codes[(codes == Sentinel.VALUE) & np.asarray(pd.isna(parsed))] = Sentinel.INVALID
+    return parsed, codes
+
+
+def normalize_column(values: pd.Series, kind: str):
+    # Split a raw date/amount column into (typed values, int8 sentinel codes).
+    # Only the distinct tokens are parsed, rows are then gathered through the factorized codes.
+    if kind == AttributeKind.AMOUNT and pd.api.types.is_float_dtype(values.dtype):
+        return values, np.zeros(len(values), dtype="int8")
+    if kind == AttributeKind.DATE and pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values, np.where(values.isna(), Sentinel.EMPTY, Sentinel.VALUE).astype("int8")
+
+    row_codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed, unique_sentinels = _parse_uniques(pd.Index(uniques), kind)
+    # One extra slot at the end, row code -1 (missing) gathers it
+    missing = pd.DatetimeIndex([pd.NaT]) if kind == AttributeKind.DATE else pd.Index([np.nan])
+    parsed = parsed.append(missing).to_numpy()
+    unique_sentinels = np.append(unique_sentinels, Sentinel.EMPTY).astype("int8")
+    typed = pd.Series(parsed[row_codes], index=values.index, name=values.name)
+    return typed, unique_sentinels[row_codes]
+
+
+def normalize_frame(df: pd.DataFrame, schema: DatasetSchema) -> pd.DataFrame:
+    # Every date/amount attribute becomes a datetime64/float column plus a "<column> [sentinel]" code column
+    for kind in (AttributeKind.DATE, AttributeKind.AMOUNT):
+        for column in schema.columns_of_kind(kind, df.columns):
+            if column.endswith(" [sentinel]"):
+                continue
+            typed, sentinels = normalize_column(df[column], kind)
+            df[column] = typed
+            df[sentinel_column(column)] = sentinels
+    return df
+
+
+def is_sentinel(df: pd.DataFrame, column: str, values=NOT_APPLICABLE_OR_REQUIRED) -> pd.Series:
+    # Boolean mask of rows whose value is one of the given sentinel tokens.
+    # Uses the int8 code column of normalized frames, falls back to a string scan for raw frames.
+    codes_column = sentinel_column(column)
+    if codes_column in df.columns:
+        codes = df[codes_column].to_numpy()
+        wanted = sorted({SENTINEL_CODES[v] for v in values})
+        mask = codes == wanted[0]
+        for code in wanted[1:]:
+            mask |= codes == code
+        return pd.Series(mask, index=df.index)
+    return df[column].isin(values)
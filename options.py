@@ -0,0 +1,53 @@
+from joins import DEFAULT_JOIN_CACHE_BYTES
+from masks import DEFAULT_MASK_CACHE_BYTES
+
+BACKENDS = ("pandas", "polars")
+
+class ExecutionOptions():
+    # How DataValidator runs the rules, independent of which submission and rules it validates.
+    # Combinations no run mode can honour are rejected here rather than silently ignored.
+    def __init__(self, streaming=False, workers=1, partitions=None, backend="pandas", join_cache_bytes=DEFAULT_JOIN_CACHE_BYTES,
+                 mask_cache_bytes=DEFAULT_MASK_CACHE_BYTES, intern_identifiers=True, profile=None, result_cache_dir=None):
+        # With streaming=True nothing is loaded up front, use validate_streaming() or apply_sql_rules().
+        # workers > 1 runs the rules over a process pool sharing the tables (None: one per CPU).
+        # partitions hash-partitions the tables by observed agent and runs the rules once per partition,
+        # over the process pool when workers > 1, see DataValidator.validate_by_agent().
+        # backend="polars" runs the rules that have a Polars version (polars_backend.POLARS_RULES) as lazy
+        # queries on all cores; the other rules still run in pandas.
+        # join_cache_bytes bounds the memory held by joins shared between rules.
+        # mask_cache_bytes bounds the memory held by predicate masks shared between rules (see masks.MaskCache).
+        # intern_identifiers replaces identifier columns by integer codes shared across all tables.
+        # profile records time, memory and row counts per stage and rule (default: the RECORD_RULES_PROFILE
+        # environment variable), see DataValidator.profile_summary(). A Profiler instance is used as is.
+        # result_cache_dir keeps every rule's violations on disk, keyed by the rule and the fingerprints of the
+        # tables it reads (see result_cache.ResultCache); a rerun only executes the rules whose inputs changed.
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend: %s" % backend)
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1, or None for one per CPU: %s" % workers)
+        if partitions is not None and partitions < 1:
+            raise ValueError("partitions must be at least 1: %s" % partitions)
+        self.streaming = streaming
+        self.workers = workers
+        self.partitions = partitions
+        self.backend = backend
+        self.join_cache_bytes = join_cache_bytes
+        self.mask_cache_bytes = mask_cache_bytes
+        self.intern_identifiers = intern_identifiers
+        self.profile = profile
+        self.result_cache_dir = result_cache_dir
+        if streaming:
+            self.require_serial("streaming=True")
+
+    def require_serial(self, mode):
+        # validate_streaming() and apply_sql_rules() read the CSV files themselves and run each rule once in
+        # this process, so the process pool, the partitions, the Polars backend and the result cache of
+        # apply_validation_rules() do not apply to them
+        unsupported = [name for name, used in (
+            ("workers=%s" % self.workers, self.workers != 1),
+            ("partitions=%s" % self.partitions, self.partitions is not None),
+            ("backend=%r" % self.backend, self.backend != "pandas"),
+            ("result_cache_dir", self.result_cache_dir is not None),
+        ) if used]
+        if unsupported:
+            raise ValueError("%s does not support %s" % (mode, ", ".join(unsupported)))
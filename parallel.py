@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from joins import DEFAULT_JOIN_CACHE_BYTES, JoinCache
+from profiling import Profiler
+from results import evaluate_rule
+
+# Start method of the worker pools (ParallelExecutor, partitions.PartitionedExecutor). The pools are pinned to
+# fork: forked workers share the parent's resource tracker, so the blocks they attach are the ones the parent
+# registered when creating them, and the parent alone unlinks them in SharedTables.close().
+POOL_CONTEXT = multiprocessing.get_context("fork")
+
+
+def _share_array(array: np.ndarray, blocks: list) -> tuple:
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    blocks.append(block)
+    return block.name, array.dtype.str, array.shape
+
+
+def _attach_block(name: str):
+    # Before Python 3.13 attaching registers the block with the resource tracker again. The forked workers
+    # (see POOL_CONTEXT) share the parent's tracker, which already holds the block, so this adds nothing
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedTables():
+    # Copies the columns of a dict of DataFrames into shared memory blocks once, so worker processes map them
+    # instead of unpickling a copy each. Numeric, datetime, interned identifier and sentinel code columns are
+    # shared as they are, categoricals as their codes plus the (small) categories. Columns without a numpy
+    # layout (strings that were not interned) are pickled to the workers instead.
+    # The creating process must call close() to release the blocks.
+
+    def __init__(self, tables: dict):
+        self._blocks = []
+        self.layout = {name: self._share_frame(df) for name, df in tables.items()}
+
+    def _share_frame(self, df: pd.DataFrame) -> tuple:
+        columns = []
+        for column in df.columns:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes = _share_array(values.cat.codes.to_numpy(), self._blocks)
+                columns.append((column, "category", codes, (values.cat.categories, values.cat.ordered)))
+            elif isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufmM":
+                columns.append((column, "array", _share_array(values.to_numpy(), self._blocks), None))
+            else:
+                columns.append((column, "pickled", values.array, None))
+        return df.index, columns
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def attach_tables(layout: dict) -> tuple:
+    # Rebuild the DataFrames of a SharedTables layout on top of the shared blocks (read-only, no copy)
+    tables = {}
+    blocks = []
+    for name, (index, columns) in layout.items():
+        data = {}
+        for column, kind, payload, extra in columns:
+            if kind == "pickled":
+                data[column] = payload
+                continue
+            block_name, dtype, shape = payload
+            block = _attach_block(block_name)
+            blocks.append(block)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+            if kind == "category":
+                categories, ordered = extra
+                data[column] = pd.Categorical.from_codes(array, categories=categories, ordered=ordered, validate=False)
+            else:
+                data[column] = array
+        tables[name] = pd.DataFrame(data, index=index, columns=[c[0] for c in columns], copy=False)
+    return tables, blocks
+
+
+# State of a worker process: the RecordRules instance built over the attached tables
+_worker = {}
+
+
+def _init_worker(layout, previous_layout, join_cache_bytes, profile, trace_memory):
+    from RecordRules import RecordRules  # RecordRules imports this module
+
+    df_dict, blocks = attach_tables(layout)
+    previous_dict, previous_blocks = attach_tables(previous_layout)
+    profiler = Profiler(enabled=profile, trace_memory=trace_memory)
+    _worker["blocks"] = blocks + previous_blocks
+    _worker["profiler"] = profiler
+    _worker["rules"] = RecordRules(df_dict, JoinCache(df_dict, max_bytes=join_cache_bytes, profiler=profiler), previous_dict)
+
+
+def _run_rule(method_name):
+    # Only the violation positions (and the profile records of this rule) travel back to the parent
+    profiler = _worker["profiler"]
+    outcome = evaluate_rule(_worker["rules"], method_name, profiler)
+    records, profiler.records = profiler.records, []
+    return outcome, records
+
+
+class ParallelExecutor():
+    # Runs independent RecordRules methods over a process pool. The tables are placed in shared memory once;
+    # every worker builds its own RecordRules (join cache, temporal views) over them. run() returns the
+    # (rule_id, dataset, violation positions) results in the order of the given specs, whatever order they finish in.
+    # Use as a context manager, or call close(), to stop the workers and free the shared memory.
+
+    def __init__(self, df_dict: dict, workers: int = None, previous_dict: dict = None, join_cache_bytes: int = DEFAULT_JOIN_CACHE_BYTES,
+                 profiler: Profiler = None):
+        self.workers = workers or os.cpu_count()
+        self.profiler = profiler  # collects the workers' profile records
+        self._tables = SharedTables(df_dict)
+        self._previous = SharedTables(previous_dict or {})
+        profile = profiler is not None and profiler.enabled
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=POOL_CONTEXT,
+            initializer=_init_worker,
+            initargs=(self._tables.layout, self._previous.layout, join_cache_bytes, profile, profile and profiler.trace_memory),
+        )
+
+    def run(self, specs):
+        # Iterator over the results, each yielded as soon as it and all earlier specs have finished.
+        # Consecutive specs of an execution plan read the same tables; hand them to a worker together
+        # so its join cache and temporal views are reused
+        specs = list(specs)
+        chunksize = max(1, len(specs) // (self.workers * 4))
+        for outcome, records in self._pool.map(_run_rule, [spec.method_name for spec in specs], chunksize=chunksize):
+            if self.profiler is not None:
+                self.profiler.records.extend(records)
+            yield outcome
+
+    def close(self):
+        self._pool.shutdown()
+        self._tables.close()
+        self._previous.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from interning import IdentifierDomain, identifier_domain
+from joins import DEFAULT_JOIN_CACHE_BYTES, JoinCache
+from parallel import POOL_CONTEXT, SharedTables, attach_tables
+from profiling import DISABLED, Profiler
+from results import RuleFailure, evaluate_rule
+
+
+def agent_column(columns):
+    # The observed agent identifier column of a table, None if it has none (RIAD counterparty data)
+    for column in columns:
+        if identifier_domain(column) == IdentifierDomain.OBSERVED_AGENT and not column.endswith(" [sentinel]"):
+            return column
+    return None
+
+
+def partition_numbers(values: pd.Series, partitions: int) -> np.ndarray:
+    # Partition of every row: a hash of its observed agent, so an agent lands in the same partition in every
+    # table (interned codes share one code space across tables, as do the raw identifiers)
+    return (pd.util.hash_array(np.asarray(values.to_numpy())) % np.uint64(partitions)).astype("int64")
+
+
+class AgentPartitioning():
+    # Hash partitioning of a submission by observed agent. Tables with an observed agent column are split into
+    # `partitions` row subsets, the others (Counterparty-reference) are handed whole to every partition.
+    # Partition tables keep the index labels of the full tables; to_global() maps row positions back.
+
+    def __init__(self, df_dict: dict, partitions: int):
+        self.partitions = partitions
+        self.rows = {}  # dataset -> [sorted row positions of each partition]
+        self.agents = [set() for _ in range(partitions)]  # observed agents (interned codes or values) per partition
+        for dataset, df in df_dict.items():
+            column = agent_column(df.columns)
+            if column is None:
+                continue
+            numbers = partition_numbers(df[column], partitions)
+            order = np.argsort(numbers, kind="stable")
+            bounds = np.searchsorted(numbers[order], np.arange(partitions + 1))
+            self.rows[dataset] = [order[bounds[p]:bounds[p + 1]] for p in range(partitions)]
+
+            uniques = pd.unique(df[column].to_numpy())
+            for agent, number in zip(uniques, partition_numbers(pd.Series(uniques), partitions)):
+                self.agents[number].add(agent)
+
+    def non_empty(self) -> list:
+        # Partitions holding rows of a split table. When every table is empty, partition 0 (empty) still runs,
+        # so every rule run per partition reports its (empty) result once.
+        numbers = [p for p in range(self.partitions) if any(len(rows[p]) for rows in self.rows.values())]
+        return numbers or [0]
+
+    def tables(self, df_dict: dict, number: int) -> dict:
+        return {d: df.take(self.rows[d][number]) if d in self.rows else df for d, df in df_dict.items()}
+
+    def to_global(self, dataset: str, number: int, positions: np.ndarray) -> np.ndarray:
+        if dataset not in self.rows:
+            return positions
+        return self.rows[dataset][number][positions]
+
+    def runs_per_partition(self, spec) -> bool:
+        # A rule runs per partition if its result is a union over agents and the table it reports is split;
+        # otherwise it runs once over the whole tables
+        return spec.by_agent and spec.dataset in self.rows
+
+
+def run_partition(rules_class, df_dict, previous_dict, partitioning, number, specs, join_cache_bytes, profiler=DISABLED) -> list:
+    # (rule_id, dataset, row positions in the full table) of every spec, evaluated on one partition
+    tables = partitioning.tables(df_dict, number)
+    rules = rules_class(tables, JoinCache(tables, max_bytes=join_cache_bytes, profiler=profiler), previous_dict)
+    outcomes = []
+    for spec in specs:
+        rule_id, dataset, positions = evaluate_rule(rules, spec.method_name, profiler)
+        if not isinstance(positions, RuleFailure):
+            positions = partitioning.to_global(dataset, number, positions)
+        outcomes.append((rule_id, dataset, positions))
+    return outcomes
+
+
+# State of a worker process: the shared tables and how they are partitioned
+_worker = {}
+
+
+def _init_worker(layout, previous_layout, partitioning, join_cache_bytes, profile, trace_memory):
+    df_dict, blocks = attach_tables(layout)
+    previous_dict, previous_blocks = attach_tables(previous_layout)
+    _worker.update(df_dict=df_dict, previous_dict=previous_dict, blocks=blocks + previous_blocks, partitioning=partitioning,
+                   join_cache_bytes=join_cache_bytes, profiler=Profiler(enabled=profile, trace_memory=trace_memory))
+
+
+def _run_partition(number, specs):
+    from RecordRules import RecordRules  # RecordRules imports this module
+
+    profiler = _worker["profiler"]
+    outcomes = run_partition(RecordRules, _worker["df_dict"], _worker["previous_dict"], _worker["partitioning"], number, specs,
+                             _worker["join_cache_bytes"], profiler)
+    records, profiler.records = profiler.records, []
+    return number, outcomes, records
+
+
+class PartitionedExecutor():
+    # Runs the rule set once per observed agent partition over a process pool sharing the full tables
+    # (see parallel.SharedTables); each worker slices its partition out of them. run() yields every
+    # partition's results as soon as that partition has finished.
+
+    def __init__(self, df_dict: dict, partitioning: AgentPartitioning, workers: int = None, previous_dict: dict = None,
+                 join_cache_bytes: int = DEFAULT_JOIN_CACHE_BYTES, profiler: Profiler = None):
+        self.partitioning = partitioning
+        self.workers = workers or os.cpu_count()
+        self.profiler = profiler
+        self._tables = SharedTables(df_dict)
+        self._previous = SharedTables(previous_dict or {})
+        profile = profiler is not None and profiler.enabled
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=POOL_CONTEXT,
+            initializer=_init_worker,
+            initargs=(self._tables.layout, self._previous.layout, partitioning, join_cache_bytes, profile,
+                      profile and profiler.trace_memory),
+        )
+
+    def run(self, specs):
+        # Iterator over (partition number, outcomes), in the order the partitions finish
+        specs = list(specs)
+        futures = [self._pool.submit(_run_partition, number, specs) for number in self.partitioning.non_empty()]
+        for future in as_completed(futures):
+            number, outcomes, records = future.result()
+            if self.profiler is not None:
+                self.profiler.records.extend(records)
+            yield number, outcomes
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+        self._tables.close()
+        self._previous.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
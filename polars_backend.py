@@ -0,0 +1,501 @@
+import numpy as np
+
+from normalize import NON_APPLICABLE, NOT_APPLICABLE_OR_REQUIRED, SENTINEL_CODES, sentinel_column
+from profiling import DISABLED
+from results import RuleFailure
+from roles import counterparty_roles, role_descriptions
+from schema import INSTRUMENT_KEY, PROTECTION_KEY
+
+try:
+    import polars as pl
+except ImportError:  # optional, ExecutionOptions(backend="polars") needs it
+    pl = None
+
+ROW = "__row__"  # row position in the pandas table, carried through every query
+
+# Collateral types CN0960-CN0963 accept with a real estate collateral location
+REAL_ESTATE_COLLATERAL = ["Residential real estate collateral", "Commercial real estate collateral", "Offices and commercial premises"]
+
+# rule ID -> (reported dataset, function(PolarsRules) -> LazyFrame of the violating rows). Every rule has one
+# except the history rules (RuleSpec.history), which need the T-1 / T' lookups of temporal.TemporalView and
+# always run in pandas.
+POLARS_RULES = {}
+
+
+def polars_rule(rule_id: str, dataset: str):
+    # Decorator registering the Polars version of a rule; the query must keep the ROW column of dataset
+    def register(function):
+        POLARS_RULES[rule_id] = (dataset, function)
+        return function
+    return register
+
+
+def row_filter(rule_id: str, dataset: str):
+    # Decorator for single-table rules written as a filter expression over the columns of dataset
+    def register(function):
+        def query(rules):
+            return rules.frame(dataset).filter(function(rules.columns(dataset)))
+        POLARS_RULES[rule_id] = (dataset, query)
+        return function
+    return register
+
+
+class Columns():
+    # Expression helpers bound to one table, mirroring normalize.is_sentinel and the pandas comparisons.
+    # Comparisons with a missing value are dropped by filter(), as the pandas masks are False there;
+    # "!=" and "NOT IN" keep missing values, as pandas does.
+
+    def __init__(self, names):
+        self.names = set(names)
+
+    def sentinel(self, column: str, values=NOT_APPLICABLE_OR_REQUIRED):
+        codes_column = sentinel_column(column)
+        if codes_column in self.names:
+            return pl.col(codes_column).is_in(sorted({SENTINEL_CODES[v] for v in values}))
+        return pl.col(column).cast(pl.String).is_in(list(values)).fill_null(False)
+
+    @staticmethod
+    def ne(column: str, value):
+        return pl.col(column).cast(pl.String).ne_missing(value)
+
+    @staticmethod
+    def is_in(column: str, values):
+        return pl.col(column).cast(pl.String).is_in(list(values)).fill_null(False)
+
+
+class PolarsRules():
+    # Polars lazy-frame backend of RecordRules for the rules in POLARS_RULES. The loaded (typed, interned)
+    # pandas tables are handed to Polars once, with their row positions, and every rule is a lazy query
+    # that Polars optimizes and runs on all cores; evaluate() returns the same (rule ID, dataset,
+    # row positions) as results.evaluate_rule, so ValidationResults and ViolationReport take either.
+
+    def __init__(self, df_dict: dict, code_lists: dict = None):
+        if pl is None:
+            raise ImportError("The polars backend needs the polars package (pip install polars)")
+        self.df_dict = df_dict
+        self.code_lists = code_lists
+        self._frames = {}
+
+    def frame(self, dataset: str):
+        if dataset not in self._frames:
+            df = self.df_dict[dataset]
+            if "Counterparty role" in df.columns:
+                # The queries compare role descriptions, whether a role was reported as code, description or both
+                df = df.assign(**{"Counterparty role": role_descriptions(df["Counterparty role"], counterparty_roles(self.code_lists))})
+            self._frames[dataset] = pl.from_pandas(df).lazy().with_row_index(ROW)
+        return self._frames[dataset]
+
+    def columns(self, dataset: str) -> Columns:
+        return Columns(self.df_dict[dataset].columns)
+
+    def __contains__(self, rule_id: str):
+        return rule_id in POLARS_RULES
+
+    def evaluate(self, spec, profiler=DISABLED) -> tuple:
+        dataset, query = POLARS_RULES[spec.rule_id]
+        rows_in = sum(len(self.df_dict[d]) for d in spec.datasets if d in self.df_dict)
+        try:
+            with profiler.measure("filter", spec.rule_id, rows_in) as record:
+                rows = query(self).select(ROW).unique().collect()
+                positions = np.sort(rows[ROW].to_numpy().astype("int64"))
+                record["rows_out"] = len(positions)
+        except Exception as error:
+            return spec.rule_id, dataset, RuleFailure(error)
+        return spec.rule_id, dataset, positions
+
+
+def _anti_join(rules, probe: str, probe_columns, build: str, build_columns, build_filter=None):
+    # "(probe columns) EXISTS IN {(build columns)}": the probe rows without a matching build key.
+    # build_filter returns an expression restricting the build rows, e.g. to a counterparty role.
+    keys = rules.frame(build)
+    if build_filter is not None:
+        keys = keys.filter(build_filter())
+    keys = keys.select([pl.col(b).alias(p) for p, b in zip(probe_columns, build_columns)]).unique()
+    return rules.frame(probe).join(keys, on=list(probe_columns), how="anti")
+
+
+def exists_in(rule_id: str, probe: str, probe_columns, build: str, build_columns, build_filter=None):
+    POLARS_RULES[rule_id] = (probe, lambda rules: _anti_join(rules, probe, probe_columns, build, build_columns, build_filter))
+
+
+def _role_rule(rule_id: str, role: str, condition):
+    # CPC001-CPC004: counterparties with a role in Counterparty-instrument must have the matching RIAD role
+    def query(rules):
+        merged = rules.frame("Counterparty-instrument").join(
+            rules.frame("Counterparty-reference").drop(ROW), on="Counterparty identifier", how="left",
+        )
+        return merged.filter((pl.col("Counterparty role").cast(pl.String) == role) & ~condition().fill_null(False))
+    POLARS_RULES[rule_id] = ("Counterparty-instrument", query)
+
+
+def _role_is(column: str, value: str = "True"):
+    return pl.col(column).cast(pl.String) == value
+
+
+def _with_columns(rules, left: str, right: str, on, columns):
+    # Rows of left joined with the given columns (and their sentinel code columns) of the right rows with
+    # the same key, as JoinCache.merge followed by a filter that drops unmatched rows
+    names = rules.df_dict[right].columns
+    selected = [c for column in columns for c in (column, sentinel_column(column)) if c in names]
+    return rules.frame(left).join(rules.frame(right).select(list(on) + selected), on=list(on), how="inner")
+
+
+def _matching(rules, probe: str, build: str, columns, build_filter):
+    # Probe rows with a build row of the same key that meets build_filter, as keys.key_isin with a build_mask
+    keys = rules.frame(build).filter(build_filter).select(columns).unique()
+    return rules.frame(probe).join(keys, on=list(columns), how="semi")
+
+
+# Instrument and protection records of the same reference period
+_PERIOD_INSTRUMENT_KEY = ["Reference date"] + INSTRUMENT_KEY
+_PERIOD_PROTECTION_KEY = ["Reference date"] + PROTECTION_KEY
+
+
+exists_in("CR001", "Counterparty-instrument", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"])
+exists_in("CR002", "Joint liabilities", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"])
+exists_in("CR003", "Counterparty risk", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"])
+exists_in("CR004", "Counterparty default", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"])
+exists_in("CR005", "Protection received", ["Protection provider identifier"], "Counterparty-reference", ["Counterparty identifier"])
+
+_role_rule("CPC001", "Creditor", lambda: _role_is("Role 3 Creditor"))
+_role_rule("CPC002", "Debtor", lambda: (
+    _role_is("Role 4 Debtor - All instruments originated prior to 1 September 2018").fill_null(False) |
+    _role_is("Role 4 Debtor - At least one instrument originated at or after 1 September 2018", "TRUE").fill_null(False)
+))
+_role_rule("CPC003", "Originator", lambda: _role_is("Role 10 Originator"))
+_role_rule("CPC004", "Servicer", lambda: _role_is("Role 11 Servicer"))
+
+
+@polars_rule("CPC005", "Protection received")
+def CPC005(rules):
+    providers = rules.frame("Counterparty-reference").select(
+        pl.col("Counterparty identifier").alias("Protection provider identifier"), "Role 6 Protection provider",
+    )
+    merged = rules.frame("Protection received").join(providers, on="Protection provider identifier", how="left")
+    return merged.filter(
+        ~rules.columns("Protection received").sentinel("Protection provider identifier") &
+        Columns.ne("Role 6 Protection provider", "True")
+    )
+
+exists_in("RI0030", "Financial", INSTRUMENT_KEY, "Instrument", INSTRUMENT_KEY)
+exists_in("RI0050", "Financial", INSTRUMENT_KEY, "Counterparty-instrument", INSTRUMENT_KEY,
+          lambda: _role_is("Counterparty role", "Creditor"))
+exists_in("RI0060", "Financial", INSTRUMENT_KEY, "Counterparty-instrument", INSTRUMENT_KEY,
+          lambda: _role_is("Counterparty role", "Debtor"))
+exists_in("RI0070", "Financial", INSTRUMENT_KEY, "Counterparty-instrument", INSTRUMENT_KEY,
+          lambda: _role_is("Counterparty role", "Servicer"))
+exists_in("RI0090", "Instrument", INSTRUMENT_KEY, "Financial", INSTRUMENT_KEY)
+exists_in("RI0110", "Counterparty-instrument", INSTRUMENT_KEY, "Financial", INSTRUMENT_KEY)
+exists_in("RI0130", "Instrument-protection received", INSTRUMENT_KEY, "Financial", INSTRUMENT_KEY)
+exists_in("RI0220", "Protection received", PROTECTION_KEY, "Instrument-protection received", PROTECTION_KEY)
+exists_in("RI0250", "Instrument-protection received", PROTECTION_KEY, "Protection received", PROTECTION_KEY)
+
+
+@polars_rule("RI0191", "Counterparty default")
+def RI0191(rules):
+    # Neither a debtor nor a protection provider of the same observed agent
+    default_keys = ["Observed agent identifier", "Counterparty identifier"]
+    debtors = rules.frame("Counterparty-instrument").filter(_role_is("Counterparty role", "Debtor")).select(
+        pl.col("Observed agent identifier").alias(default_keys[0]),
+        pl.col("Counterparty identifier").alias(default_keys[1]),
+    )
+    providers = rules.frame("Protection received").select(
+        pl.col("Observed agent identifier").alias(default_keys[0]),
+        pl.col("Protection provider identifier").alias(default_keys[1]),
+    )
+    keys = pl.concat([debtors, providers]).unique()
+    return rules.frame("Counterparty default").join(keys, on=default_keys, how="anti")
+
+
+def _instrument_dates(rule_id: str, financial_columns, condition):
+    # CN0080-CN0200: dates of an instrument compared with the dates of its Financial record of the same
+    # reference period. condition(instrument, financial) receives the Columns of both tables.
+    def query(rules):
+        merged = _with_columns(rules, "Instrument", "Financial", _PERIOD_INSTRUMENT_KEY, financial_columns)
+        return merged.filter(condition(rules.columns("Instrument"), rules.columns("Financial")))
+    POLARS_RULES[rule_id] = ("Instrument", query)
+
+
+_instrument_dates("CN0080", ["Next interest rate reset date"], lambda i, f: (
+    ~f.sentinel("Next interest rate reset date") & ~i.sentinel("Legal final maturity date") &
+    (pl.col("Legal final maturity date") > pl.col("Reference date")) &
+    _later("Legal final maturity date", "Next interest rate reset date")
+))
+_instrument_dates("CN0150", ["Next interest rate reset date"], lambda i, f: (
+    ~f.sentinel("Next interest rate reset date") & _later("Next interest rate reset date", "Inception date")
+))
+_instrument_dates("CN0160", ["Date of the default status of the instrument"], lambda i, f: (
+    ~f.sentinel("Date of the default status of the instrument") &
+    _later("Date of the default status of the instrument", "Inception date")
+))
+_instrument_dates("CN0170", ["Date of past due for the instrument"], lambda i, f: (
+    ~f.sentinel("Date of past due for the instrument") & _later("Date of past due for the instrument", "Inception date")
+))
+_instrument_dates("CN0200", ["Next interest rate reset date"], lambda i, f: (
+    ~f.sentinel("Next interest rate reset date") & ~i.sentinel("Settlement date") &
+    _later("Next interest rate reset date", "Settlement date")
+))
+
+
+@polars_rule("CN0230", "Financial")
+def CN0230(rules):
+    # Synthetic securitisations without a link to a protection item of the listed types
+    eligible = pl.col("Type of protection").cast(pl.String).is_in([
+        "Credit derivatives", "Financial guarantees other than credit derivatives", "Currency and deposits", "Securities",
+    ])
+    covered = _matching(rules, "Instrument-protection received", "Protection received", _PERIOD_PROTECTION_KEY, eligible)
+    covered = covered.select(_PERIOD_INSTRUMENT_KEY).unique()
+    synthetic = rules.frame("Financial").filter(pl.col("Type of securitisation").cast(pl.String) == "Synthetic securitisation")
+    return synthetic.join(covered, on=_PERIOD_INSTRUMENT_KEY, how="anti")
+
+
+@polars_rule("CN0620", "Counterparty-instrument")
+def CN0620(rules):
+    # Creditors that are FVCs engaged in securitisation, of traditionally securitised instruments without
+    # an originator (in any reference period, as roles.RoleTable keys the roles by instrument)
+    traditional = rules.frame("Financial").filter(
+        pl.col("Type of securitisation").cast(pl.String) == "Traditional securitisation"
+    ).select(_PERIOD_INSTRUMENT_KEY).unique()
+    originated = rules.frame("Counterparty-instrument").filter(_role_is("Counterparty role", "Originator")).select(INSTRUMENT_KEY).unique()
+    vehicles = rules.frame("Counterparty-reference").filter(
+        pl.col("Institutional sector").cast(pl.String) == "Financial vehicle corporations (FVCs) engaged in securitisation transactions"
+    ).select("Counterparty identifier").unique()
+    creditors = rules.frame("Counterparty-instrument").filter(_role_is("Counterparty role", "Creditor"))
+    return (creditors.join(traditional, on=_PERIOD_INSTRUMENT_KEY, how="semi")
+            .join(originated, on=INSTRUMENT_KEY, how="anti")
+            .join(vehicles, on="Counterparty identifier", how="semi"))
+
+
+@polars_rule("CN0621", "Counterparty-instrument")
+def CN0621(rules):
+    # Counterparties of an instrument that are both creditor and debtor, or neither
+    key = INSTRUMENT_KEY + ["Counterparty identifier"]
+    counterparty_instrument = rules.frame("Counterparty-instrument")
+    roles = counterparty_instrument.group_by(key).agg(
+        _role_is("Counterparty role", "Creditor").any().alias("creditor"),
+        _role_is("Counterparty role", "Debtor").any().alias("debtor"),
+    )
+    return counterparty_instrument.join(roles, on=key, how="inner").filter(pl.col("creditor") == pl.col("debtor"))
+
+
+@polars_rule("CN0622", "Protection received")
+def CN0622(rules):
+    # Protection items whose provider is a creditor of an instrument they protect
+    protected = rules.frame("Instrument-protection received").select(_PERIOD_PROTECTION_KEY + ["Contract identifier", "Instrument identifier"])
+    creditors = rules.frame("Counterparty-instrument").filter(_role_is("Counterparty role", "Creditor")).select(
+        _PERIOD_INSTRUMENT_KEY + [pl.col("Counterparty identifier").alias("Protection provider identifier")]
+    ).unique()
+    merged = rules.frame("Protection received").join(protected, on=_PERIOD_PROTECTION_KEY, how="inner")
+    return merged.join(creditors, on=_PERIOD_INSTRUMENT_KEY + ["Protection provider identifier"], how="semi")
+
+
+@polars_rule("CN0650", "Protection received")
+def CN0650(rules):
+    # Every protection item with the inception dates of the instruments it protects, linked through
+    # Instrument-protection received in the same reference period
+    protected = rules.frame("Instrument-protection received").select(_PERIOD_PROTECTION_KEY + ["Contract identifier", "Instrument identifier"])
+    inception = rules.frame("Instrument").select(_PERIOD_INSTRUMENT_KEY + ["Inception date"])
+    merged = rules.frame("Protection received").join(protected, on=_PERIOD_PROTECTION_KEY, how="inner").join(
+        inception, on=_PERIOD_INSTRUMENT_KEY, how="inner")
+    return merged.filter(
+        ~rules.columns("Protection received").sentinel("Maturity date of protection") &
+        (pl.col("Maturity date of protection") < pl.col("Inception date"))
+    )
+
+
+@polars_rule("CN0814", "Financial")
+def CN0814(rules):
+    non_applicable_settlement = rules.columns("Instrument").sentinel("Settlement date", [NON_APPLICABLE])
+    return _matching(rules, "Financial", "Instrument", _PERIOD_INSTRUMENT_KEY, non_applicable_settlement).filter(
+        pl.col("Off-balance sheet amount") <= 0
+    )
+
+
+@polars_rule("CN0821", "Financial")
+def CN0821(rules):
+    reverse_repurchase = pl.col("Type of instrument").cast(pl.String) == "Reverse repurchase agreements"
+    return _matching(rules, "Financial", "Instrument", _PERIOD_INSTRUMENT_KEY, reverse_repurchase).filter(
+        ~rules.columns("Financial").sentinel("Off-balance sheet amount", [NON_APPLICABLE])
+    )
+
+
+@polars_rule("CN0945", "Instrument")
+def CN0945(rules):
+    instrument = rules.columns("Instrument")
+    non_applicable_off_balance = rules.columns("Financial").sentinel("Off-balance sheet amount", [NON_APPLICABLE])
+    return _matching(rules, "Instrument", "Financial", _PERIOD_INSTRUMENT_KEY, non_applicable_off_balance).filter(
+        ~instrument.sentinel("Settlement date", [NON_APPLICABLE]) &
+        (pl.col("Inception date") < pl.col("Settlement date")) &
+        instrument.sentinel("Commitment amount at inception", [NON_APPLICABLE])
+    )
+
+
+def _later(later: str, earlier: str):
+    return pl.col(later) < pl.col(earlier)
+
+
+@row_filter("CN0010", "Instrument")
+def CN0010(c):
+    return ~c.sentinel("Settlement date") & _later("Settlement date", "Inception date")
+
+
+@row_filter("CN0030", "Instrument")
+def CN0030(c):
+    return ~c.sentinel("End date of interest-only period") & _later("End date of interest-only period", "Inception date")
+
+
+@row_filter("CN0040", "Instrument")
+def CN0040(c):
+    return (~c.sentinel("Legal final maturity date") & ~c.sentinel("Settlement date") &
+            _later("Legal final maturity date", "Settlement date"))
+
+
+@row_filter("CN0050", "Instrument")
+def CN0050(c):
+    return (~c.sentinel("Legal final maturity date") & ~c.sentinel("End date of interest-only period") &
+            _later("Legal final maturity date", "End date of interest-only period"))
+
+
+@row_filter("CN0140", "Instrument")
+def CN0140(c):
+    return _later("Reference date", "Inception date")
+
+
+@row_filter("CN0141", "Instrument")
+def CN0141(c):
+    return ~c.sentinel("Settlement date", [NON_APPLICABLE]) & _later("Reference date", "Settlement date")
+
+
+@row_filter("CN0142", "Protection received")
+def CN0142(c):
+    return _later("Date of protection value", "Date of original protection value")
+
+
+@row_filter("CN0210", "Financial")
+def CN0210(c):
+    return ~c.sentinel("Next interest rate reset date") & _later("Next interest rate reset date", "Reference date")
+
+
+@row_filter("CN0220", "Instrument")
+def CN0220(c):
+    return (~c.sentinel("End date of interest-only period") & ~c.sentinel("Settlement date") &
+            _later("End date of interest-only period", "Settlement date"))
+
+
+@row_filter("CN0240", "Financial")
+def CN0240(c):
+    return (~c.sentinel("Date of the default status of the instrument") &
+            _later("Reference date", "Date of the default status of the instrument"))
+
+
+@row_filter("CN0250", "Financial")
+def CN0250(c):
+    return (~c.sentinel("Date of past due for the instrument") &
+            _later("Reference date", "Date of past due for the instrument"))
+
+
+@row_filter("CN0270A", "Financial")
+def CN0270A(c):
+    return ~c.sentinel("Date of past due for the instrument") & (pl.col("Arrears for the instrument") <= 0)
+
+
+@row_filter("CN0270B", "Financial")
+def CN0270B(c):
+    return (pl.col("Arrears for the instrument") > 0) & c.sentinel("Date of past due for the instrument")
+
+
+@row_filter("CN0630", "Counterparty default")
+def CN0630(c):
+    return (~c.sentinel("Date of the default status of the counterparty") &
+            _later("Reference date", "Date of the default status of the counterparty"))
+
+
+@row_filter("CN0660", "Protection received")
+def CN0660(c):
+    return (~c.sentinel("Date of protection value") &
+            _later("Reference date", "Date of protection value"))
+
+
+@row_filter("CN0701", "Financial")
+def CN0701(c):
+    return (pl.col("Transferred amount") > 0) & _later("Outstanding nominal amount", "Transferred amount")
+
+
+@row_filter("CN0704", "Financial")
+def CN0704(c):
+    return _later("Outstanding nominal amount", "Arrears for the instrument")
+
+
+@row_filter("CN0705", "Instrument")
+def CN0705(c):
+    return ~c.sentinel("Commitment amount at inception", [NON_APPLICABLE]) & (pl.col("Commitment amount at inception") <= 0)
+
+
+@row_filter("CN0816", "Counterparty default")
+def CN0816(c):
+    status = "Default status of the counterparty"
+    return (c.sentinel("Date of the default status of the counterparty", [NON_APPLICABLE]) &
+            c.ne(status, "Non-applicable") & c.ne(status, "Not in default"))
+
+
+@row_filter("CN0833", "Financial")
+def CN0833(c):
+    reported_status = c.ne("Default status of the instrument", "Non-applicable")
+    non_applicable_date = c.sentinel("Date of the default status of the instrument", [NON_APPLICABLE])
+    return (reported_status & non_applicable_date) | (~reported_status & ~non_applicable_date)
+
+
+@row_filter("CN0835", "Instrument")
+def CN0835(c):
+    return (c.is_in("Amortisation type", ["French", "Fixed amortisation schedule"]) &
+            ~c.sentinel("End date of interest-only period", [NON_APPLICABLE]))
+
+
+def _fixed_rate_with(column: str):
+    # CN0836-CN0838: a fixed interest rate leaves cap, floor and spread 'Non-applicable'
+    def condition(c):
+        return (pl.col("Interest rate type").cast(pl.String) == "Fixed") & ~c.sentinel(column, [NON_APPLICABLE])
+    return condition
+
+
+row_filter("CN0836", "Instrument")(_fixed_rate_with("Interest rate cap"))
+row_filter("CN0837", "Instrument")(_fixed_rate_with("Interest rate floor"))
+row_filter("CN0838", "Instrument")(_fixed_rate_with("Interest rate spread/margin"))
+
+
+@row_filter("CN0839", "Instrument")
+def CN0839(c):
+    return (pl.col("Interest rate type").cast(pl.String) == "Fixed") & c.ne("Reference rate", "Non-applicable")
+
+
+@row_filter("CN0847", "Financial")
+def CN0847(c):
+    return ((pl.col("Off-balance sheet amount") > 0) & (pl.col("Outstanding nominal amount") == 0) &
+            (pl.col("Type of securitisation").cast(pl.String) == "Traditional securitisation"))
+
+
+@row_filter("CN0901", "Financial")
+def CN0901(c):
+    return ~c.sentinel("Interest rate", [NON_APPLICABLE]) & c.sentinel("Accrued interest", [NON_APPLICABLE])
+
+
+def _located_collateral(column: str):
+    # CN0960-CN0963: a real estate collateral location is only reported for real estate collateral
+    def condition(c):
+        return c.ne(column, "Non-applicable") & ~c.is_in("Type of protection", REAL_ESTATE_COLLATERAL)
+    return condition
+
+
+row_filter("CN0960", "Protection received")(_located_collateral("Real estate collateral location"))
+row_filter("CN0961", "Protection received")(_located_collateral("Real estate collateral location - Country"))
+row_filter("CN0962", "Protection received")(_located_collateral("Real estate collateral location - Region"))
+row_filter("CN0963", "Protection received")(_located_collateral("Real estate collateral location - Post Code"))
+
+
+@row_filter("CN0980", "Protection received")
+def CN0980(c):
+    return c.ne("Real estate collateral location", "") & (
+        c.ne("Real estate collateral location - Country", "empty") |
+        c.ne("Real estate collateral location - Region", "empty") |
+        c.ne("Real estate collateral location - Post Code", "empty")
+    )
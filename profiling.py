@@ -0,0 +1,94 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Stages of a run, in pipeline order
+STAGES = ["load", "parse", "join", "filter", "report"]
+
+PROFILE_ENV = "RECORD_RULES_PROFILE"  # set to 1 to profile every DataValidator run
+
+
+class Profiler():
+    # Records wall time, CPU time, peak traced memory above the start of the measurement and row counts for
+    # every measured step (stage + name, e.g. ("filter", "CN0290")). A disabled profiler measures nothing.
+    # Memory is traced with tracemalloc, which slows the run down; trace_memory=False only times it.
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []  # [traced memory at start, highest peak of finished inner measurements]
+
+    @contextmanager
+    def measure(self, stage: str, name: str = None, rows_in: int = None):
+        # Yields the record; set record["rows_out"] inside the block
+        record = {"stage": stage, "name": name, "rows_in": rows_in, "rows_out": None}
+        if not self.enabled:
+            yield record
+            return
+
+        tracing = self.trace_memory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)  # keep the outer peak before resetting
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall
+            record["cpu_seconds"] = time.process_time() - cpu
+            record["peak_memory_bytes"] = None
+            if tracing:
+                start, inner_peak = self._stack.pop()
+                peak = max(inner_peak, tracemalloc.get_traced_memory()[1])
+                record["peak_memory_bytes"] = peak - start
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            record["process"] = os.getpid()
+            self.records.append(record)
+
+    def frame(self) -> pd.DataFrame:
+        columns = ["stage", "name", "wall_seconds", "cpu_seconds", "peak_memory_bytes", "rows_in", "rows_out", "process"]
+        frame = pd.DataFrame(self.records, columns=columns)
+        return frame.astype({"rows_in": "Int64", "rows_out": "Int64"})
+
+    def to_json(self, path: str = None) -> str:
+        # Machine-readable run profile: per-step records plus totals per stage
+        frame = self.frame()
+        totals = frame.groupby("stage")[["wall_seconds", "cpu_seconds"]].sum()
+        profile = {
+            "records": self.records,
+            "stages": {stage: totals.loc[stage].to_dict() for stage in STAGES if stage in totals.index},
+        }
+        text = json.dumps(profile, indent=2, default=str)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def summary(self, top: int = None) -> str:
+        # Steps sorted by wall time, slowest first, after the totals per stage
+        frame = self.frame()
+        if frame.empty:
+            return "No profile recorded"
+        totals = frame.groupby("stage")[["wall_seconds", "cpu_seconds"]].sum()
+        totals = totals.reindex([s for s in STAGES if s in totals.index] + [s for s in totals.index if s not in STAGES])
+        steps = frame.sort_values("wall_seconds", ascending=False)
+        if top is not None:
+            steps = steps.head(top)
+        steps = steps.assign(peak_memory_mb=steps["peak_memory_bytes"] / 2 ** 20).drop(columns=["peak_memory_bytes", "process"])
+        return "\n\n".join([totals.to_string(float_format="%.3f"), steps.to_string(index=False, float_format="%.3f")])
+
+
+# Shared default of code paths called without a profiler
+DISABLED = Profiler(enabled=False)
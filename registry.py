@@ -0,0 +1,86 @@
+import hashlib
+import inspect
+
+
+class RuleCategory():
+    CRITICAL = "Critical"
+    COUNTERPARTY_CONSISTENCY = "Counterparty consistency"
+    CONSISTENCY = "Consistency"
+    REFERENTIAL_INTEGRITY = "Referential integrity"
+
+
+class RuleSpec():
+
+    def __init__(self, rule_id: str, category: str, inputs: dict, row_local: bool, method_name: str, history: bool = False,
+                 by_agent: bool = True, version: int = 1, source_hash: str = ""):
+        self.rule_id = rule_id
+        self.category = category
+        self.inputs = {dataset: tuple(columns) for dataset, columns in inputs.items()}  # dataset -> columns read
+        self.row_local = row_local  # reads a single dataset and one row at a time
+        self.history = history  # compares a record with the same record in the previous reference period
+        self.by_agent = by_agent  # its violations are the union of its violations per observed agent
+        self.method_name = method_name
+        self.version = version  # bumped when the rule's meaning changes outside its method (helpers, inputs)
+        self.source_hash = source_hash  # hash of the method's source, so an edited rule never reuses cached results
+
+    @property
+    def datasets(self) -> tuple:
+        return tuple(self.inputs)
+
+    @property
+    def dataset(self) -> str:
+        # The first declared input is the dataset whose rows the rule reports
+        return self.datasets[0]
+
+    def __repr__(self):
+        return "RuleSpec(%s, %s, %s)" % (self.rule_id, self.category, list(self.datasets))
+
+
+# rule ID -> RuleSpec, in the order the rules are defined in RecordRules
+RULES = {}
+
+
+def rule(rule_id: str, category: str, inputs: dict, row_local: bool = False, history: bool = False, by_agent: bool = True,
+         version: int = 1):
+    # Decorator declaring a RecordRules method as a rule together with the datasets and columns it reads
+    def register(method):
+        source_hash = hashlib.sha256(inspect.getsource(method).encode("utf-8")).hexdigest()
+        spec = RuleSpec(rule_id, category, inputs, row_local, method.__name__, history, by_agent, version, source_hash)
+        RULES[rule_id] = spec
+        method.rule_spec = spec
+        return method
+    return register
+
+
+def select_rules(rule_ids=None, categories=None, datasets=None) -> list:
+    specs = list(RULES.values())
+    if rule_ids is not None:
+        unknown = set(rule_ids) - set(RULES)
+        if unknown:
+            raise KeyError("Unknown rule(s): %s" % ", ".join(sorted(unknown)))
+        specs = [s for s in specs if s.rule_id in set(rule_ids)]
+    if categories is not None:
+        specs = [s for s in specs if s.category in set(categories)]
+    if datasets is not None:
+        specs = [s for s in specs if set(s.datasets) <= set(datasets)]
+    return specs
+
+
+def required_inputs(specs) -> dict:
+    # Union of the datasets and columns read by the given rules, dataset -> sorted column list
+    inputs = {}
+    for spec in specs:
+        for dataset, columns in spec.inputs.items():
+            inputs.setdefault(dataset, set()).update(columns)
+    return {dataset: sorted(columns) for dataset, columns in inputs.items()}
+
+
+def execution_plan(specs, available=None) -> list:
+    # Orders the rules so that rules reading the same tables run back to back.
+    # Rules whose datasets are not available are left out of the plan.
+    if available is not None:
+        specs = [s for s in specs if set(s.datasets) <= set(available)]
+    first_seen = {}
+    for position, spec in enumerate(specs):
+        first_seen.setdefault(spec.datasets, position)
+    return sorted(specs, key=lambda s: first_seen[s.datasets])
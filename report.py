@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from interning import IdentifierDomain, identifier_domain
+from profiling import DISABLED
+from registry import RULES
+from schema import TEMPLATE_PATH, dataset_file_name
+from snapshot import reference_date_column
+
+# Key columns of the long format, in output order; every dataset fills those it has
+KEY_DOMAINS = [
+    IdentifierDomain.OBSERVED_AGENT,
+    IdentifierDomain.CONTRACT,
+    IdentifierDomain.INSTRUMENT,
+    IdentifierDomain.COUNTERPARTY,
+    IdentifierDomain.PROTECTION,
+]
+
+REPORT_COLUMNS = ["Rule", "Category", "Dataset", "Row", "Reference date"] + KEY_DOMAINS + ["Error"]
+
+
+def load_rule_texts(template_path: str = TEMPLATE_PATH) -> pd.DataFrame:
+    # "Record rules" sheet of the template, indexed by rule number: Rule Category, Rule Description, Rule Error
+    sheet = pd.read_excel(template_path, sheet_name="Record rules", header=None, dtype=str)
+    header_row = sheet.index[sheet.iloc[:, 0].str.strip() == "Rule Number"][0]
+    rules = sheet.iloc[header_row + 1:].copy()
+    rules.columns = [str(c).strip() for c in sheet.iloc[header_row]]
+    rules = rules.loc[:, ~rules.columns.duplicated()].dropna(subset=["Rule Number"])
+    rules["Rule Number"] = rules["Rule Number"].str.strip()
+    return rules.set_index("Rule Number")[["Rule Category", "Rule Description", "Rule Error"]]
+
+
+class ViolationReport():
+    # Writes violations in long format (one row per rule and violating record) as rules finish:
+    # "<output_dir>/<dataset>/<rule ID>/part-00000.parquet" (or .csv), at most batch_rows rows per part.
+    # A rule may be written in several calls with disjoint rows (e.g. one per partition), parts continue.
+    # Only the key columns of the violating rows are materialized, one batch at a time, and per-rule and
+    # per-observed-agent counts are accumulated for the summary workbook written by close().
+
+    def __init__(self, output_dir: str, df_dict: dict, rule_texts: pd.DataFrame = None, interner=None,
+                 file_format: str = "parquet", batch_rows: int = 1_000_000, profiler=DISABLED):
+        if file_format not in ("parquet", "csv"):
+            raise ValueError("Unknown report format: %s" % file_format)
+        self.output_dir = output_dir
+        self.df_dict = df_dict
+        self.rule_texts = rule_texts if rule_texts is not None else load_rule_texts()
+        self.interner = interner
+        self.file_format = file_format
+        self.batch_rows = batch_rows
+        self.profiler = profiler
+        self.rule_counts = {}  # (rule ID, dataset) -> violations
+        self._parts = {}  # (rule ID, dataset) -> parts written
+        self.agent_counts = {}  # (observed agent, rule ID) -> violations
+        self._key_columns = {}
+
+    def key_columns(self, dataset: str) -> dict:
+        # Report column -> dataset column: the reference date and the first column of each identifier domain
+        if dataset not in self._key_columns:
+            columns = self.df_dict[dataset].columns
+            keys = {}
+            date_column = reference_date_column(columns)
+            if date_column is not None:
+                keys["Reference date"] = date_column
+            for column in columns:
+                domain = identifier_domain(column)
+                if domain in KEY_DOMAINS and domain not in keys:
+                    keys[domain] = column
+            self._key_columns[dataset] = keys
+        return self._key_columns[dataset]
+
+    def _text(self, rule_id: str, column: str):
+        if rule_id in self.rule_texts.index:
+            return self.rule_texts.at[rule_id, column]
+        return None
+
+    def write(self, rule_id: str, dataset: str, positions: np.ndarray):
+        self.rule_counts[(rule_id, dataset)] = self.rule_counts.get((rule_id, dataset), 0) + len(positions)
+        if len(positions) == 0:
+            return
+        with self.profiler.measure("report", rule_id, len(positions)) as record:
+            self._write(rule_id, dataset, positions)
+            record["rows_out"] = len(positions)
+
+    def _write(self, rule_id: str, dataset: str, positions: np.ndarray):
+        table = self.df_dict[dataset]
+        keys = self.key_columns(dataset)
+        category = RULES[rule_id].category if rule_id in RULES else self._text(rule_id, "Rule Category")
+        error = self._text(rule_id, "Rule Error")
+        directory = os.path.join(self.output_dir, os.path.splitext(dataset_file_name(dataset))[0], rule_id)
+        os.makedirs(directory, exist_ok=True)
+
+        for start in range(0, len(positions), self.batch_rows):
+            part = self._parts.get((rule_id, dataset), 0)
+            self._parts[(rule_id, dataset)] = part + 1
+            batch = positions[start:start + self.batch_rows]
+            rows = table.iloc[batch][list(keys.values())]
+            if self.interner is not None:
+                rows = self.interner.decode(rows)
+
+            out = pd.DataFrame(index=range(len(batch)), columns=REPORT_COLUMNS)
+            out["Rule"] = rule_id
+            out["Category"] = category
+            out["Dataset"] = dataset
+            out["Row"] = batch
+            for report_column, column in keys.items():
+                out[report_column] = rows[column].to_numpy()
+            out["Error"] = error
+
+            if IdentifierDomain.OBSERVED_AGENT in keys:
+                for agent, count in out[IdentifierDomain.OBSERVED_AGENT].value_counts(dropna=False).items():
+                    self.agent_counts[(agent, rule_id)] = self.agent_counts.get((agent, rule_id), 0) + int(count)
+
+            path = os.path.join(directory, "part-%05d.%s" % (part, self.file_format))
+            if self.file_format == "parquet":
+                for column in ("Rule", "Category", "Dataset", "Error"):
+                    out[column] = out[column].astype("category")  # dictionary-encoded, stored once per file
+                out.to_parquet(path, index=False)
+            else:
+                out.to_csv(path, index=False)
+
+    def summary(self) -> tuple:
+        rules = pd.DataFrame([(r, d, count) for (r, d), count in self.rule_counts.items()], columns=["Rule", "Dataset", "Violations"])
+        rules.insert(1, "Category", [RULES[r].category if r in RULES else self._text(r, "Rule Category") for r in rules["Rule"]])
+        rules["Description"] = [self._text(r, "Rule Description") for r in rules["Rule"]]
+        agents = pd.DataFrame(
+            [(agent, rule_id, count) for (agent, rule_id), count in self.agent_counts.items()],
+            columns=[IdentifierDomain.OBSERVED_AGENT, "Rule", "Violations"],
+        ).sort_values([IdentifierDomain.OBSERVED_AGENT, "Rule"], ignore_index=True)
+        return rules, agents
+
+    def close(self) -> str:
+        # Write "<output_dir>/summary.xlsx" and return its path
+        os.makedirs(self.output_dir, exist_ok=True)
+        rules, agents = self.summary()
+        path = os.path.join(self.output_dir, "summary.xlsx")
+        with pd.ExcelWriter(path) as writer:
+            rules.to_excel(writer, sheet_name="Rules", index=False)
+            agents.to_excel(writer, sheet_name="Observed agents", index=False)
+        return path
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from code_lists import CODE_LISTS_PATH, file_hash, load_artifact
+from schema import TEMPLATE_PATH
+
+# Bumped when the cached format or the meaning of positions changes, invalidating every entry
+RESULT_CACHE_VERSION = 1
+
+# Modules the rules call into (and the backends whose results are cached as well): a change to any of them
+# can change the violations of a rule whose own source did not change
+RULE_HELPER_MODULES = [
+    "interning", "joins", "keys", "mapping", "masks", "normalize", "partitions", "polars_backend", "results",
+    "roles", "schema", "temporal",
+]
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    # Content hash of a loaded table (its columns and values, in row order), for tables not read from one file
+    digest = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def helpers_hash(modules=RULE_HELPER_MODULES) -> str:
+    # Hash of the source files of the given modules of this package
+    digest = hashlib.sha256()
+    for name in modules:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name + ".py")
+        digest.update(("%s=%s\n" % (name, file_hash(path))).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache():
+    # Violations of every rule kept on disk across runs, content-addressed: "<directory>/<rule ID>/<key>.npz",
+    # where the key hashes the rule ID, its version and source (RuleSpec.version, RuleSpec.source_hash), the
+    # fingerprints of the tables it reads and what every rule depends on besides: the template workbook (the
+    # dtypes of the loaded tables), the code list artifact and the helper modules (RULE_HELPER_MODULES).
+    # Rerunning a submission after one table was resubmitted only re-executes the rules that read that table.
+    # File hashes are remembered by path, size and modification time in "<directory>/fingerprints.json", so
+    # unchanged files are not read again.
+
+    def __init__(self, directory: str, template_path: str = TEMPLATE_PATH, code_lists_path: str = CODE_LISTS_PATH):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._index_path = os.path.join(directory, "fingerprints.json")
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+        self.environment = [
+            "template=%s" % self.file_fingerprint(template_path),
+            "code_lists=%s" % load_artifact(code_lists_path)["content_sha256"],
+            "helpers=%s" % helpers_hash(),
+        ]
+
+    def file_fingerprint(self, path: str) -> str:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self._index.get(path)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        fingerprint = file_hash(path)
+        self._index[path] = [stat.st_size, stat.st_mtime_ns, fingerprint]
+        self._write(self._index_path, lambda f: f.write(json.dumps(self._index, indent=1).encode("utf-8")))
+        return fingerprint
+
+    def key(self, spec, fingerprints: dict) -> str:
+        # fingerprints: dataset -> fingerprint of the loaded table, "<dataset> (previous)" -> fingerprint of
+        # its earlier periods, which the history rules read as well
+        parts = [str(RESULT_CACHE_VERSION), spec.rule_id, str(spec.version), spec.source_hash] + self.environment
+        for dataset in sorted(spec.datasets):
+            parts.append("%s=%s" % (dataset, fingerprints.get(dataset)))
+            if spec.history:
+                parts.append("%s (previous)=%s" % (dataset, fingerprints.get(dataset + " (previous)")))
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, rule_id: str, key: str) -> str:
+        return os.path.join(self.directory, rule_id, key + ".npz")
+
+    def get(self, rule_id: str, key: str):
+        # (dataset, row positions) of an earlier run, None if there is none
+        try:
+            with np.load(self._path(rule_id, key)) as entry:
+                result = str(entry["dataset"]), entry["positions"].astype("int64")
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, rule_id: str, key: str, dataset: str, positions: np.ndarray):
+        os.makedirs(os.path.join(self.directory, rule_id), exist_ok=True)
+        self._write(self._path(rule_id, key), lambda f: np.savez(f, dataset=np.array(dataset), positions=np.asarray(positions, dtype="int64")))
+
+    def _write(self, path: str, write):
+        # Write through a temporary file, so an interrupted run never leaves a truncated entry behind
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            write(f)
+        os.replace(path + ".tmp", path)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
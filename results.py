@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from profiling import DISABLED
+
+
+def violation_positions(table: pd.DataFrame, invalid_rows: pd.DataFrame) -> np.ndarray:
+    # Sorted, unique row positions in table of the rows a rule reported. Rules built on a join report the
+    # reported table's index labels (see JoinCache), so they map back the same way; labels that are not
+    # rows of table are dropped.
+    positions = table.index.get_indexer(invalid_rows.index.unique())
+    return np.unique(positions[positions >= 0])
+
+
+class RuleFailure():
+    # Outcome of a rule that raised, in place of its violation positions: the run goes on with the other
+    # rules and ValidationResults records the error. Plain data, so it travels back from worker processes.
+
+    def __init__(self, error: Exception):
+        self.message = "%s: %s" % (type(error).__name__, error)
+
+    def __repr__(self):
+        return "RuleFailure(%r)" % self.message
+
+
+def evaluate_rule(rules, method_name: str, profiler=DISABLED) -> tuple:
+    # Run one RecordRules method and keep only (rule_id, dataset, row positions) of its result;
+    # (rule_id, dataset, RuleFailure) if it raised. The positions refer to the dataset the rule declares
+    # it reports (RuleSpec.dataset), not to the name it returns.
+    method = getattr(rules, method_name)
+    spec = method.rule_spec
+    rows_in = sum(len(rules.df_dict[dataset]) for dataset in spec.datasets if dataset in rules.df_dict)
+    try:
+        with profiler.measure("filter", spec.rule_id, rows_in) as record:
+            _, _, invalid_rows = method()
+            positions = violation_positions(rules.df_dict[spec.dataset], invalid_rows)
+            record["rows_out"] = len(positions)
+    except Exception as error:
+        return spec.rule_id, spec.dataset, RuleFailure(error)
+    return spec.rule_id, spec.dataset, positions
+
+
+class ValidationResults():
+    # Result of a validation run: for every rule the positions of the violating rows in its dataset,
+    # instead of a copy of the table. Rows are only materialized when asked for (e.g. by a report).
+
+    def __init__(self, df_dict: dict):
+        self.df_dict = df_dict
+        self.positions = {}  # rule ID -> sorted row positions
+        self.datasets = {}  # rule ID -> reported dataset
+        self.errors = {}  # rule ID -> error message of a rule that raised (see RuleFailure)
+
+    def add(self, rule_id: str, dataset: str, positions: np.ndarray):
+        # Returns False for a RuleFailure, whose rule then has no positions
+        if isinstance(positions, RuleFailure):
+            self.positions.pop(rule_id, None)
+            self.datasets.pop(rule_id, None)
+            self.errors[rule_id] = positions.message
+            return False
+        self.positions[rule_id] = np.asarray(positions, dtype="int64")
+        self.datasets[rule_id] = dataset
+        return True
+
+    def merge(self, rule_id: str, dataset: str, positions: np.ndarray):
+        # Union with the positions already recorded for the rule (partial results, e.g. per partition);
+        # a rule that failed in any part stays failed
+        if rule_id in self.errors:
+            return False
+        if rule_id in self.positions and not isinstance(positions, RuleFailure):
+            positions = np.union1d(self.positions[rule_id], positions)
+        return self.add(rule_id, dataset, positions)
+
+    @property
+    def rule_ids(self) -> list:
+        return list(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def counts(self) -> pd.Series:
+        return pd.Series({rule_id: len(p) for rule_id, p in self.positions.items()}, name="Violations", dtype="int64")
+
+    def mask(self, rule_id: str) -> np.ndarray:
+        # Boolean violation bitmap of one rule over its dataset
+        mask = np.zeros(len(self.df_dict[self.datasets[rule_id]]), dtype=bool)
+        mask[self.positions[rule_id]] = True
+        return mask
+
+    def matrix(self, dataset: str) -> pd.DataFrame:
+        # Record x rule violation matrix of one dataset: one boolean column per rule reporting it
+        rule_ids = [rule_id for rule_id in self.positions if self.datasets[rule_id] == dataset]
+        table = self.df_dict[dataset]
+        matrix = np.zeros((len(table), len(rule_ids)), dtype=bool)
+        for column, rule_id in enumerate(rule_ids):
+            matrix[self.positions[rule_id], column] = True
+        return pd.DataFrame(matrix, index=table.index, columns=rule_ids)
+
+    def invalid_rows(self, rule_id: str) -> pd.DataFrame:
+        return self.df_dict[self.datasets[rule_id]].iloc[self.positions[rule_id]]
+
+    def frame(self, rule_id: str) -> pd.DataFrame:
+        # The whole dataset with a "Correct" column (False for the rule's violations)
+        table = self.df_dict[self.datasets[rule_id]]
+        return table.assign(Correct=~self.mask(rule_id))
+
+    def items(self):
+        # (rule ID, frame) pairs, materialized one at a time
+        for rule_id in self.positions:
+            yield rule_id, self.frame(rule_id)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from code_lists import load_code_lists
+from keys import composite_key_codes, key_isin
+from mapping import ValueMapping
+
+# One bit per counterparty role (code list "Counterparty role": 1, 2, 3, 7)
+CREDITOR = 1
+DEBTOR = 2
+ORIGINATOR = 4
+SERVICER = 8
+
+ROLE_BITS = {
+    "Creditor": CREDITOR,
+    "Debtor": DEBTOR,
+    "Originator": ORIGINATOR,
+    "Servicer": SERVICER,
+}
+
+
+def counterparty_roles(code_lists: dict = None):
+    # The "Counterparty role" code list (mapping.Mapping), e.g. "2" -> "Debtor"
+    code_lists = code_lists if code_lists is not None else load_code_lists()
+    return code_lists[ValueMapping.CounterpartyRole]
+
+
+def _distinct(roles: pd.Series) -> tuple:
+    # (code of every row, -1 for missing values; distinct values)
+    if isinstance(roles.dtype, pd.CategoricalDtype):
+        return roles.cat.codes.to_numpy(), roles.cat.categories
+    return pd.factorize(roles)
+
+
+def _descriptions(uniques, mapping) -> pd.Series:
+    # A role may be reported as its code ("2"), its description ("Debtor") or both ("2 - Debtor"). The code
+    # part is translated through the code list; values that are not a code are kept as reported.
+    reported = pd.Series([str(value).strip() for value in uniques], dtype=object)
+    translated = mapping.to_descriptions(reported.str.partition(" - ")[0]).astype(object)
+    return translated.fillna(reported)
+
+
+def role_bits(roles: pd.Series, mapping) -> np.ndarray:
+    # uint8 role bit of every row, 0 for missing or unknown roles; mapping is the "Counterparty role" code
+    # list (see counterparty_roles()). Only the distinct values are looked up, the rows are expanded
+    # through their categorical codes.
+    codes, uniques = _distinct(roles)
+    bits = np.array([ROLE_BITS.get(description, 0) for description in _descriptions(uniques, mapping)] + [0], dtype="uint8")
+    return bits[codes]
+
+
+def role_descriptions(roles: pd.Series, mapping) -> pd.Series:
+    # The roles as their descriptions ("Debtor"), as a categorical, for the backends that compare role names
+    codes, uniques = _distinct(roles)
+    descriptions = _descriptions(uniques, mapping)
+    categories = pd.Index(descriptions.unique())
+    positions = np.append(categories.get_indexer(descriptions), -1)[codes]
+    return pd.Series(pd.Categorical.from_codes(positions, categories=categories), index=roles.index, name=roles.name)
+
+
+class RoleTable():
+    # Roles per key of a Counterparty-instrument table, e.g. per (observed agent, contract, instrument,
+    # counterparty): the OR of the role bits of all rows with that key, built with one scatter per role.
+    # keys holds one row per distinct key, bits its roles; row_roles() spreads them back onto the table rows.
+
+    def __init__(self, df: pd.DataFrame, key_columns, role_column: str, mapping):
+        self.key_columns = list(key_columns)
+        row_bits = role_bits(df[role_column], mapping)
+        codes, _ = composite_key_codes(df, self.key_columns, df, self.key_columns)
+        valid = codes >= 0
+        # Dense key codes over the rows with a complete key, -1 for the others
+        self.codes = np.full(len(df), -1, dtype="int64")
+        self.codes[valid] = pd.factorize(codes[valid])[0]
+
+        count = self.codes.max(initial=-1) + 1
+        self.bits = np.zeros(count, dtype="uint8")
+        for bit in ROLE_BITS.values():
+            present = np.zeros(count, dtype=bool)
+            present[self.codes[valid & (row_bits & bit != 0)]] = True
+            self.bits[present] |= bit
+
+        # First row of every key, in key code order (factorize numbers keys by first appearance)
+        first = np.flatnonzero(valid)[np.unique(self.codes[valid], return_index=True)[1]]
+        self.keys = df[self.key_columns].iloc[first].reset_index(drop=True)
+
+    def row_roles(self) -> np.ndarray:
+        # Roles of the key of every table row, 0 for rows with a missing key value
+        return np.append(self.bits, 0)[self.codes]
+
+    def has_role(self, probe: pd.DataFrame, probe_columns, role: int) -> pd.Series:
+        # "(probe columns) EXISTS IN {(key columns) | role}", one boolean per probe row
+        return key_isin(probe, probe_columns, self.keys, self.key_columns, build_mask=self.bits & role != 0)
+
+
+class RoleEngine():
+    # Builds each RoleTable and the role bits of each role column once per run and shares them between the
+    # role-dependent rules: RI0050-RI0070 and CN0620 read the roles per instrument key, CN0621 the roles per
+    # instrument key and counterparty, CN0620, CN0622 and RI0191 the role of every Counterparty-instrument row.
+    # CPC001-CPC004 translate the roles of their merged frame with bits().
+    # The "Counterparty role" code list is loaded when the first roles are read (see counterparty_roles()).
+
+    def __init__(self, df_dict: dict, code_lists: dict = None):
+        self.df_dict = df_dict
+        self.code_lists = code_lists
+        self._mapping = None
+        self._tables = {}
+        self._rows = {}
+
+    @property
+    def mapping(self):
+        if self._mapping is None:
+            self._mapping = counterparty_roles(self.code_lists)
+        return self._mapping
+
+    def table(self, dataset: str, key_columns, role_column: str) -> RoleTable:
+        table_key = (dataset, tuple(key_columns), role_column)
+        if table_key not in self._tables:
+            self._tables[table_key] = RoleTable(self.df_dict[dataset], key_columns, role_column, self.mapping)
+        return self._tables[table_key]
+
+    def rows(self, dataset: str, role_column: str) -> np.ndarray:
+        # Role bit of every row of a table
+        if (dataset, role_column) not in self._rows:
+            self._rows[(dataset, role_column)] = role_bits(self.df_dict[dataset][role_column], self.mapping)
+        return self._rows[(dataset, role_column)]
+
+    def bits(self, roles: pd.Series) -> np.ndarray:
+        # Role bit of every value of a role column that is not a df_dict table's, e.g. of a merged frame
+        return role_bits(roles, self.mapping)
@@ -0,0 +1,227 @@
+import os
+
+import pandas as pd
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "draft-credit-data-template-and-rules-monthly---banks.xlsx")
+
+# df_dict key -> dataset sheet of the template workbook
+DATASET_SHEETS = {
+    "Instrument": "Instrument",
+    "Financial": "Financial",
+    "Counterparty-instrument": "Counterparty-Instrument",
+    "Joint liabilities": "Joint Liabilities",
+    "Protection received": "Protection Received",
+    "Instrument-protection received": "Instrument-Protection Received",
+    "Counterparty risk": "Counterparty Risk",
+    "Counterparty default": "Counterparty Default",
+}
+
+# Datasets that are loaded by DataValidator but not described in the template (RIAD / quarterly data)
+EXTERNAL_DATASETS = ["Counterparty-reference", "Accounting"]
+
+# Attributes of the external datasets that the rules read: the RIAD counterparty reference data and the
+# quarterly accounting data, keyed like the template datasets
+EXTERNAL_ATTRIBUTES = {
+    "Counterparty-reference": [
+        "Counterparty identifier",
+        "Institutional sector",
+        "Role 3 Creditor",
+        "Role 4 Debtor - All instruments originated prior to 1 September 2018",
+        "Role 4 Debtor - At least one instrument originated at or after 1 September 2018",
+        "Role 6 Protection provider",
+        "Role 10 Originator",
+        "Role 11 Servicer",
+    ],
+    "Accounting": [
+        "Reference date",
+        "Reporting agent identifier",
+        "Observed agent identifier",
+        "Contract identifier",
+        "Instrument identifier",
+        "Date of the forbearance and renegotiation status",
+    ],
+}
+
+# Identifiers of an instrument, a protection item and a counterparty within an observed agent's reports. The
+# history rules follow them across reference periods; rules combining two tables match them within one
+# reference date.
+INSTRUMENT_KEY = ["Observed agent identifier", "Contract identifier", "Instrument identifier"]
+PROTECTION_KEY = ["Observed agent identifier", "Protection identifier"]
+COUNTERPARTY_KEY = ["Observed agent identifier", "Counterparty identifier"]
+
+# Attribute names whose code list sheet is spelled differently in the workbook
+CODE_LIST_ALIASES = {
+    "type of securitisation": "type of securisation",
+    "real estate collateral location - country": "recl country",
+    "real estate collateral location - region": "recl region",
+    "real estate collateral location - post code": "recl postal code",
+}
+
+AMOUNT_MARKERS = (
+    "amount",
+    "value",
+    "interest rate cap",
+    "interest rate floor",
+    "interest rate spread",
+    "arrears",
+    "accrued interest",
+    "probability of default",
+    "changes in credit risk",
+    "claims against",
+)
+
+
+class AttributeKind():
+    IDENTIFIER = "identifier"
+    CODED = "coded"
+    DATE = "date"
+    AMOUNT = "amount"
+    TEXT = "text"
+
+
+def normalise_name(name: str) -> str:
+    return " ".join(str(name).lower().replace(" the ", " ").split())
+
+
+def dataset_file_name(dataset: str) -> str:
+    # "Counterparty-instrument" -> "counterparty_instrument.csv"
+    return dataset.lower().replace("-", "_").replace(" ", "_") + ".csv"
+
+
+def base_attribute(column: str) -> str:
+    # Rules sometimes address columns as "<Dataset>.<Attribute>", strip the dataset qualifier
+    prefix, sep, rest = column.partition(".")
+    if sep and normalise_name(prefix) in {normalise_name(d) for d in list(DATASET_SHEETS) + EXTERNAL_DATASETS + ["Counterparty reference"]}:
+        return rest
+    return column
+
+
+def attribute_kind(column: str, code_lists=frozenset()) -> str:
+    name = normalise_name(base_attribute(column))
+    if "identifier" in name:
+        return AttributeKind.IDENTIFIER
+    if "date" in name:
+        return AttributeKind.DATE
+    if CODE_LIST_ALIASES.get(name, name) in code_lists:
+        return AttributeKind.CODED
+    if any(marker in name for marker in AMOUNT_MARKERS) or name == "interest rate":
+        return AttributeKind.AMOUNT
+    return AttributeKind.TEXT
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype()
+
+
+class DatasetSchema():
+
+    def __init__(self, name: str, attributes: dict, code_lists=frozenset()):
+        self.name = name
+        self.attributes = attributes  # attribute name -> AttributeKind
+        self.code_lists = code_lists
+
+    def kind(self, column: str) -> str:
+        column = column.strip()
+        if column in self.attributes:
+            return self.attributes[column]
+        return attribute_kind(column, self.code_lists)
+
+    def columns_of_kind(self, kind: str, columns) -> list:
+        return [c for c in columns if self.kind(c) == kind]
+
+    def read_dtypes(self, columns) -> dict:
+        # Dtypes handed to pd.read_csv. Amounts are read as categoricals and converted afterwards,
+        # so sentinel tokens such as 'Non-applicable' survive in columns that are not purely numeric.
+        string_dtype = _string_dtype()
+        dtypes = {}
+        for column in columns:
+            kind = self.kind(column)
+            if kind in (AttributeKind.IDENTIFIER, AttributeKind.DATE):
+                dtypes[column] = string_dtype
+            else:
+                dtypes[column] = "category"
+        return dtypes
+
+
+def load_schemas(template_path: str = TEMPLATE_PATH) -> dict:
+    sheets = pd.read_excel(template_path, sheet_name=None, header=None, dtype=str)
+
+    code_lists = set()
+    for sheet_name, sheet in sheets.items():
+        header_rows = sheet.head(2).fillna("").values.tolist()
+        if any(row[:1] == ["Code"] for row in header_rows):
+            code_lists.add(normalise_name(sheet_name))
+    code_lists = frozenset(code_lists)
+
+    schemas = {}
+    for dataset, sheet_name in DATASET_SHEETS.items():
+        # First row is the sheet title, attribute names follow in the first column
+        names = sheets[sheet_name].iloc[1:, 0].dropna().str.strip()
+        attributes = {name: attribute_kind(name, code_lists) for name in names}
+        schemas[dataset] = DatasetSchema(dataset, attributes, code_lists)
+    for dataset in EXTERNAL_DATASETS:
+        attributes = {name: attribute_kind(name, code_lists) for name in EXTERNAL_ATTRIBUTES[dataset]}
+        schemas[dataset] = DatasetSchema(dataset, attributes, code_lists)
+    return schemas
+
+
+def _numeric_amounts(df: pd.DataFrame, schema: DatasetSchema) -> pd.DataFrame:
+    # Convert amount columns to float through their categories, so each distinct value is parsed once
+    for column in schema.columns_of_kind(AttributeKind.AMOUNT, df.columns):
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        numeric_categories = pd.to_numeric(values.cat.categories, errors="coerce")
+        if numeric_categories.isna().any():
+            continue  # mixed with sentinel tokens, leave as categorical
+        codes = values.cat.codes.to_numpy()
+        converted = numeric_categories.to_numpy(dtype="float64")[codes]
+        converted[codes == -1] = float("nan")
+        df[column] = converted
+    return df
+
+
+def read_dataset(path: str, schema: DatasetSchema, usecols=None, chunksize=None, nrows=None, typed=True):
+    # Header names are stripped, the template itself has trailing blanks ("Contract identifier ").
+    # typed=False reads every column as Python objects, the baseline for memory comparisons.
+    raw_header = pd.read_csv(path, nrows=0).columns
+    columns = {raw: raw.strip() for raw in raw_header}
+    if usecols is not None:
+        wanted = set(usecols)
+        columns = {raw: name for raw, name in columns.items() if name in wanted}
+    dtypes = schema.read_dtypes(columns.values()) if typed else dict.fromkeys(columns.values(), object)
+
+    reader = pd.read_csv(
+        path,
+        usecols=list(columns),
+        dtype={raw: dtypes[name] for raw, name in columns.items()},
+        keep_default_na=False,  # 'NA' is a code (Non-applicable), not a missing value
+        chunksize=chunksize,
+        nrows=nrows,
+    )
+    convert = _numeric_amounts if typed else (lambda df, schema: df)
+    if chunksize is not None:
+        return (convert(chunk.rename(columns=columns), schema) for chunk in reader)
+    return convert(reader.rename(columns=columns), schema)
+
+
+def memory_usage(df_dict: dict) -> pd.DataFrame:
+    rows = []
+    for table, df in df_dict.items():
+        usage = df.memory_usage(deep=True, index=False)
+        for column, nbytes in usage.items():
+            rows.append({"Table": table, "Column": column, "Dtype": str(df[column].dtype), "Bytes": int(nbytes)})
+    return pd.DataFrame(rows, columns=["Table", "Column", "Dtype", "Bytes"])
+
+
+def compare_memory(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    report = pd.merge(before, after, on=["Table", "Column"], how="outer", suffixes=(" before", " after"))
+    report["Saving"] = 1 - report["Bytes after"] / report["Bytes before"]
+    totals = report.groupby("Table", as_index=False)[["Bytes before", "Bytes after"]].sum()
+    totals["Column"] = "<total>"
+    totals["Saving"] = 1 - totals["Bytes after"] / totals["Bytes before"]
+    return pd.concat([report, totals], ignore_index=True).sort_values(["Table", "Column"], ignore_index=True)
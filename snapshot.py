@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+
+from normalize import sentinel_column
+from registry import required_inputs
+from schema import AttributeKind, attribute_kind, base_attribute, dataset_file_name, normalise_name
+
+
+def reference_date_column(columns):
+    for column in columns:
+        if normalise_name(base_attribute(column)) == "reference date":
+            return column
+    return None
+
+
+def reference_periods(dates: pd.Series) -> list:
+    # The reference periods a table reports, in date order: the month-end reference dates carried by at least
+    # half as many rows as the most frequent one. A stray early, late or malformed date on a few rows is not a
+    # period, so it neither moves the T-1 cutoff of load_previous() nor gets a snapshot of its own.
+    dates = pd.to_datetime(dates, errors="coerce")
+    counts = dates[dates.dt.is_month_end].value_counts()
+    if counts.empty:
+        return []
+    return sorted(counts.index[counts >= counts.max() / 2])
+
+
+def history_inputs(specs) -> dict:
+    # Datasets and columns read by the history rules, i.e. what a snapshot has to keep of a submission
+    return required_inputs([spec for spec in specs if spec.history])
+
+
+class SnapshotStore():
+    # Previous-period state for the history rules (CN0290, CN0804, ...): one Parquet file per dataset and
+    # reference date, "<directory>/<dataset>/<YYYY-MM-DD>.parquet", holding only the attributes those rules
+    # read, sorted by identifier. A monthly run then reads the current submission plus the latest snapshot
+    # instead of two full months of CSV. Parquet needs pyarrow (or fastparquet).
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _dataset_dir(self, dataset: str) -> str:
+        return os.path.join(self.directory, os.path.splitext(dataset_file_name(dataset))[0])
+
+    def _path(self, dataset: str, reference_date) -> str:
+        return os.path.join(self._dataset_dir(dataset), pd.Timestamp(reference_date).strftime("%Y-%m-%d") + ".parquet")
+
+    def reference_dates(self, dataset: str) -> list:
+        directory = self._dataset_dir(dataset)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(pd.Timestamp(os.path.splitext(name)[0]) for name in os.listdir(directory) if name.endswith(".parquet"))
+
+    def save(self, df_dict: dict, specs, interner=None) -> list:
+        # Write the history attributes of every reference period in df_dict (see reference_periods), replacing
+        # existing snapshots.
+        # Interned identifiers are written as reported values, codes are only valid within one run.
+        written = []
+        for dataset, columns in history_inputs(specs).items():
+            if dataset not in df_dict:
+                continue
+            df = df_dict[dataset]
+            date_column = reference_date_column(columns)
+            columns = [c for c in columns if c in df.columns]
+            if date_column not in columns:
+                continue
+            columns += [sentinel_column(c) for c in columns if sentinel_column(c) in df.columns]
+
+            snapshot = df[columns] if interner is None else interner.decode(df[columns])
+            identifiers = [c for c in columns if attribute_kind(c) == AttributeKind.IDENTIFIER]
+            periods = reference_periods(snapshot[date_column])
+            os.makedirs(self._dataset_dir(dataset), exist_ok=True)
+            for reference_date, period in snapshot.groupby(date_column, sort=True, observed=True):
+                if reference_date not in periods:
+                    continue
+                path = self._path(dataset, reference_date)
+                period.sort_values(identifiers).to_parquet(path, index=False)
+                written.append(path)
+        return written
+
+    def load_previous(self, dataset: str, before, periods: int = 1):
+        # The latest `periods` snapshots of dataset strictly before the given reference date, or None
+        dates = [d for d in self.reference_dates(dataset) if d < pd.Timestamp(before)][-periods:]
+        if not dates:
+            return None
+        return pd.concat([pd.read_parquet(self._path(dataset, d)) for d in dates], ignore_index=True)
@@ -0,0 +1,353 @@
+import os
+import sqlite3
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from normalize import Sentinel, normalize_frame
+from profiling import DISABLED
+from registry import RULES, required_inputs
+from results import RuleFailure
+from roles import counterparty_roles, role_descriptions
+from schema import INSTRUMENT_KEY, PROTECTION_KEY, read_dataset
+
+ROW_ID = "row_id"  # position of the record in its CSV file, the row position of the pandas path
+
+# df_dict key -> staged table, named like the tables of R0250.sql
+TABLES = {
+    "Instrument": "Instrument",
+    "Financial": "Financial",
+    "Counterparty-instrument": "CounterpartyInstrument",
+    "Counterparty-reference": "CounterpartyReference",
+    "Joint liabilities": "JointLiabilities",
+    "Counterparty risk": "CounterpartyRisk",
+    "Counterparty default": "CounterpartyDefault",
+    "Protection received": "ProtectionReceived",
+    "Instrument-protection received": "InstrumentProtectionReceived",
+    "Accounting": "Accounting",
+}
+
+FETCH_ROWS = 1_000_000
+
+# "NOT IN {'Not applicable', 'Not required'}" on the sentinel code column of a date / amount
+NOT_APPLICABLE_OR_REQUIRED_CODES = "(%d, %d)" % (Sentinel.NOT_APPLICABLE, Sentinel.NOT_REQUIRED)
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLRule():
+    # SQL equivalent of a RecordRules method: a query returning the row_id of every violating row of
+    # dataset, plus the columns to index per dataset (the keys the query looks up)
+
+    def __init__(self, rule_id: str, dataset: str, sql: str, indexes: dict = None):
+        self.rule_id = rule_id
+        self.dataset = dataset
+        self.sql = sql
+        self.indexes = {d: [tuple(columns) for columns in keys] for d, keys in (indexes or {}).items()}
+
+
+def exists_in(rule_id: str, probe: str, probe_columns, build: str, build_columns, build_filter: str = None) -> SQLRule:
+    # "(probe columns) EXISTS IN {(build columns)}" as an anti-join, the SQL counterpart of keys.key_isin.
+    # build_filter is an extra condition on the build rows (alias b), e.g. a counterparty role.
+    conditions = ["b.%s = p.%s" % (quote(b), quote(p)) for p, b in zip(probe_columns, build_columns)]
+    if build_filter is not None:
+        conditions.append(build_filter)
+    sql = "SELECT p.{row_id} FROM {probe} p WHERE NOT EXISTS (SELECT 1 FROM {build} b WHERE {conditions})".format(
+        row_id=ROW_ID, probe=TABLES[probe], build=TABLES[build], conditions=" AND ".join(conditions),
+    )
+    return SQLRule(rule_id, probe, sql, {build: [build_columns]})
+
+
+def _role_rule(rule_id: str, role: str, condition: str) -> SQLRule:
+    # CPC001-CPC004: counterparties with a role in Counterparty-instrument must have the matching RIAD role
+    sql = """
+        SELECT DISTINCT ci.{row_id}
+        FROM CounterpartyInstrument ci
+        LEFT JOIN CounterpartyReference cr ON cr."Counterparty identifier" = ci."Counterparty identifier"
+        WHERE ci."Counterparty role" = '{role}' AND NOT ({condition})
+    """.format(row_id=ROW_ID, role=role, condition=condition)
+    return SQLRule(rule_id, "Counterparty-instrument", sql, {"Counterparty-reference": [["Counterparty identifier"]]})
+
+
+def same_key(left: str, right: str, columns) -> str:
+    # "left.column = right.column AND ..." over the given columns
+    return " AND ".join("%s.%s = %s.%s" % (left, quote(c), right, quote(c)) for c in columns)
+
+
+# Instrument and protection records of the same reference period
+_PERIOD_INSTRUMENT_KEY = ["Reference date"] + INSTRUMENT_KEY
+_PERIOD_PROTECTION_KEY = ["Reference date"] + PROTECTION_KEY
+
+
+def _instrument_dates(rule_id: str, condition: str) -> SQLRule:
+    # CN0080-CN0200: dates of an instrument (alias i) compared with the dates of its Financial record (alias f)
+    # of the same reference period
+    sql = """
+        SELECT DISTINCT i.{row_id}
+        FROM Instrument i JOIN Financial f ON {key}
+        WHERE {condition}
+    """.format(row_id=ROW_ID, key=same_key("f", "i", _PERIOD_INSTRUMENT_KEY), condition=condition.format(codes=NOT_APPLICABLE_OR_REQUIRED_CODES))
+    return SQLRule(rule_id, "Instrument", sql, {"Financial": [_PERIOD_INSTRUMENT_KEY]})
+
+
+# The rules that read more than one table. Single-table rules run chunk by chunk in pandas instead
+# (DataValidator.validate_streaming), and the history rules (RuleSpec.history) need the T-1 / T' lookups
+# of temporal.TemporalView, so they run in pandas as well.
+SQL_RULES = {sql_rule.rule_id: sql_rule for sql_rule in [
+    exists_in("CR001", "Counterparty-instrument", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"]),
+    exists_in("CR002", "Joint liabilities", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"]),
+    exists_in("CR003", "Counterparty risk", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"]),
+    exists_in("CR004", "Counterparty default", ["Counterparty identifier"], "Counterparty-reference", ["Counterparty identifier"]),
+    exists_in("CR005", "Protection received", ["Protection provider identifier"], "Counterparty-reference", ["Counterparty identifier"]),
+
+    _role_rule("CPC001", "Creditor", """cr."Role 3 Creditor" IS 'True'"""),
+    _role_rule("CPC002", "Debtor", """cr."Role 4 Debtor - All instruments originated prior to 1 September 2018" IS 'True'
+        OR cr."Role 4 Debtor - At least one instrument originated at or after 1 September 2018" IS 'TRUE'"""),
+    _role_rule("CPC003", "Originator", """cr."Role 10 Originator" IS 'True'"""),
+    _role_rule("CPC004", "Servicer", """cr."Role 11 Servicer" IS 'True'"""),
+    SQLRule("CPC005", "Protection received", """
+        SELECT DISTINCT pr.{row_id}
+        FROM ProtectionReceived pr
+        LEFT JOIN CounterpartyReference cr ON cr."Counterparty identifier" = pr."Protection provider identifier"
+        WHERE pr."Protection provider identifier" NOT IN ('Not applicable', 'Not required')
+          AND cr."Role 6 Protection provider" IS NOT 'True'
+    """.format(row_id=ROW_ID), {"Counterparty-reference": [["Counterparty identifier"]]}),
+
+    _instrument_dates("CN0080", """f."Next interest rate reset date [sentinel]" NOT IN {codes}
+          AND i."Legal final maturity date [sentinel]" NOT IN {codes}
+          AND i."Legal final maturity date" > i."Reference date"
+          AND i."Legal final maturity date" < f."Next interest rate reset date"
+    """),
+    _instrument_dates("CN0150", """f."Next interest rate reset date [sentinel]" NOT IN {codes}
+          AND f."Next interest rate reset date" < i."Inception date"
+    """),
+    _instrument_dates("CN0160", """f."Date of the default status of the instrument [sentinel]" NOT IN {codes}
+          AND f."Date of the default status of the instrument" < i."Inception date"
+    """),
+    _instrument_dates("CN0170", """f."Date of past due for the instrument [sentinel]" NOT IN {codes}
+          AND f."Date of past due for the instrument" < i."Inception date"
+    """),
+    _instrument_dates("CN0200", """f."Next interest rate reset date [sentinel]" NOT IN {codes}
+          AND i."Settlement date [sentinel]" NOT IN {codes}
+          AND f."Next interest rate reset date" < i."Settlement date"
+    """),
+    SQLRule("CN0230", "Financial", """
+        SELECT f.{row_id}
+        FROM Financial f
+        WHERE f."Type of securitisation" = 'Synthetic securitisation'
+          AND NOT EXISTS (
+            SELECT 1 FROM InstrumentProtectionReceived ipr JOIN ProtectionReceived pr ON {protection}
+            WHERE {instrument}
+              AND pr."Type of protection" IN ('Credit derivatives', 'Financial guarantees other than credit derivatives',
+                                              'Currency and deposits', 'Securities')
+          )
+    """.format(row_id=ROW_ID, protection=same_key("pr", "ipr", _PERIOD_PROTECTION_KEY),
+               instrument=same_key("ipr", "f", _PERIOD_INSTRUMENT_KEY)),
+        {"Instrument-protection received": [_PERIOD_INSTRUMENT_KEY], "Protection received": [_PERIOD_PROTECTION_KEY]}),
+    # Originators are looked up by instrument in any reference period, as roles.RoleTable keys the roles
+    SQLRule("CN0620", "Counterparty-instrument", """
+        SELECT ci.{row_id}
+        FROM CounterpartyInstrument ci
+        WHERE ci."Counterparty role" = 'Creditor'
+          AND EXISTS (SELECT 1 FROM Financial f WHERE {financial} AND f."Type of securitisation" = 'Traditional securitisation')
+          AND NOT EXISTS (SELECT 1 FROM CounterpartyInstrument o WHERE {originator} AND o."Counterparty role" = 'Originator')
+          AND EXISTS (
+            SELECT 1 FROM CounterpartyReference cr
+            WHERE cr."Counterparty identifier" = ci."Counterparty identifier"
+              AND cr."Institutional sector" = 'Financial vehicle corporations (FVCs) engaged in securitisation transactions'
+          )
+    """.format(row_id=ROW_ID, financial=same_key("f", "ci", _PERIOD_INSTRUMENT_KEY), originator=same_key("o", "ci", INSTRUMENT_KEY)), {
+        "Financial": [_PERIOD_INSTRUMENT_KEY],
+        "Counterparty-instrument": [INSTRUMENT_KEY],
+        "Counterparty-reference": [["Counterparty identifier"]],
+    }),
+    SQLRule("CN0622", "Protection received", """
+        SELECT DISTINCT pr.{row_id}
+        FROM ProtectionReceived pr
+        JOIN InstrumentProtectionReceived ipr ON {protection}
+        WHERE EXISTS (
+            SELECT 1 FROM CounterpartyInstrument ci
+            WHERE {instrument}
+              AND ci."Counterparty identifier" = pr."Protection provider identifier"
+              AND ci."Counterparty role" = 'Creditor'
+        )
+    """.format(row_id=ROW_ID, protection=same_key("ipr", "pr", _PERIOD_PROTECTION_KEY), instrument=same_key("ci", "ipr", _PERIOD_INSTRUMENT_KEY)),
+        {"Instrument-protection received": [_PERIOD_PROTECTION_KEY], "Counterparty-instrument": [_PERIOD_INSTRUMENT_KEY]}),
+    SQLRule("CN0650", "Protection received", """
+        SELECT DISTINCT pr.{row_id}
+        FROM ProtectionReceived pr
+        JOIN InstrumentProtectionReceived ipr ON {protection}
+        JOIN Instrument i ON {instrument}
+        WHERE pr."Maturity date of protection [sentinel]" NOT IN {codes}
+          AND pr."Maturity date of protection" < i."Inception date"
+    """.format(row_id=ROW_ID, codes=NOT_APPLICABLE_OR_REQUIRED_CODES, protection=same_key("ipr", "pr", _PERIOD_PROTECTION_KEY),
+               instrument=same_key("i", "ipr", _PERIOD_INSTRUMENT_KEY)),
+        {"Instrument-protection received": [_PERIOD_PROTECTION_KEY], "Instrument": [_PERIOD_INSTRUMENT_KEY]}),
+    SQLRule("CN0814", "Financial", """
+        SELECT f.{row_id}
+        FROM Financial f
+        WHERE f."Off-balance sheet amount" <= 0
+          AND EXISTS (SELECT 1 FROM Instrument i WHERE {key} AND i."Settlement date [sentinel]" = {non_applicable})
+    """.format(row_id=ROW_ID, key=same_key("i", "f", _PERIOD_INSTRUMENT_KEY), non_applicable=Sentinel.NON_APPLICABLE),
+        {"Instrument": [_PERIOD_INSTRUMENT_KEY]}),
+    SQLRule("CN0821", "Financial", """
+        SELECT f.{row_id}
+        FROM Financial f
+        WHERE f."Off-balance sheet amount [sentinel]" <> {non_applicable}
+          AND EXISTS (SELECT 1 FROM Instrument i WHERE {key} AND i."Type of instrument" = 'Reverse repurchase agreements')
+    """.format(row_id=ROW_ID, key=same_key("i", "f", _PERIOD_INSTRUMENT_KEY), non_applicable=Sentinel.NON_APPLICABLE),
+        {"Instrument": [_PERIOD_INSTRUMENT_KEY]}),
+    SQLRule("CN0945", "Instrument", """
+        SELECT i.{row_id}
+        FROM Instrument i
+        WHERE i."Settlement date [sentinel]" <> {non_applicable}
+          AND i."Inception date" < i."Settlement date"
+          AND i."Commitment amount at inception [sentinel]" = {non_applicable}
+          AND EXISTS (SELECT 1 FROM Financial f WHERE {key} AND f."Off-balance sheet amount [sentinel]" = {non_applicable})
+    """.format(row_id=ROW_ID, key=same_key("f", "i", _PERIOD_INSTRUMENT_KEY), non_applicable=Sentinel.NON_APPLICABLE),
+        {"Financial": [_PERIOD_INSTRUMENT_KEY]}),
+
+    exists_in("RI0030", "Financial", INSTRUMENT_KEY, "Instrument", INSTRUMENT_KEY),
+    exists_in("RI0050", "Financial", INSTRUMENT_KEY, "Counterparty-instrument", INSTRUMENT_KEY,
+              """b."Counterparty role" = 'Creditor'"""),
+    exists_in("RI0060", "Financial", INSTRUMENT_KEY, "Counterparty-instrument", INSTRUMENT_KEY,
+              """b."Counterparty role" = 'Debtor'"""),
+    exists_in("RI0070", "Financial", INSTRUMENT_KEY, "Counterparty-instrument", INSTRUMENT_KEY,
+              """b."Counterparty role" = 'Servicer'"""),
+    exists_in("RI0090", "Instrument", INSTRUMENT_KEY, "Financial", INSTRUMENT_KEY),
+    exists_in("RI0110", "Counterparty-instrument", INSTRUMENT_KEY, "Financial", INSTRUMENT_KEY),
+    exists_in("RI0130", "Instrument-protection received", INSTRUMENT_KEY, "Financial", INSTRUMENT_KEY),
+    SQLRule("RI0191", "Counterparty default", """
+        SELECT cd.{row_id}
+        FROM CounterpartyDefault cd
+        WHERE NOT EXISTS (
+            SELECT 1 FROM CounterpartyInstrument ci
+            WHERE ci."Observed agent identifier" = cd."Observed agent identifier"
+              AND ci."Counterparty identifier" = cd."Counterparty identifier"
+              AND ci."Counterparty role" = 'Debtor'
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM ProtectionReceived pr
+            WHERE pr."Observed agent identifier" = cd."Observed agent identifier"
+              AND pr."Protection provider identifier" = cd."Counterparty identifier"
+        )
+    """.format(row_id=ROW_ID), {
+        "Counterparty-instrument": [["Observed agent identifier", "Counterparty identifier"]],
+        "Protection received": [["Observed agent identifier", "Protection provider identifier"]],
+    }),
+    exists_in("RI0220", "Protection received", PROTECTION_KEY, "Instrument-protection received", PROTECTION_KEY),
+    exists_in("RI0250", "Instrument-protection received", PROTECTION_KEY, "Protection received", PROTECTION_KEY),
+]}
+
+
+class SQLiteBackend():
+    # Runs the rules of SQL_RULES inside a SQLite database instead of pandas. Datasets are staged chunk by
+    # chunk (read and normalized like the pandas path, one chunk in memory at a time) together with the
+    # row_id of every record, the key columns the queries look up are indexed, and each query returns the
+    # row_ids of the violations, so results line up with the pandas path (ValidationResults, ViolationReport).
+    # The "record_rules" table holds the rule texts, for joining error messages as R0250.sql does.
+
+    def __init__(self, database_path: str, schemas: dict, profiler=DISABLED, code_lists: dict = None):
+        self.database_path = database_path
+        self.schemas = schemas
+        self.profiler = profiler
+        self.code_lists = code_lists
+        self.connection = sqlite3.connect(database_path)
+        self.connection.execute("PRAGMA journal_mode = OFF")  # the database is a scratch copy of the CSVs
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.staged = {}  # dataset -> rows
+
+    def stage(self, files: dict, rule_ids=None, chunksize: int = 1_000_000, rule_texts: pd.DataFrame = None):
+        # files is dataset -> CSV path (DataValidator.dataset_files()); only the tables and columns read by
+        # the selected SQL rules are staged, replacing earlier copies
+        sql_rules = self.rules(rule_ids)
+        inputs = required_inputs([RULES[r.rule_id] for r in sql_rules])
+        for dataset, columns in inputs.items():
+            if dataset in files:
+                self._stage_dataset(dataset, files[dataset], columns, chunksize)
+
+        for sql_rule in sql_rules:
+            for dataset, keys in sql_rule.indexes.items():
+                if dataset in self.staged:
+                    for columns in keys:
+                        self._create_index(dataset, columns)
+
+        if rule_texts is not None:
+            texts = rule_texts.rename(columns=lambda c: c.replace(" ", "")).rename_axis("RuleNumber").reset_index()
+            texts.to_sql("record_rules", self.connection, if_exists="replace", index=False)
+        self.connection.commit()
+
+    def _stage_dataset(self, dataset, path, columns, chunksize):
+        table = TABLES[dataset]
+        self.connection.execute("DROP TABLE IF EXISTS %s" % table)
+        rows = 0
+        roles = None
+        with self.profiler.measure("load", "%s -> sqlite" % dataset) as record:
+            for chunk in read_dataset(path, self.schemas[dataset], usecols=columns, chunksize=chunksize):
+                # Row numbers continue across chunks, so row_id is the row position of the whole file
+                chunk = normalize_frame(chunk, self.schemas[dataset])
+                if "Counterparty role" in chunk.columns:
+                    # The queries compare role descriptions, whether a role was reported as code, description or both
+                    roles = roles if roles is not None else counterparty_roles(self.code_lists)
+                    chunk["Counterparty role"] = role_descriptions(chunk["Counterparty role"], roles)
+                chunk.insert(0, ROW_ID, chunk.index.to_numpy(dtype="int64"))
+                chunk.to_sql(table, self.connection, if_exists="append", index=False)
+                rows += len(chunk)
+            record["rows_out"] = rows
+        self.staged[dataset] = rows
+
+    def _create_index(self, dataset, columns):
+        table = TABLES[dataset]
+        name = "idx_%s_%08x" % (table, zlib.crc32("|".join(columns).encode()))
+        self.connection.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s)" % (name, table, ", ".join(quote(c) for c in columns)))
+
+    def rules(self, rule_ids=None) -> list:
+        if rule_ids is None:
+            return list(SQL_RULES.values())
+        return [SQL_RULES[r] for r in rule_ids if r in SQL_RULES]
+
+    def run(self, rule_ids=None):
+        # Yields (rule_id, dataset, row positions) per rule whose tables are staged, like results.evaluate_rule
+        # (a RuleFailure in place of the positions of a query that failed)
+        for sql_rule in self.rules(rule_ids):
+            datasets = RULES[sql_rule.rule_id].datasets
+            if not all(d in self.staged for d in datasets):
+                continue
+            rows_in = sum(self.staged[d] for d in datasets)
+            try:
+                with self.profiler.measure("filter", sql_rule.rule_id, rows_in) as record:
+                    positions = self.positions(sql_rule.sql)
+                    record["rows_out"] = len(positions)
+            except sqlite3.Error as error:
+                positions = RuleFailure(error)
+            yield sql_rule.rule_id, sql_rule.dataset, positions
+
+    def positions(self, sql: str) -> np.ndarray:
+        # Sorted unique row_ids returned by a query, fetched in batches
+        cursor = self.connection.execute(sql)
+        batches = []
+        while True:
+            batch = cursor.fetchmany(FETCH_ROWS)
+            if not batch:
+                break
+            batches.append(np.fromiter((row[0] for row in batch), dtype="int64", count=len(batch)))
+        return np.unique(np.concatenate(batches)) if batches else np.empty(0, dtype="int64")
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def default_database_path(dataset_path: str) -> str:
+    return os.path.join(dataset_path, "record_rules.sqlite")
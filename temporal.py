@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from keys import composite_key_codes, key_lookup
+from normalize import sentinel_column
+
+
+class TemporalView():
+    # One dataset ordered once by (identifier, reference date). For every row it knows the position of the
+    # same identifier's row in the previous calendar month (T-1) and can gather any column at T-1 or at
+    # the end of the row's quarter (T'). All results are Series aligned with the dataset's own rows.
+    # A record whose identifier was not reported in the month before has no T-1, even when it was reported
+    # in an earlier month.
+    # key is one identifier column or a list of columns forming the identifier.
+    # previous optionally holds earlier reference periods of the same dataset (e.g. a snapshot, see snapshot.py);
+    # its records serve as T-1 / T' but are never reported themselves.
+
+    def __init__(self, df: pd.DataFrame, key, date: str, previous: pd.DataFrame = None):
+        self.df = df
+        self.key = key
+        self.date = date
+        self.previous_df = previous
+        self._offset = 0 if previous is None else len(previous)
+
+        keys = [key] if isinstance(key, str) else list(key)
+        frame = self._values_frame(keys + [date])
+        key_codes, _ = composite_key_codes(frame, keys, frame, keys)
+        dates = pd.to_datetime(frame[date])
+        self.periods = np.sort(dates.dropna().unique())
+        period = np.searchsorted(self.periods, dates.to_numpy())
+        period[dates.isna().to_numpy()] = -1
+        # Calendar month index of every reference date (year * 12 + month): T-1 is exactly one month earlier
+        month = (dates.dt.year * 12 + dates.dt.month).fillna(-1).to_numpy(dtype="int64")
+        self._key_codes = key_codes
+        self._period = period
+        self._quarter_end_position = None
+        if len(frame) == 0:
+            # An empty table (or an empty partition of one): no row has a T-1
+            self._previous_position = np.empty(0, dtype="intp")
+            return
+
+        order = np.lexsort((month, key_codes))
+        sorted_key = key_codes[order]
+        sorted_month = month[order]
+        # The previous sorted row is T-1 only if it has the same identifier and the preceding calendar month
+        follows = np.r_[False, (sorted_key[1:] == sorted_key[:-1]) & (sorted_month[1:] == sorted_month[:-1] + 1)]
+        follows &= (sorted_month >= 0) & (sorted_key >= 0)
+        previous_position = np.full(len(frame), -1, dtype="intp")
+        previous_position[order] = np.where(follows, np.r_[-1, order[:-1]], -1)
+        self._previous_position = previous_position[self._offset:]
+
+    def _values(self, column) -> pd.Series:
+        # Values of a column (or of a function of the frame, e.g. a sentinel mask) over the previous
+        # periods followed by the current ones. Categoricals with different categories concatenate as strings.
+        if callable(column):
+            parts = [column(self.df)] if self.previous_df is None else [column(self.previous_df), column(self.df)]
+        else:
+            parts = [self.df[column]] if self.previous_df is None else [self.previous_df[column], self.df[column]]
+        return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+    def _values_frame(self, columns) -> pd.DataFrame:
+        return pd.DataFrame({column: self._values(column).to_numpy() for column in columns})
+
+    @property
+    def has_previous(self) -> pd.Series:
+        return pd.Series(self._previous_position >= 0, index=self.df.index)
+
+    def _gather(self, column, positions: np.ndarray) -> pd.Series:
+        # column is a column name or a function of a frame returning a Series (e.g. a sentinel mask)
+        values = self._values(column)
+        return pd.Series(take(values.array, positions, allow_fill=True), index=self.df.index, name=values.name)
+
+    def previous(self, column) -> pd.Series:
+        # Value at T-1 for the same identifier, missing when there is no T-1 record
+        return self._gather(column, self._previous_position)
+
+    def changed(self, column: str) -> pd.Series:
+        # True where a T-1 record exists and the value differs from it. Two missing values
+        # (e.g. 'Non-applicable' in both periods) only count as equal when their sentinel codes match.
+        current = self.df[column]
+        previous = self.previous(column)
+        same = (current == previous).fillna(False).to_numpy(dtype=bool) | (current.isna() & previous.isna()).to_numpy()
+        codes_column = sentinel_column(column)
+        if codes_column in self.df.columns and (self.previous_df is None or codes_column in self.previous_df.columns):
+            same &= (self.df[codes_column] == self.previous(codes_column)).fillna(False).to_numpy(dtype=bool)
+        return self.has_previous & ~same
+
+    @property
+    def quarter_end(self) -> pd.Series:
+        # T': the end of the quarter of each row's reference date
+        return pd.to_datetime(self.df[self.date]) + pd.offsets.QuarterEnd(0)
+
+    def _quarter_end_positions(self) -> np.ndarray:
+        if self._quarter_end_position is not None:
+            return self._quarter_end_position
+        positions = np.full(len(self.df), -1, dtype="intp")
+        if len(self.periods) == 0 or len(self.df) == 0:
+            self._quarter_end_position = positions
+            return positions
+
+        quarter_end = self.quarter_end.to_numpy()
+        target_period = np.minimum(np.searchsorted(self.periods, quarter_end), len(self.periods) - 1)
+        reported = (self.periods[target_period] == quarter_end) & (self._period[self._offset:] >= 0) & (self._key_codes[self._offset:] >= 0)
+
+        # Row position of (identifier, T') through a sorted (identifier, period) composite key
+        n_periods = len(self.periods) + 1
+        row_key = self._key_codes.astype("int64") * n_periods + self._period
+        unique_keys, first_rows = np.unique(row_key, return_index=True)
+        current_key_codes = self._key_codes[self._offset:].astype("int64")
+        target_key = current_key_codes * n_periods + target_period
+        found = np.minimum(np.searchsorted(unique_keys, target_key), len(unique_keys) - 1)
+        matched = reported & (unique_keys[found] == target_key)
+        positions[matched] = first_rows[found[matched]]
+        self._quarter_end_position = positions
+        return positions
+
+    @property
+    def in_quarter_window(self) -> pd.Series:
+        # Rows at T IN {T', T'-1, T'-2} whose quarter end T' is reported for the same identifier
+        return pd.Series(self._quarter_end_positions() >= 0, index=self.df.index)
+
+    def at_quarter_end(self, column) -> pd.Series:
+        # Value of the column at T' for the same identifier
+        return self._gather(column, self._quarter_end_positions())
+
+
+class TemporalEngine():
+    # Builds one TemporalView per (dataset, identifier, reference date) and shares it between all period rules.
+    # previous_dict holds records of earlier reference periods per dataset, when they are not part of df_dict.
+
+    def __init__(self, df_dict: dict, previous_dict: dict = None):
+        self.df_dict = df_dict
+        self.previous_dict = previous_dict or {}
+        self._views = {}
+
+    def view(self, dataset: str, key, date: str) -> TemporalView:
+        view_key = (dataset, key if isinstance(key, str) else tuple(key), date)
+        if view_key not in self._views:
+            self._views[view_key] = TemporalView(self.df_dict[dataset], key, date, self.previous_dict.get(dataset))
+        return self._views[view_key]
+
+    def all_periods(self, dataset: str, columns) -> pd.DataFrame:
+        # Columns of dataset over the previous and current reference periods, e.g. as the build side of a T-1 lookup
+        current = self.df_dict[dataset][list(columns)]
+        if dataset not in self.previous_dict:
+            return current
+        return pd.concat([self.previous_dict[dataset][list(columns)], current], ignore_index=True)
+
+    def at_dates(self, dataset: str, key, date: str, probe: pd.DataFrame, dates: pd.Series, column: str) -> pd.Series:
+        # Value of a column of dataset for the key of every probe row at the given reference date, e.g. the
+        # Accounting record of an instrument at the end of its quarter (T'); missing where it is not reported
+        key = [key] if isinstance(key, str) else list(key)
+        build = self.all_periods(dataset, key + [date] + ([column] if column != date else []))
+        probe = probe[key].assign(**{date: dates.to_numpy()})
+        return key_lookup(probe, key + [date], build, key + [date], column)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live flat in the repository root, as the benchmarks import them; the synthetic submission
+# generator lives with the benchmarks
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def submission_dir(tmp_path_factory):
+    # A small synthetic submission of two reference periods, with violations, shared by the tests
+    from synthetic import generate
+
+    directory = tmp_path_factory.mktemp("submission")
+    generate(str(directory), 200, violation_rate=0.02, periods=2, seed=1)
+    return str(directory)
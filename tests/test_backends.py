@@ -0,0 +1,31 @@
+import pytest
+
+import RecordRules  # noqa: F401 (registers the rules)
+from registry import RULES
+from sqlite_backend import SQL_RULES
+
+# The history rules need temporal.TemporalView (T-1, T') and only run in pandas
+HISTORY_RULES = {rule_id for rule_id, spec in RULES.items() if spec.history}
+
+
+def assert_all_same(frame, rule_ids):
+    assert set(frame["rule"]) == set(rule_ids)
+    assert (frame["status"] == "same").all(), frame[frame["status"] != "same"].to_string()
+
+
+def test_polars_backend_matches_pandas(submission_dir):
+    pytest.importorskip("polars")
+    from compare_polars import compare
+    from polars_backend import POLARS_RULES
+
+    assert set(RULES) - set(POLARS_RULES) == HISTORY_RULES
+    assert_all_same(compare(submission_dir), POLARS_RULES)
+
+
+def test_sqlite_backend_matches_pandas(submission_dir, tmp_path):
+    from compare_sqlite import compare
+
+    # SQLite runs the rules that read several tables; single-table rules stream through pandas
+    assert set(SQL_RULES) == {rule_id for rule_id, spec in RULES.items() if len(spec.datasets) > 1} - HISTORY_RULES
+    frame, _ = compare(submission_dir, str(tmp_path / "rules.sqlite"))
+    assert_all_same(frame, SQL_RULES)
@@ -0,0 +1,15 @@
+from code_lists import load_code_lists
+from mapping import ValueMapping
+
+
+def test_every_value_mapping_has_a_code_list():
+    code_lists = load_code_lists()
+    names = [name for attribute, name in vars(ValueMapping).items() if not attribute.startswith("_")]
+    assert [name for name in names if name not in code_lists] == []
+
+
+def test_code_lists_are_complete():
+    code_lists = load_code_lists()
+    # The hand-typed Currency list stopped at TND
+    assert code_lists[ValueMapping.Currency].get_key("US dollar") == "USD"
+    assert code_lists[ValueMapping.CounterpartyRole].combined_from_key("2") == "2 - Debtor"
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from mapping import Mapping
+
+# Two codes share a description, as "STD"/"STN" (Dobra) and "MRO"/"MRU" (Ouguiya) do in the Currency code list
+CURRENCIES = {"MRO": "Ouguiya", "MRU": "Ouguiya", "STD": "Dobra", "STN": "Dobra", "EUR": "Euro"}
+
+
+def test_get_key_returns_first_code_of_duplicated_description():
+    currency = Mapping(CURRENCIES)
+    assert currency.get_key("Ouguiya") == "MRO"
+    assert currency.get_key("Dobra") == "STD"
+    assert currency.get_key("Euro") == "EUR"
+    assert currency.get_key("Unknown") is None
+
+
+def test_to_codes_matches_get_key():
+    currency = Mapping(CURRENCIES)
+    values = pd.Series(["Dobra", "Euro", "Ouguiya", None, "Unknown"])
+    codes = currency.to_codes(values)
+    assert codes.tolist()[:3] == ["STD", "EUR", "MRO"]
+    assert codes.isna().tolist() == [False, False, False, True, True]
+
+
+def test_to_descriptions():
+    currency = Mapping(CURRENCIES)
+    descriptions = currency.to_descriptions(pd.Series(["STN", "MRU", "XXX"], dtype="category"))
+    assert descriptions.tolist()[:2] == ["Dobra", "Ouguiya"]
+    assert pd.isna(descriptions.iloc[2])
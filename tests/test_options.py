@@ -0,0 +1,27 @@
+import pytest
+
+from RecordRules import DataValidator
+from options import ExecutionOptions
+
+
+@pytest.mark.parametrize("options", [
+    dict(backend="spark"),
+    dict(workers=0),
+    dict(partitions=0),
+    dict(streaming=True, partitions=4),
+    dict(streaming=True, workers=2),
+    dict(streaming=True, backend="polars"),
+    dict(streaming=True, result_cache_dir="cache"),
+])
+def test_unsupported_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        ExecutionOptions(**options)
+
+
+@pytest.mark.parametrize("options", [dict(partitions=4), dict(workers=2), dict(backend="polars")])
+def test_sql_and_streaming_runs_reject_pool_options(submission_dir, tmp_path, options):
+    validator = DataValidator(submission_dir, rules=["CN0814"], options=ExecutionOptions(**options))
+    with pytest.raises(ValueError, match="apply_sql_rules"):
+        validator.apply_sql_rules(str(tmp_path / "rules.sqlite"))
+    with pytest.raises(ValueError, match="validate_streaming"):
+        validator.validate_streaming(str(tmp_path / "violations"))
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from RecordRules import DataValidator
+from options import ExecutionOptions
+from schema import dataset_file_name, load_schemas
+
+
+def assert_same_results(plain, partitioned):
+    assert partitioned.errors == plain.errors == {}
+    assert set(partitioned.rule_ids) == set(plain.rule_ids)
+    for rule_id in plain.rule_ids:
+        assert partitioned.datasets[rule_id] == plain.datasets[rule_id], rule_id
+        assert np.array_equal(partitioned.positions[rule_id], plain.positions[rule_id]), rule_id
+
+
+@pytest.mark.parametrize("partitions, workers", [(1, 1), (7, 1), (200, 1), (4, 2)])
+def test_partitioned_run_equals_plain_run(submission_dir, partitions, workers):
+    plain = DataValidator(submission_dir).apply_validation_rules()
+    partitioned = DataValidator(submission_dir, options=ExecutionOptions(partitions=partitions, workers=workers)).apply_validation_rules()
+    assert_same_results(plain, partitioned)
+
+
+def test_partitioned_run_of_empty_tables(submission_dir):
+    validator = DataValidator(submission_dir, options=ExecutionOptions(partitions=4))
+    validator.df_dict = {dataset: df.iloc[:0] for dataset, df in validator.df_dict.items()}
+    results = validator.apply_validation_rules()
+
+    assert results.errors == {}
+    assert set(results.rule_ids) == {spec.rule_id for spec in validator.rules}
+    assert results.counts().sum() == 0
+
+
+def test_partitioned_run_with_previous_periods_from_a_snapshot(submission_dir, tmp_path):
+    # The earlier reference period goes to the snapshot store, the last one is validated against it (T-1)
+    for part in ("earlier", "latest"):
+        os.makedirs(tmp_path / part)
+    for dataset in load_schemas():
+        path = os.path.join(submission_dir, dataset_file_name(dataset))
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if "Reference date" not in df.columns:
+            for part in ("earlier", "latest"):
+                shutil.copy(path, tmp_path / part)
+            continue
+        latest = df["Reference date"] == df["Reference date"].max()
+        df[~latest].to_csv(tmp_path / "earlier" / dataset_file_name(dataset), index=False)
+        df[latest].to_csv(tmp_path / "latest" / dataset_file_name(dataset), index=False)
+    snapshot_dir = str(tmp_path / "snapshots")
+    DataValidator(str(tmp_path / "earlier"), snapshot_dir=snapshot_dir).save_snapshot()
+
+    plain = DataValidator(str(tmp_path / "latest"), snapshot_dir=snapshot_dir)
+    assert plain.previous_dict
+    partitioned = DataValidator(str(tmp_path / "latest"), snapshot_dir=snapshot_dir, options=ExecutionOptions(partitions=5))
+    assert_same_results(plain.apply_validation_rules(), partitioned.apply_validation_rules())
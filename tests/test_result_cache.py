@@ -0,0 +1,23 @@
+import shutil
+
+from registry import RuleSpec
+from result_cache import RULE_HELPER_MODULES, ResultCache, helpers_hash
+from schema import TEMPLATE_PATH
+
+SPEC = RuleSpec("TEST", "Consistency", {"Instrument": ["Purpose"]}, True, "TEST")
+FINGERPRINTS = {"Instrument": "0" * 64}
+
+
+def test_key_depends_on_the_template(tmp_path):
+    template = tmp_path / "template.xlsx"
+    shutil.copyfile(TEMPLATE_PATH, template)
+    key = ResultCache(str(tmp_path / "cache"), str(template)).key(SPEC, FINGERPRINTS)
+    assert ResultCache(str(tmp_path / "cache"), str(template)).key(SPEC, FINGERPRINTS) == key
+
+    with open(template, "ab") as f:
+        f.write(b"\0")
+    assert ResultCache(str(tmp_path / "cache"), str(template)).key(SPEC, FINGERPRINTS) != key
+
+
+def test_helpers_hash_covers_every_helper_module():
+    assert helpers_hash(RULE_HELPER_MODULES) != helpers_hash(RULE_HELPER_MODULES[:-1])
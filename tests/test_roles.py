@@ -0,0 +1,26 @@
+import pandas as pd
+
+from RecordRules import RecordRules
+from roles import CREDITOR, DEBTOR, ORIGINATOR, SERVICER, counterparty_roles, role_bits, role_descriptions
+
+# A role reported as its code, its description, both, padded, outside the code list and missing
+REPORTED = ["1", "Debtor", "3 - Originator", " 7 ", "Unknown", None]
+
+
+def test_roles_are_translated_through_the_code_list():
+    roles = counterparty_roles()
+    for values in (pd.Series(REPORTED), pd.Series(REPORTED, dtype="category")):
+        assert role_bits(values, roles).tolist() == [CREDITOR, DEBTOR, ORIGINATOR, SERVICER, 0, 0]
+        assert role_descriptions(values, roles).tolist()[:4] == ["Creditor", "Debtor", "Originator", "Servicer"]
+
+
+def test_coded_debtor_role():
+    # C1 is reported as a debtor by its code: its default record refers to a debtor, C2's does not
+    keys = ["Observed agent identifier", "Counterparty identifier"]
+    df_dict = {
+        "Counterparty default": pd.DataFrame([("OA1", "C1"), ("OA1", "C2")], columns=keys),
+        "Counterparty-instrument": pd.DataFrame([("OA1", "C1", "2"), ("OA1", "C2", "1")], columns=keys + ["Counterparty role"]),
+        "Protection received": pd.DataFrame(columns=["Observed agent identifier", "Protection provider identifier"]),
+    }
+    _, _, invalid_rows = RecordRules(df_dict).RI0191()
+    assert invalid_rows["Counterparty identifier"].tolist() == ["C2"]
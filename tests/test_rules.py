@@ -0,0 +1,63 @@
+import shutil
+
+import pandas as pd
+
+from RecordRules import DataValidator, RecordRules
+from options import ExecutionOptions
+from registry import RULES
+from schema import dataset_file_name
+
+
+def failing(method):
+    # A rule method that raises, registered under the same RuleSpec
+    def raising(self):
+        raise KeyError("Missing attribute")
+    raising.rule_spec = method.rule_spec
+    return raising
+
+
+def test_failing_rules_are_reported_and_do_not_stop_the_run(submission_dir, monkeypatch):
+    monkeypatch.setattr(RecordRules, "CN0650", failing(RecordRules.CN0650))  # cross-table rule
+    monkeypatch.setattr(RecordRules, "CN0847", failing(RecordRules.CN0847))  # row-local rule
+    results = DataValidator(submission_dir).apply_validation_rules()
+
+    assert set(results.errors) == {"CN0650", "CN0847"}
+    assert results.errors["CN0650"] == "KeyError: 'Missing attribute'"
+    assert "CN0650" not in results.rule_ids
+    assert "CN0814" in results.rule_ids and "CN0821" in results.rule_ids
+
+
+def test_full_rule_set(submission_dir):
+    validator = DataValidator(submission_dir)
+    results = validator.apply_validation_rules()
+
+    assert results.errors == {}
+    assert set(results.rule_ids) == {spec.rule_id for spec in validator.rules}
+    rules = RecordRules(validator.df_dict)
+    for spec in validator.rules:
+        # Rules report the dataset they declare, under its template name
+        assert getattr(rules, spec.method_name)()[1] == spec.dataset, spec.rule_id
+
+
+def test_full_rule_set_on_empty_tables(submission_dir):
+    validator = DataValidator(submission_dir)
+    validator.df_dict = {dataset: df.iloc[:0] for dataset, df in validator.df_dict.items()}
+    validator.previous_dict = {}
+    results = validator.apply_validation_rules()
+
+    assert results.errors == {}
+    assert results.counts().sum() == 0
+
+
+def test_streaming_skips_only_rules_missing_an_attribute(submission_dir, tmp_path):
+    shutil.copytree(submission_dir, tmp_path / "submission")
+    path = tmp_path / "submission" / dataset_file_name("Financial")
+    pd.read_csv(path, dtype=str, keep_default_na=False).drop(columns="Type of securitisation").to_csv(path, index=False)
+
+    counts = DataValidator(str(tmp_path / "submission"), options=ExecutionOptions(streaming=True)).validate_streaming(str(tmp_path / "violations"))
+    expected = DataValidator(submission_dir).apply_validation_rules().counts()
+    skipped = {spec.rule_id for spec in RULES.values() if spec.row_local and "Type of securitisation" in spec.inputs[spec.dataset]}
+    row_local = {spec.rule_id for spec in RULES.values() if spec.row_local}
+
+    assert skipped and set(counts) == row_local - skipped
+    assert counts == {rule_id: expected[rule_id] for rule_id in counts}
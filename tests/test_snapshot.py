@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+
+from RecordRules import DataValidator
+from registry import RuleSpec
+from snapshot import SnapshotStore, reference_periods
+
+COLUMNS = ["Reference date", "Observed agent identifier", "Contract identifier", "Instrument identifier", "Purpose"]
+HISTORY_SPEC = RuleSpec("TEST", "Consistency", {"Instrument": COLUMNS}, False, "TEST", history=True)
+
+
+def instruments(reference_dates):
+    return pd.DataFrame([
+        (reference_date, "OA1", "C%d" % number, "I%d" % number, "Other purposes")
+        for number, reference_date in enumerate(reference_dates)
+    ], columns=COLUMNS)
+
+
+def submission(tmp_path):
+    # Ten records of 2023-12-31, one with an early (mistyped) reference date and one with a malformed one
+    data_dir = tmp_path / "submission"
+    data_dir.mkdir()
+    instruments(["2023-12-31"] * 10 + ["2013-12-31", "31/31/2023"]).to_csv(data_dir / "instrument.csv", index=False)
+    return str(data_dir)
+
+
+def test_reference_periods_ignore_stray_dates():
+    dates = pd.to_datetime(pd.Series(["2023-12-31"] * 10 + ["2013-12-31", None]))
+    assert reference_periods(dates) == [pd.Timestamp("2023-12-31")]
+    # A submission carrying several periods keeps all of them
+    dates = pd.to_datetime(pd.Series(["2023-11-30"] * 9 + ["2023-12-31"] * 10))
+    assert reference_periods(dates) == [pd.Timestamp("2023-11-30"), pd.Timestamp("2023-12-31")]
+
+
+def test_previous_period_is_loaded_despite_a_malformed_date(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    store.save({"Instrument": instruments(["2023-11-30"] * 10).astype({"Reference date": "datetime64[ns]"})}, [HISTORY_SPEC])
+
+    validator = DataValidator(submission(tmp_path), snapshot_dir=store.directory)
+    previous = validator.previous_dict["Instrument"]
+    assert len(previous) == 10
+    assert set(previous["Reference date"]) == {pd.Timestamp("2023-11-30")}
+
+
+def test_snapshot_is_not_written_for_a_stray_date(tmp_path):
+    validator = DataValidator(submission(tmp_path))
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    written = store.save(validator.df_dict, [HISTORY_SPEC])
+    assert [os.path.basename(path) for path in written] == ["2023-12-31.parquet"]
+    assert store.reference_dates("Instrument") == [pd.Timestamp("2023-12-31")]
@@ -0,0 +1,13 @@
+from domains import DomainChecker
+from schema import dataset_file_name, load_schemas, read_dataset
+from synthetic import generate
+
+
+def test_datasets_have_the_template_attributes_and_code_list_values(tmp_path):
+    generate(str(tmp_path), 50, violation_rate=0.0)
+    schemas = load_schemas()
+    df_dict = {dataset: read_dataset(str(tmp_path / dataset_file_name(dataset)), schema) for dataset, schema in schemas.items()}
+
+    for dataset, schema in schemas.items():
+        assert list(df_dict[dataset].columns) == list(schema.attributes), dataset
+    assert DomainChecker().check(df_dict, schemas).empty
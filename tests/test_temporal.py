@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from temporal import TemporalView
+
+KEY = ["Observed agent identifier", "Instrument identifier"]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=KEY + ["Reference date", "Purpose"]).astype({"Reference date": "datetime64[ns]"})
+
+
+def test_previous_period():
+    df = frame([
+        ("OA1", "I1", "2023-11-30", "A"),
+        ("OA1", "I1", "2023-12-31", "B"),
+        ("OA1", "I2", "2023-12-31", "A"),
+        ("OA2", "I1", "2023-12-31", "B"),
+    ])
+    view = TemporalView(df, KEY, "Reference date")
+    assert view.has_previous.tolist() == [False, True, False, False]
+    assert view.previous("Purpose").tolist()[1] == "A"
+    assert view.changed("Purpose").tolist() == [False, True, False, False]
+
+
+def test_previous_period_is_the_previous_calendar_month():
+    # Nothing is reported for November: the December records have no T-1, although October was reported
+    df = frame([
+        ("OA1", "I1", "2023-10-31", "A"),
+        ("OA1", "I1", "2023-12-31", "B"),
+        ("OA1", "I2", "2023-12-31", "B"),
+    ])
+    view = TemporalView(df, KEY, "Reference date")
+    assert view.has_previous.tolist() == [False, False, False]
+    assert view.changed("Purpose").tolist() == [False, False, False]
+
+
+def test_empty_table():
+    view = TemporalView(frame([]), KEY, "Reference date")
+    assert len(view.has_previous) == 0
+    assert len(view.previous("Purpose")) == 0
+    assert len(view.changed("Purpose")) == 0
+    assert len(view.in_quarter_window) == 0
+
+
+def test_empty_table_with_previous_periods():
+    previous = frame([("OA1", "I1", "2023-11-30", "A")])
+    view = TemporalView(frame([]), KEY, "Reference date", previous)
+    assert len(view.changed("Purpose")) == 0
+    assert len(view.at_quarter_end("Purpose")) == 0
+
+
+def test_previous_periods_are_not_reported():
+    previous = frame([("OA1", "I1", "2023-11-30", "A")])
+    view = TemporalView(frame([("OA1", "I1", "2023-12-31", "B")]), KEY, "Reference date", previous)
+    assert view.changed("Purpose").tolist() == [True]
+    assert np.array_equal(view.in_quarter_window.to_numpy(), [True])